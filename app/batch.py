@@ -0,0 +1,52 @@
+# app/batch.py
+"""
+Bounded concurrent fan-out for the batch write endpoints.
+
+Each item is handled independently: a success is reported with its status and
+created object, and any failure is mapped to the same status/detail the
+single-item endpoint would have returned, so one bad item never fails the batch;
+an unexpected error is logged and reported as that item's 500.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Sequence, Tuple, TypeVar
+
+import httpx
+from fastapi import HTTPException
+
+from .breaker import CircuitOpen
+from .ratelimit import RateLimited
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def check_batch_size(items: Sequence[Any], max_items: int) -> None:
+    if len(items) > max_items:
+        raise HTTPException(status_code=413, detail=f"Batch too large: at most {max_items} items per request")
+
+
+async def run_batch(items: Sequence[T], handler: Callable[[T], Awaitable[Tuple[int, Any]]],
+                    concurrency: int) -> List[dict]:
+    """Run ``handler`` over ``items`` with at most ``concurrency`` in flight; results keep input order."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(index: int, item: T) -> dict:
+        async with sem:
+            try:
+                status, data = await handler(item)
+            except HTTPException as e:
+                return {"index": index, "status": e.status_code, "error": str(e.detail)}
+            except RateLimited as e:
+                return {"index": index, "status": 429, "error": e.detail}
+            except CircuitOpen as e:
+                return {"index": index, "status": 503, "error": e.detail}
+            except httpx.HTTPError as e:
+                return {"index": index, "status": 502, "error": f"GitHub request failed: {e}"}
+            except Exception:
+                logger.exception("Batch item %d failed", index)
+                return {"index": index, "status": 500, "error": "Internal Server Error"}
+        return {"index": index, "status": status, "data": data}
+
+    return list(await asyncio.gather(*(one(i, item) for i, item in enumerate(items))))
@@ -0,0 +1,145 @@
+# app/breaker.py
+"""
+Circuit breaking and latency-derived timeouts for upstream GitHub calls.
+
+GitHubClient keeps one CircuitBreaker per endpoint class (reads, writes,
+GraphQL). A call counts as failed when it raises a transport error or
+timeout, gets a 5xx, or takes longer than BREAKER_SLOW_CALL. Once at least
+BREAKER_MIN_CALLS of the last BREAKER_WINDOW calls are in and the failed
+share reaches BREAKER_FAILURE_RATE, the circuit opens: calls fail at once
+with CircuitOpen (routes answer from cache where they can, else 503) for
+BREAKER_OPEN_SECONDS. Then a single probe call is let through (half-open);
+success closes the circuit, failure opens it again.
+
+Each breaker also times its completed calls and derives the per-request
+httpx timeouts from them: read from p99, connect from p50 and pool waits
+from p99, each a multiple of the observed latency clamped between a floor
+and the configured ceiling (HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT,
+HTTP_POOL_TIMEOUT). Until enough samples exist the ceilings apply.
+"""
+import time
+from collections import deque
+from typing import Deque
+
+import httpx
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+MIN_SAMPLES = 20
+RECOMPUTE_EVERY = 20
+READ_MULTIPLIER, CONNECT_MULTIPLIER, POOL_MULTIPLIER = 4.0, 4.0, 2.0
+READ_FLOOR, CONNECT_FLOOR, POOL_FLOOR = 2.0, 0.5, 0.5
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling GitHub while an endpoint class's circuit is open."""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"GitHub {endpoint} calls are failing; not calling upstream for now")
+        self.endpoint = endpoint
+        self.retry_after = max(1, int(retry_after + 0.999))
+        self.detail = str(self)
+
+
+def _clamp(value: float, floor: float, ceiling: float) -> float:
+    return min(max(value, floor), ceiling)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = 0.5, window: int = 20, min_calls: int = 10,
+                 slow_call: float = 10.0, open_seconds: float = 30.0, read_timeout: float = 30.0,
+                 connect_timeout: float = 5.0, pool_timeout: float = 5.0, samples: int = 200):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        self.ceilings = (read_timeout, connect_timeout, pool_timeout)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = failed
+        self._latencies: Deque[float] = deque(maxlen=samples)
+        self._since_recompute = 0
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=pool_timeout)
+
+    def allow(self) -> None:
+        """Admit one call, or raise CircuitOpen."""
+        if self.state == OPEN:
+            wait = self.opened_at + self.open_seconds - time.monotonic()
+            if wait > 0:
+                self.rejected += 1
+                raise CircuitOpen(self.name, wait)
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpen(self.name, 1.0)
+            self._probing = True
+
+    def record(self, seconds: float, failed: bool) -> None:
+        """Report how an admitted call went."""
+        if not failed:
+            self._observe(seconds)
+        failed = failed or seconds > self.slow_call
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if failed:
+                self._trip()
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) >= self.failure_rate * len(self._outcomes):
+            self._trip()
+
+    def abandon(self) -> None:
+        """An admitted call ended without an outcome (e.g. it was cancelled)."""
+        self._probing = False
+
+    def reset(self) -> None:
+        """Close the circuit and forget recent outcomes (latency samples are kept)."""
+        self.state = CLOSED
+        self._probing = False
+        self._outcomes.clear()
+
+    def _trip(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.opened += 1
+        self._outcomes.clear()
+
+    def _observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+        self._since_recompute += 1
+        if self._since_recompute >= RECOMPUTE_EVERY and len(self._latencies) >= MIN_SAMPLES:
+            self._since_recompute = 0
+            p50, p99 = self.percentile(50), self.percentile(99)
+            read, connect, pool = self.ceilings
+            self.timeout = httpx.Timeout(
+                _clamp(p99 * READ_MULTIPLIER, READ_FLOOR, read),
+                connect=_clamp(p50 * CONNECT_MULTIPLIER, CONNECT_FLOOR, connect),
+                pool=_clamp(p99 * POOL_MULTIPLIER, POOL_FLOOR, pool),
+            )
+
+    def percentile(self, p: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def stats(self) -> dict:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "failure_rate": round(sum(self._outcomes) / calls, 3) if calls else 0.0,
+            "calls": calls,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "latency_p50": round(self.percentile(50), 4),
+            "latency_p99": round(self.percentile(99), 4),
+            "timeouts": {"connect": self.timeout.connect, "read": self.timeout.read, "pool": self.timeout.pool},
+        }
@@ -0,0 +1,136 @@
+# app/cache.py
+"""
+In-memory response cache for GitHub reads.
+
+Entries keep the upstream body (already projected to IssueOut) together with its validators (ETag,
+Last-Modified) and Link header. Eviction is LRU and bounded by both entry
+count and total body bytes; freshness is a TTL plus a stale-while-revalidate
+window during which the stale copy is served while a refresh runs.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "last_modified", "link", "fetched_at", "params")
+
+    def __init__(self, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 link: Optional[str] = None, params: Optional[Dict[str, Any]] = None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.link = link
+        self.params = params
+        self.fetched_at = time.time()  # wall clock, so entries can be shared between workers
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.time()) - self.fetched_at
+
+
+class ResponseCache:
+    """LRU cache bounded by entry count and bytes, with TTL + stale-while-revalidate."""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024,
+                 ttl: float = 15.0, stale_ttl: float = 45.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0  # fresh entries
+        self.stale = 0  # past the TTL, inside the stale-while-revalidate window
+        self.misses = 0  # absent or expired
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry (fresh or not) and mark it most recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._count(entry)
+        return entry
+
+    def _count(self, entry: CacheEntry) -> None:
+        if self.is_fresh(entry):
+            self.hits += 1
+        elif self.is_servable_stale(entry):
+            self.stale += 1
+        else:
+            self.misses += 1
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry without touching LRU order or hit/miss counters."""
+        return self._entries.get(key)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age() <= self.ttl
+
+    def is_servable_stale(self, entry: CacheEntry) -> bool:
+        """True while the entry is past its TTL but inside the stale-while-revalidate window."""
+        return self.ttl < entry.age() <= self.ttl + self.stale_ttl
+
+    def put(self, key: str, entry: CacheEntry) -> CacheEntry:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        if entry.size > self.max_bytes:
+            return entry
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self._evict()
+        return entry
+
+    def touch(self, key: str, entry: CacheEntry) -> CacheEntry:
+        """Mark an entry as just revalidated (e.g. after an upstream 304)."""
+        entry.fetched_at = time.time()
+        if self._entries.get(key) is not entry:
+            return self.put(key, entry)
+        self._entries.move_to_end(key)
+        return entry
+
+    def pop(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+        return entry
+
+    def invalidate_where(self, predicate: Callable[[CacheEntry], bool]) -> int:
+        """Drop every entry the predicate selects; returns how many were removed."""
+        doomed = [key for key, entry in self._entries.items() if predicate(entry)]
+        for key in doomed:
+            self.pop(key)
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,75 @@
+# app/changes.py
+"""
+Opaque cursors for the delta-sync endpoint (GET /issues/changes).
+
+A cursor records the newest ``updated_at`` handed out so far together with
+the issues already returned inside an overlap window before it. The next
+poll asks GitHub for ``since = newest - overlap`` (``sort=updated``,
+ascending) and drops issues whose number and ``updated_at`` were already
+seen. That covers ties - several issues updated within the same second as
+the cursor - and updates that become visible in GitHub's listing slightly
+after later ones. Only GitHub's own timestamps are compared, so the
+gateway's clock never matters. Delivery is at-least-once: if more issues
+than MAX_SEEN changed inside one window a few may be returned twice.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+
+MAX_SEEN = 1000
+
+
+def _parse(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+def _format(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class ChangeCursor:
+    __slots__ = ("newest", "seen")
+
+    def __init__(self, newest: Optional[str] = None, seen: Optional[Dict[int, str]] = None):
+        self.newest = newest  # GitHub updated_at of the newest issue returned, None before the first sync
+        self.seen = seen or {}  # issue number -> updated_at, for issues inside the overlap window
+
+    def encode(self) -> str:
+        raw = orjson.dumps({"t": self.newest, "s": {str(n): u for n, u in self.seen.items()}})
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: Optional[str]) -> "ChangeCursor":
+        if not cursor:
+            return cls()
+        try:
+            data = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            newest = data["t"]
+            if newest is not None:
+                _parse(newest)
+            return cls(newest, {int(n): u for n, u in data["s"].items()})
+        except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def since(self, overlap: float) -> Optional[str]:
+        """The ``since`` to ask GitHub for: the cursor moved back by the overlap window."""
+        if self.newest is None:
+            return None
+        return _format(_parse(self.newest) - timedelta(seconds=overlap))
+
+    def advance(self, issues: Iterable[dict], overlap: float) -> Tuple[List[dict], "ChangeCursor"]:
+        """Split a page (sorted by updated_at) into unseen issues and the cursor after it."""
+        fresh = [i for i in issues if self.seen.get(i["number"]) != i["updated_at"]]
+        newest = max([self.newest] + [i["updated_at"] for i in fresh if i["updated_at"]], key=lambda t: t or "")
+        if newest is None:
+            return fresh, self
+        floor = _format(_parse(newest) - timedelta(seconds=overlap))
+        seen = {n: u for n, u in self.seen.items() if u >= floor}
+        seen.update((i["number"], i["updated_at"]) for i in fresh if i["updated_at"] and i["updated_at"] >= floor)
+        if len(seen) > MAX_SEEN:
+            seen = dict(sorted(seen.items(), key=lambda item: item[1])[-MAX_SEEN:])
+        return fresh, ChangeCursor(newest, seen)
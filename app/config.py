@@ -1,16 +1,24 @@
 # app/config.py
 # code by Nikhil Manam
+from functools import lru_cache
 from pydantic import BaseModel, Field
 import os
 from pathlib import Path
 
-# Load .env from the project root: issues-gw/.env
-try:
-    from dotenv import load_dotenv
-    ROOT = Path(__file__).resolve().parents[1]   # .../issues-gw
-    load_dotenv(dotenv_path=ROOT / ".env", override=True)
-except Exception:
-    pass
+ROOT = Path(__file__).resolve().parents[1]   # .../issues-gw
+
+
+def _load_dotenv() -> None:
+    # Load .env from the project root: issues-gw/.env (only when settings are first read, not on import)
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path=ROOT / ".env", override=True)
+    except Exception:
+        pass
+
+
+def _env_bool(name: str, default: str = 'false') -> bool:
+    return os.getenv(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
 
 
 class Settings(BaseModel):
@@ -19,9 +27,88 @@ class Settings(BaseModel):
     github_repo: str = Field(default_factory=lambda: os.getenv('GITHUB_REPO', ''))
     webhook_secret: str = Field(default_factory=lambda: os.getenv('WEBHOOK_SECRET', ''))
     port: int = Field(default_factory=lambda: int(os.getenv('PORT', '8080')))
+    # GitHub API root; point at GitHub Enterprise or a local stand-in (benchmarks/fake_github.py)
+    github_api_url: str = Field(default_factory=lambda: os.getenv('GITHUB_API_URL', 'https://api.github.com'))
+    # Other repositories served under /repos/{owner}/{repo}: allowlist (repos with their own token are served too;
+    # nothing else) and per-repo tokens, e.g. GITHUB_REPO_TOKENS="acme/api=ghp_x,acme/*=ghp_y"; one pooled client per token, idle ones closed
+    github_repos: str = Field(default_factory=lambda: os.getenv('GITHUB_REPOS', ''))
+    github_repo_tokens: str = Field(default_factory=lambda: os.getenv('GITHUB_REPO_TOKENS', ''))
+    github_clients_max: int = Field(default_factory=lambda: int(os.getenv('GITHUB_CLIENTS_MAX', '32')))
+    github_client_idle_ttl: float = Field(default_factory=lambda: float(os.getenv('GITHUB_CLIENT_IDLE_TTL', '600')))
+    # Shared upstream connection pool (one per process)
+    http_max_connections: int = Field(default_factory=lambda: int(os.getenv('HTTP_MAX_CONNECTIONS', '100')))
+    http_max_keepalive: int = Field(default_factory=lambda: int(os.getenv('HTTP_MAX_KEEPALIVE', '20')))
+    http_keepalive_expiry: float = Field(default_factory=lambda: float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30')))
+    # Timeout ceilings; the actual per-call timeouts follow observed upstream latency (see app.breaker)
+    http_timeout: float = Field(default_factory=lambda: float(os.getenv('HTTP_TIMEOUT', '30')))
+    http_connect_timeout: float = Field(default_factory=lambda: float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')))
+    http_pool_timeout: float = Field(default_factory=lambda: float(os.getenv('HTTP_POOL_TIMEOUT', '5')))
+    http2: bool = Field(default_factory=lambda: _env_bool('HTTP2'))
+    # Circuit breaker per endpoint class (reads, writes, GraphQL)
+    breaker_failure_rate: float = Field(default_factory=lambda: float(os.getenv('BREAKER_FAILURE_RATE', '0.5')))
+    breaker_window: int = Field(default_factory=lambda: int(os.getenv('BREAKER_WINDOW', '20')))
+    breaker_min_calls: int = Field(default_factory=lambda: int(os.getenv('BREAKER_MIN_CALLS', '10')))
+    breaker_slow_call: float = Field(default_factory=lambda: float(os.getenv('BREAKER_SLOW_CALL', '10')))
+    breaker_open_seconds: float = Field(default_factory=lambda: float(os.getenv('BREAKER_OPEN_SECONDS', '30')))
+    # Response cache for GET /issues and GET /issues/{number}
+    cache_max_entries: int = Field(default_factory=lambda: int(os.getenv('CACHE_MAX_ENTRIES', '1000')))
+    cache_max_bytes: int = Field(default_factory=lambda: int(os.getenv('CACHE_MAX_BYTES', str(16 * 1024 * 1024))))
+    cache_ttl: float = Field(default_factory=lambda: float(os.getenv('CACHE_TTL', '15')))
+    cache_stale_ttl: float = Field(default_factory=lambda: float(os.getenv('CACHE_STALE_TTL', '45')))
+    # Cached comment threads sync incrementally (since + ETag); a full refetch every N seconds drops deleted comments
+    comments_resync_interval: float = Field(
+        default_factory=lambda: float(os.getenv('COMMENTS_RESYNC_INTERVAL', '3600')))
+    # GET /issues/changes re-reads this many seconds before its cursor to catch ties and late-visible updates
+    changes_overlap: float = Field(default_factory=lambda: float(os.getenv('CHANGES_OVERLAP', '10')))
+    # Rate-limit scheduler: keep the last N calls of the budget for higher priorities
+    rate_limit_read_reserve: int = Field(default_factory=lambda: int(os.getenv('RATE_LIMIT_READ_RESERVE', '50')))
+    rate_limit_bulk_reserve: int = Field(default_factory=lambda: int(os.getenv('RATE_LIMIT_BULK_RESERVE', '500')))
+    rate_limit_max_wait: float = Field(default_factory=lambda: float(os.getenv('RATE_LIMIT_MAX_WAIT', '10')))
+    rate_limit_retries: int = Field(default_factory=lambda: int(os.getenv('RATE_LIMIT_RETRIES', '2')))
+    # Idempotency-Key on POST /issues and POST /issues/{number}/comments: replay window, bound, and how long a
+    # duplicate waits for the original request still in flight
+    idempotency_ttl: float = Field(default_factory=lambda: float(os.getenv('IDEMPOTENCY_TTL', '86400')))
+    idempotency_max_entries: int = Field(default_factory=lambda: int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000')))
+    idempotency_wait: float = Field(default_factory=lambda: float(os.getenv('IDEMPOTENCY_WAIT', '30')))
+    # Batch write endpoints
+    batch_concurrency: int = Field(default_factory=lambda: int(os.getenv('BATCH_CONCURRENCY', '8')))
+    batch_max_items: int = Field(default_factory=lambda: int(os.getenv('BATCH_MAX_ITEMS', '1000')))
+    # Webhook ingestion pipeline
+    webhook_queue_size: int = Field(default_factory=lambda: int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000')))
+    webhook_drain_timeout: float = Field(default_factory=lambda: float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '10')))
+    # GitHub caps deliveries at 25 MB; bodies this large are hashed in a worker thread
+    webhook_max_bytes: int = Field(default_factory=lambda: int(os.getenv('WEBHOOK_MAX_BYTES', str(25 * 1024 * 1024))))
+    webhook_hmac_offload_bytes: int = Field(
+        default_factory=lambda: int(os.getenv('WEBHOOK_HMAC_OFFLOAD_BYTES', str(1024 * 1024))))
+    webhook_dedupe_max: int = Field(default_factory=lambda: int(os.getenv('WEBHOOK_DEDUPE_MAX', '100000')))
+    webhook_dedupe_ttl: float = Field(default_factory=lambda: float(os.getenv('WEBHOOK_DEDUPE_TTL', '86400')))
+    webhook_events_capacity: int = Field(default_factory=lambda: int(os.getenv('WEBHOOK_EVENTS_CAPACITY', '100')))
+    # GET /events/stream (SSE): frames buffered per subscriber before it is dropped, connection cap, keep-alive
+    events_stream_queue: int = Field(default_factory=lambda: int(os.getenv('EVENTS_STREAM_QUEUE', '256')))
+    events_stream_max_subscribers: int = Field(
+        default_factory=lambda: int(os.getenv('EVENTS_STREAM_MAX_SUBSCRIBERS', '10000')))
+    events_stream_heartbeat: float = Field(default_factory=lambda: float(os.getenv('EVENTS_STREAM_HEARTBEAT', '15')))
+    # Durable webhook history for /events (disabled when EVENT_LOG_DIR is empty)
+    event_log_dir: str = Field(default_factory=lambda: os.getenv('EVENT_LOG_DIR', ''))
+    event_log_segment_bytes: int = Field(
+        default_factory=lambda: int(os.getenv('EVENT_LOG_SEGMENT_BYTES', str(64 * 1024 * 1024))))
+    event_log_retention_days: float = Field(default_factory=lambda: float(os.getenv('EVENT_LOG_RETENTION_DAYS', '30')))
+    event_log_fsync: bool = Field(default_factory=lambda: _env_bool('EVENT_LOG_FSYNC'))
+    # Where cache, webhook dedupe/events and rate budget live: "memory" (per process) or "sqlite" (shared by workers)
+    state_backend: str = Field(default_factory=lambda: os.getenv('STATE_BACKEND', 'memory'))
+    state_db_path: str = Field(default_factory=lambda: os.getenv('STATE_DB_PATH', 'issues-gw-state.db'))
+    # Longest a required write (dedupe, events, idempotency) waits for another worker's lock, in seconds;
+    # it runs on the event loop. Cache and rate-limit bookkeeping writes are skipped instead of waiting
+    state_db_busy_timeout: float = Field(default_factory=lambda: float(os.getenv('STATE_DB_BUSY_TIMEOUT', '1.0')))
+    # Diagnostics: Server-Timing response header, and admin endpoints (disabled when ADMIN_TOKEN is empty)
+    server_timing: bool = Field(default_factory=lambda: _env_bool('SERVER_TIMING', 'true'))
+    admin_token: str = Field(default_factory=lambda: os.getenv('ADMIN_TOKEN', ''))
+    # Serve issue reads from a local replica kept fresh by webhooks
+    mirror_mode: bool = Field(default_factory=lambda: _env_bool('MIRROR_MODE'))
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    s = Settings()
-    print(">>> Loaded settings:", {k: ('***' if 'token' in k else v) for k, v in s.model_dump().items()})
-    return s
+    """Settings from the environment (and .env), read once per process."""
+    _load_dotenv()
+    return Settings()
@@ -0,0 +1,291 @@
+# app/eventlog.py
+"""
+Durable, append-only log of verified webhook deliveries (EVENT_LOG_DIR).
+
+The log is a directory of segments. Each segment is a pair of files named
+after the sequence number of its first record:
+
+* ``<base>.log`` - records of ``[meta_len u32][payload_len u32][meta][payload]``,
+  where meta is a small JSON object and payload is the raw delivery body.
+* ``<base>.idx`` - one fixed-size entry per record (sequence number, receive
+  time, offset, lengths, issue number, event type and action).
+
+Sequence numbers are contiguous inside a segment, so a cursor seeks straight
+to its index entry, and filters are evaluated on the index (event type and
+action names are stored cut to 24 bytes, so a name that long is confirmed
+against the record's meta). Both files are read through ``mmap``, so
+queries touch only the pages they need and weeks of history never have to
+sit in RAM. A filtered query can still walk many index entries, so the
+route runs it in a worker thread while the event loop keeps appending: a
+query works on a snapshot of the segment list, and mappings it holds are
+released, not closed, when a segment grows or is deleted. Segments rotate at a size limit
+and whole segments are deleted once they fall outside the retention window.
+A directory has a single writer: the log holds an exclusive lock on it, so
+with several workers each one needs its own EVENT_LOG_DIR.
+"""
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+from .webhook_store import EventRecord
+
+# seq, received_at, offset, meta_len, payload_len, issue_number (-1 = none), event, action
+INDEX = struct.Struct("<QdQIIq24s24s")
+HEADER = struct.Struct("<II")
+_FIELD = 24
+
+
+def _field(value: Optional[str]) -> bytes:
+    return (value or "").encode()[:_FIELD]
+
+
+def _meta(log: mmap.mmap, offset: int, meta_len: int) -> dict:
+    start = offset + HEADER.size
+    return orjson.loads(log[start:start + meta_len])
+
+
+class _Segment:
+    __slots__ = ("base_seq", "log_path", "idx_path", "count", "log_size", "last_ts", "_maps")
+
+    def __init__(self, directory: str, base_seq: int):
+        self.base_seq = base_seq
+        self.log_path = os.path.join(directory, f"{base_seq:016d}.log")
+        self.idx_path = os.path.join(directory, f"{base_seq:016d}.idx")
+        self.count = 0
+        self.log_size = 0
+        self.last_ts = 0.0
+        self._maps: Optional[Tuple[mmap.mmap, mmap.mmap, int]] = None
+
+    @property
+    def next_seq(self) -> int:
+        return self.base_seq + self.count
+
+    def recover(self) -> None:
+        """Drop torn writes: a partial index entry, or log bytes no index entry points to."""
+        idx_size = os.path.getsize(self.idx_path) if os.path.exists(self.idx_path) else 0
+        self.count = idx_size // INDEX.size
+        if idx_size % INDEX.size:
+            with open(self.idx_path, "r+b") as f:
+                f.truncate(self.count * INDEX.size)
+        self.log_size = 0
+        if self.count:
+            with open(self.idx_path, "rb") as f:
+                f.seek((self.count - 1) * INDEX.size)
+                _, ts, offset, meta_len, payload_len, _, _, _ = INDEX.unpack(f.read(INDEX.size))
+            self.last_ts = ts
+            self.log_size = offset + HEADER.size + meta_len + payload_len
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) != self.log_size:
+            with open(self.log_path, "r+b") as f:
+                f.truncate(self.log_size)
+
+    def maps(self) -> Optional[Tuple[mmap.mmap, mmap.mmap, int]]:
+        """Read-only mappings of (index, log) and the record count they cover; remapped when the segment grows.
+
+        Superseded mappings are dropped rather than closed: a query thread
+        may still be reading them, and they close once it lets go.
+        """
+        count, maps = self.count, self._maps
+        if count == 0:
+            return None
+        if maps is None or maps[2] != count:
+            with open(self.idx_path, "rb") as fi, open(self.log_path, "rb") as fl:
+                maps = self._maps = (
+                    mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ),
+                    mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ),
+                    count,
+                )
+        return maps
+
+    def unmap(self) -> None:
+        if self._maps is not None:
+            self._maps[0].close()
+            self._maps[1].close()
+            self._maps = None
+
+    def delete(self) -> None:
+        self._maps = None  # see maps()
+        for path in (self.log_path, self.idx_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _record(log: mmap.mmap, seq: int, ts: float, offset: int, meta_len: int, payload_len: int, number: int,
+            include_payload: bool = False, meta: Optional[dict] = None) -> dict:
+    start = offset + HEADER.size
+    meta = _meta(log, offset, meta_len) if meta is None else meta
+    record = EventRecord(meta.get("id"), meta.get("event", ""), meta.get("action", ""),
+                         None if number < 0 else number, payload_len, ts, seq=seq).to_dict()
+    if include_payload:
+        raw = log[start + meta_len:start + meta_len + payload_len]
+        try:
+            record["payload"] = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            record["payload"] = raw.decode("utf-8", "replace")
+    return record
+
+
+class EventLog:
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 retention_seconds: float = 30 * 24 * 3600, fsync: bool = False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention_seconds = retention_seconds
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._lock = open(os.path.join(directory, "LOCK"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock.close()
+                raise RuntimeError(f"Event log {directory} is already open in another process") from None
+
+        bases = sorted({int(name.split(".")[0]) for name in os.listdir(directory)
+                        if name.endswith((".log", ".idx")) and name.split(".")[0].isdigit()})
+        self.segments: List[_Segment] = []
+        for base in bases:
+            segment = _Segment(directory, base)
+            segment.recover()
+            self.segments.append(segment)
+        if not self.segments:
+            self.segments.append(_Segment(directory, 1))
+        self._open_active()
+        self._apply_retention()
+
+    def _open_active(self) -> None:
+        active = self.segments[-1]
+        self._log = open(active.log_path, "ab")
+        self._idx = open(active.idx_path, "ab")
+
+    @property
+    def next_seq(self) -> int:
+        return self.segments[-1].next_seq
+
+    def append(self, delivery_id: Optional[str], event: str, action: str, issue_number: Optional[int],
+               payload: bytes, received_at: Optional[float] = None) -> int:
+        """Durably record one delivery; returns its sequence number."""
+        active = self.segments[-1]
+        if active.count and active.log_size >= self.segment_bytes:
+            self._rotate()
+            active = self.segments[-1]
+
+        seq = active.next_seq
+        ts = time.time() if received_at is None else received_at
+        meta = orjson.dumps({"id": delivery_id, "event": event, "action": action})
+        offset = active.log_size
+        # Log first, index second: an index entry never points at bytes that were not written
+        self._log.write(HEADER.pack(len(meta), len(payload)) + meta + payload)
+        self._log.flush()
+        self._idx.write(INDEX.pack(seq, ts, offset, len(meta), len(payload),
+                                   -1 if issue_number is None else issue_number, _field(event), _field(action)))
+        self._idx.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+            os.fsync(self._idx.fileno())
+        active.count += 1
+        active.log_size = offset + HEADER.size + len(meta) + len(payload)
+        active.last_ts = ts
+        return seq
+
+    def _rotate(self) -> None:
+        self._log.close()
+        self._idx.close()
+        self.segments.append(_Segment(self.directory, self.next_seq))
+        self._open_active()
+        self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        # Never delete the active segment
+        while len(self.segments) > 1 and self.segments[0].last_ts < cutoff:
+            self.segments.pop(0).delete()
+
+    def query(self, before: Optional[int] = None, limit: int = 50, event: Optional[str] = None,
+              action: Optional[str] = None, issue_number: Optional[int] = None,
+              include_payload: bool = False) -> Tuple[List[dict], Optional[int]]:
+        """Newest-first records with ``seq < before`` matching the filters.
+
+        Returns the records and the cursor for the next page (None when this
+        page was not full, i.e. there is nothing older to fetch). Safe to call
+        from a worker thread while the event loop appends.
+        """
+        want_event = _field(event) if event else None
+        want_action = _field(action) if action else None
+        # Names cut short in the index only match if the record's meta agrees
+        check_meta = (want_event is not None and len(want_event) == _FIELD) or (
+            want_action is not None and len(want_action) == _FIELD)
+        segments = list(self.segments)
+        upper = segments[-1].next_seq if before is None else min(before, segments[-1].next_seq)
+        results: List[dict] = []
+        for segment in reversed(segments):
+            if segment.base_seq >= upper:
+                continue
+            try:
+                maps = segment.maps()
+            except FileNotFoundError:  # deleted by retention since the snapshot
+                continue
+            if maps is None:
+                continue
+            idx, log, count = maps
+            for pos in range(min(count, upper - segment.base_seq) - 1, -1, -1):
+                seq, ts, offset, meta_len, payload_len, number, ev, act = INDEX.unpack_from(idx, pos * INDEX.size)
+                if want_event is not None and ev.rstrip(b"\0") != want_event:
+                    continue
+                if want_action is not None and act.rstrip(b"\0") != want_action:
+                    continue
+                if issue_number is not None and number != issue_number:
+                    continue
+                meta = None
+                if check_meta:
+                    meta = _meta(log, offset, meta_len)
+                    if (event and meta.get("event") != event) or (action and meta.get("action") != action):
+                        continue
+                results.append(_record(log, seq, ts, offset, meta_len, payload_len, number, include_payload, meta))
+                if len(results) >= limit:
+                    return results, seq
+        return results, None
+
+    def after(self, seq: int, limit: int = 500) -> List[dict]:
+        """Up to ``limit`` records with a sequence number above ``seq``, oldest first (thread-safe, as ``query``)."""
+        results: List[dict] = []
+        for segment in list(self.segments):
+            if segment.next_seq <= seq + 1:
+                continue
+            try:
+                maps = segment.maps()
+            except FileNotFoundError:  # deleted by retention since the snapshot
+                continue
+            if maps is None:
+                continue
+            idx, log, count = maps
+            for pos in range(max(0, seq + 1 - segment.base_seq), count):
+                fields = INDEX.unpack_from(idx, pos * INDEX.size)
+                results.append(_record(log, *fields[:6]))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self.segments),
+            "records": sum(s.count for s in self.segments),
+            "bytes": sum(s.log_size + s.count * INDEX.size for s in self.segments),
+            "first_seq": self.segments[0].base_seq,
+            "next_seq": self.next_seq,
+        }
+
+    def close(self) -> None:
+        self._log.close()
+        self._idx.close()
+        for segment in self.segments:
+            segment.unmap()
+        self._lock.close()
@@ -0,0 +1,113 @@
+# app/eventstream.py
+"""
+Live fan-out of verified webhook deliveries for ``GET /events/stream`` (SSE).
+
+The webhook workers publish every new (deduplicated) delivery once; it is
+encoded as one SSE frame and handed to each matching subscriber's bounded
+queue without waiting. A subscriber that falls EVENTS_STREAM_QUEUE frames
+behind is dropped: its queue is cleared and its stream ends, and the client
+reconnects with ``Last-Event-ID`` to replay what it missed from history
+(the event log or the recent-events buffer). Subscribers are indexed by
+event type, so a delivery only touches the streams that want it.
+
+Deliveries are published by the process that handles them: with several
+workers on the sqlite backend a stream sees its own worker's deliveries
+live, and the rest on its next resume.
+"""
+import asyncio
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+import orjson
+
+from .webhook_store import EventRecord
+
+# (seq, frame) pairs; None ends the stream
+Frame = Optional[Tuple[int, bytes]]
+
+
+def sse_frame(event: dict) -> bytes:
+    return b"id: %d\ndata: %s\n\n" % (event["seq"], orjson.dumps(event))
+
+
+class Subscriber:
+    __slots__ = ("queue", "events", "action", "issue_number", "dropped")
+
+    def __init__(self, max_queue: int, events: FrozenSet[str], action: Optional[str], issue_number: Optional[int]):
+        self.queue: "asyncio.Queue[Frame]" = asyncio.Queue(maxsize=max_queue + 1)  # +1 for the final None
+        self.events = events  # empty = every event type
+        self.action = action
+        self.issue_number = issue_number
+        self.dropped = False
+
+    def matches(self, event: dict) -> bool:
+        return ((not self.events or event["event"] in self.events)
+                and (self.action is None or event["action"] == self.action)
+                and (self.issue_number is None or event["issue_number"] == self.issue_number))
+
+    def _end(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = 256, max_subscribers: int = 10_000):
+        self.queue_size = max(1, queue_size)
+        self.max_subscribers = max_subscribers
+        self._by_event: Dict[Optional[str], Set[Subscriber]] = {}  # None = subscribed to every type
+        self.subscribers = 0
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, events: FrozenSet[str] = frozenset(), action: Optional[str] = None,
+                  issue_number: Optional[int] = None) -> Optional[Subscriber]:
+        """A new subscriber, or None when EVENTS_STREAM_MAX_SUBSCRIBERS are already connected."""
+        if self.subscribers >= self.max_subscribers:
+            return None
+        sub = Subscriber(self.queue_size, events, action, issue_number)
+        for key in events or (None,):
+            self._by_event.setdefault(key, set()).add(sub)
+        self.subscribers += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        removed = False
+        for key in sub.events or (None,):
+            bucket = self._by_event.get(key)
+            if bucket is not None and sub in bucket:
+                bucket.discard(sub)
+                removed = True
+                if not bucket:
+                    del self._by_event[key]
+        if removed:
+            self.subscribers -= 1
+
+    def publish(self, record: EventRecord) -> None:
+        """Hand one delivery to every matching subscriber; never blocks."""
+        targets: List[Subscriber] = [*self._by_event.get(None, ()), *self._by_event.get(record.event, ())]
+        if not targets:
+            return
+        self.published += 1
+        event = record.to_dict()
+        frame = (record.seq, sse_frame(event))
+        for sub in targets:
+            if not sub.matches(event):
+                continue
+            if sub.queue.qsize() >= self.queue_size:
+                # Slow consumer: end its stream rather than buffer without bound; it resumes from Last-Event-ID
+                sub.dropped = True
+                self.dropped += 1
+                self.unsubscribe(sub)
+                sub._end()
+                continue
+            sub.queue.put_nowait(frame)
+
+    def close(self) -> None:
+        """End every stream (server shutdown)."""
+        for sub in {sub for bucket in self._by_event.values() for sub in bucket}:
+            self.unsubscribe(sub)
+            sub._end()
+
+    def stats(self) -> dict:
+        return {"subscribers": self.subscribers, "max_subscribers": self.max_subscribers,
+                "queue_size": self.queue_size, "published": self.published, "dropped": self.dropped}
@@ -1,44 +1,203 @@
+import asyncio
+import copy
+import hashlib
+import importlib.util
+import json
+import time
+from typing import Optional
+
 import httpx
-from .config import get_settings
+from fastapi import Request
+
+from .breaker import CircuitBreaker
+from .config import Settings, get_settings
+from . import timing
+from .metrics import UPSTREAM_DURATION, UPSTREAM_ERRORS
+from .ratelimit import Priority, RateLimited, RateLimitScheduler
+from .singleflight import SingleFlight
 
 BASE = 'https://api.github.com'
 HEADERS = {'Accept': 'application/vnd.github+json'}
+# Calls that fail together share a circuit breaker; anything unlisted counts as a read
+ENDPOINT_CLASSES = {
+    'create_issue': 'write', 'update_issue': 'write', 'create_comment': 'write', 'graphql': 'graphql',
+}
+
+
+def _http2_available() -> bool:
+    # httpx only speaks HTTP/2 when the optional "h2" package is installed
+    return importlib.util.find_spec('h2') is not None
+
+
+class _Connections:
+    """The pooled httpx client, built on first use: its TLS context costs tens of ms at startup."""
+
+    __slots__ = ('options', 'client')
+
+    def __init__(self, **options):
+        self.options = options
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def get(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(**self.options)
+        return self.client
 
 
 class GitHubClient:
-    def __init__(self):
-        s = get_settings()
-        self.client = httpx.AsyncClient(
-            headers={**HEADERS, 'Authorization': f'Bearer {s.github_token}'}, timeout=30
+    """Thin async wrapper over the GitHub Issues REST API.
+
+    One instance is created per process by the app lifespan and shared by all
+    requests, so connections to api.github.com are pooled and kept alive.
+    Identical concurrent reads are coalesced into a single upstream call, and
+    every call is admitted by the rate-limit scheduler according to its priority.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None, rate: Optional[RateLimitScheduler] = None,
+                 token: Optional[str] = None):
+        s = settings or get_settings()
+        limits = httpx.Limits(
+            max_connections=s.http_max_connections,
+            max_keepalive_connections=s.http_max_keepalive,
+            keepalive_expiry=s.http_keepalive_expiry,
         )
+        # Shared with for_repo() views, so they use the same pool
+        self._connections = _Connections(
+            headers={**HEADERS, 'Authorization': f'Bearer {token or s.github_token}'},
+            timeout=s.http_timeout,
+            limits=limits,
+            http2=s.http2 and _http2_available(),
+        )
+        self.base = s.github_api_url.rstrip('/') or BASE
         self.owner = s.github_owner
         self.repo = s.github_repo
+        self.flights = SingleFlight()
+        # The state backend may hand in a scheduler whose budget is shared by every worker
+        self.rate = rate or RateLimitScheduler(
+            read_reserve=s.rate_limit_read_reserve,
+            bulk_reserve=s.rate_limit_bulk_reserve,
+            max_wait=s.rate_limit_max_wait,
+        )
+        self.rate_limit_retries = s.rate_limit_retries
+        self.breakers = {
+            name: CircuitBreaker(
+                name, failure_rate=s.breaker_failure_rate, window=s.breaker_window, min_calls=s.breaker_min_calls,
+                slow_call=s.breaker_slow_call, open_seconds=s.breaker_open_seconds, read_timeout=s.http_timeout,
+                connect_timeout=s.http_connect_timeout, pool_timeout=s.http_pool_timeout,
+            )
+            for name in ('read', 'write', 'graphql')
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._connections.get()
+
+    def for_repo(self, owner: str, repo: str) -> 'GitHubClient':
+        """A view of this client bound to another repository (same pool, budget and coalescing)."""
+        view = copy.copy(self)
+        view.owner, view.repo = owner, repo
+        return view
 
     def _repo(self) -> str:
-        return f"{BASE}/repos/{self.owner}/{self.repo}"
+        return f"{self.base}/repos/{self.owner}/{self.repo}"
+
+    @staticmethod
+    def _flight_key(url: str, params: dict = None, headers: dict = None) -> str:
+        # Same scheme as the route-level cache key: md5 of the sorted JSON request description
+        raw = json.dumps({"url": url, "params": params or {}, "headers": headers or {}}, sort_keys=True, default=str)
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    async def _send(self, method: str, url: str, priority: Priority, resource: str = 'core',
+                    op: str = 'other', **kwargs) -> httpx.Response:
+        """Send one request through the rate-limit scheduler, retrying secondary-limit rejections.
+
+        ``op`` names the calling method in the upstream latency metrics and
+        picks the circuit breaker, which may refuse the call (CircuitOpen) and
+        sets its timeouts.
+        """
+        breaker = self.breakers[ENDPOINT_CLASSES.get(op, 'read')]
+        for attempt in range(self.rate_limit_retries + 1):
+            with timing.phase('ratelimit'):
+                await self.rate.acquire(priority, resource)
+            breaker.allow()
+            start = time.perf_counter()
+            try:
+                r = await self.client.request(method, url, timeout=breaker.timeout, **kwargs)
+            except httpx.HTTPError as e:
+                breaker.record(time.perf_counter() - start, failed=True)
+                UPSTREAM_ERRORS.inc(op, type(e).__name__)
+                raise
+            except BaseException:
+                breaker.abandon()
+                raise
+            finally:
+                timing.record('upstream', time.perf_counter() - start)
+            elapsed = time.perf_counter() - start
+            breaker.record(elapsed, failed=r.status_code >= 500)
+            UPSTREAM_DURATION.observe(elapsed, op, r.status_code)
+            self.rate.update(r)
+            delay = self.rate.retry_delay(r, attempt)
+            if delay is None:
+                return r
+            if attempt == self.rate_limit_retries or delay > self.rate.max_wait:
+                raise RateLimited(delay, f"GitHub rate limited the request: {r.text}")
+            await asyncio.sleep(delay)
+        return r
+
+    async def _coalesced_get(self, url: str, params: dict = None, headers: dict = None,
+                             priority: Priority = Priority.READ, op: str = 'other'):
+        key = self._flight_key(url, params, headers)
+        return await self.flights.do(
+            key, lambda: self._send('GET', url, priority, op=op, params=params, headers=headers or {})
+        )
 
     async def create_issue(self, payload: dict):
-        return await self.client.post(f'{self._repo()}/issues', json=payload)
+        return await self._send('POST', f'{self._repo()}/issues', Priority.WRITE, op='create_issue', json=payload)
 
     # ETag support by lordphone
-    async def list_issues(self, params: dict, headers: dict = None):
-        request_headers = headers or {}
-        return await self.client.get(
-            f'{self._repo()}/issues', params=params, headers=request_headers
-        )
+    async def list_issues(self, params: dict, headers: dict = None, priority: Priority = Priority.READ):
+        return await self._coalesced_get(f'{self._repo()}/issues', params=params, headers=headers, priority=priority,
+                                         op='list_issues')
 
-    async def get_issue(self, number: int):
-        return await self.client.get(f'{self._repo()}/issues/{number}')
+    async def get_issue(self, number: int, headers: dict = None):
+        return await self._coalesced_get(f'{self._repo()}/issues/{number}', headers=headers, op='get_issue')
 
     async def update_issue(self, number: int, payload: dict):
-        return await self.client.patch(
-            f'{self._repo()}/issues/{number}', json=payload
+        return await self._send(
+            'PATCH', f'{self._repo()}/issues/{number}', Priority.WRITE, op='update_issue', json=payload
         )
 
+    async def list_comments(self, number: int, params: dict, headers: dict = None):
+        return await self._coalesced_get(f'{self._repo()}/issues/{number}/comments', params=params, headers=headers,
+                                         op='list_comments')
+
     async def create_comment(self, number: int, payload: dict):
-        return await self.client.post(
-            f'{self._repo()}/issues/{number}/comments', json=payload
+        return await self._send(
+            'POST', f'{self._repo()}/issues/{number}/comments', Priority.WRITE, op='create_comment', json=payload
+        )
+
+    async def graphql(self, query: str, variables: dict = None):
+        return await self._send(
+            'POST', f'{self.base}/graphql', Priority.READ, resource='graphql', op='graphql',
+            json={'query': query, 'variables': variables or {}},
         )
 
+    def breaker_stats(self) -> dict:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
     async def close(self):
-        await self.client.aclose()
+        if self._connections.client is not None:
+            await self._connections.client.aclose()
+
+
+async def get_github(request: Request) -> GitHubClient:
+    """FastAPI dependency returning the process-wide client from the lifespan.
+
+    Under ``/repos/{owner}/{repo}`` the client for that repository comes from
+    the registry (app.registry) instead.
+    """
+    owner = request.path_params.get('owner')
+    registry = getattr(request.app.state, 'github_registry', None)
+    if owner is None or registry is None:
+        return request.app.state.github
+    return registry.get(owner, request.path_params['repo'])
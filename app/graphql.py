@@ -0,0 +1,61 @@
+# app/graphql.py
+"""
+Fetch many issues by number with one aliased GitHub GraphQL query.
+
+Results are mapped onto the REST IssueOut shape so callers cannot tell the
+difference; numbers GitHub does not resolve are reported as missing.
+"""
+from typing import Dict, List, Optional, Tuple
+
+# issueOrPullRequest mirrors REST /issues/{number}, which also returns pull requests
+_FIELDS = "number url state title body createdAt updatedAt labels(first: 100) { nodes { name } }"
+_FRAGMENTS = (
+    f"fragment IssueFields on Issue {{ {_FIELDS} }}\n"
+    f"fragment PullFields on PullRequest {{ {_FIELDS} }}\n"
+)
+
+
+def build_issues_query(numbers: List[int]) -> str:
+    aliases = "\n".join(
+        f"    i{n}: issueOrPullRequest(number: {int(n)}) {{ ...IssueFields ...PullFields }}" for n in numbers
+    )
+    return (
+        "query($owner: String!, $repo: String!) {\n"
+        "  repository(owner: $owner, name: $repo) {\n"
+        f"{aliases}\n"
+        "  }\n"
+        "}\n" + _FRAGMENTS
+    )
+
+
+def to_issue_out(node: dict) -> dict:
+    return {
+        "number": node["number"],
+        "html_url": node["url"],
+        # GraphQL states are OPEN / CLOSED / MERGED; REST only knows open and closed
+        "state": "open" if node["state"] == "OPEN" else "closed",
+        "title": node["title"],
+        "body": node.get("body"),
+        "labels": [{"name": label["name"]} for label in (node.get("labels") or {}).get("nodes") or []],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+    }
+
+
+def parse_issues_response(numbers: List[int], payload: dict) -> Tuple[Dict[int, dict], Dict[int, str]]:
+    """Split a GraphQL response into found issues and per-number error messages."""
+    repository: Optional[dict] = (payload.get("data") or {}).get("repository")
+    errors: Dict[int, str] = {}
+    for error in payload.get("errors") or []:
+        path = error.get("path") or []
+        alias = path[1] if len(path) > 1 else None
+        if isinstance(alias, str) and alias.startswith("i") and alias[1:].isdigit():
+            errors[int(alias[1:])] = error.get("message", "Not found")
+    found = {}
+    for n in numbers:
+        node = (repository or {}).get(f"i{n}")
+        if node:
+            found[n] = to_issue_out(node)
+        elif n not in errors:
+            errors[n] = "Issue not found" if repository is not None else "Repository not found"
+    return found, errors
@@ -0,0 +1,170 @@
+# app/idempotency.py
+"""
+``Idempotency-Key`` support for POST /issues and POST /issues/{number}/comments.
+
+The first request with a key claims it and runs; its 201 response is kept
+for IDEMPOTENCY_TTL and replayed byte for byte to every retry with the same
+key, without calling GitHub (``Idempotent-Replayed: true``). A duplicate that
+arrives while the first is still in flight waits for it (up to
+IDEMPOTENCY_WAIT, then 409). Failed attempts release the key so the client
+can retry, and reusing a key with a different body is a 422. Keys are scoped
+to the operation, repository and issue number.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type
+
+import orjson
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+
+from .metrics import IDEMPOTENT_REQUESTS
+
+CLAIMED, PENDING, DONE, MISMATCH = "claimed", "pending", "done", "mismatch"
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse:
+    __slots__ = ("status", "body", "headers")
+
+    def __init__(self, status: int, body: bytes, headers: Dict[str, str]):
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+
+class _Record:
+    __slots__ = ("fingerprint", "response", "expires")
+
+    def __init__(self, fingerprint: str, expires: float):
+        self.fingerprint = fingerprint
+        self.response: Optional[StoredResponse] = None
+        self.expires = expires
+
+
+class IdempotencyStore:
+    """Per-process store of claimed keys and completed responses, LRU-bounded with a TTL."""
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 24 * 3600, pending_ttl: float = 120.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl  # a claim is abandoned after this long (e.g. the worker died)
+        self._records: "OrderedDict[str, _Record]" = OrderedDict()
+        self._done: Dict[str, asyncio.Event] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        """Claim a key, or report it as pending, done (with its response) or used with another body."""
+        now = time.monotonic()
+        self._expire(now)
+        record = self._records.get(key)
+        if record is None or record.expires <= now:
+            self._wake(key)
+            self._records[key] = _Record(fingerprint, now + self.pending_ttl)
+            self._records.move_to_end(key)
+            self._done[key] = asyncio.Event()
+            while len(self._records) > self.max_entries:
+                self._drop(next(iter(self._records)))
+            return CLAIMED, None
+        if record.fingerprint != fingerprint:
+            return MISMATCH, None
+        if record.response is None:
+            return PENDING, None
+        return DONE, record.response
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        record = self._records.get(key)
+        if record is not None:
+            record.response = response
+            record.expires = time.monotonic() + self.ttl
+            self._records.move_to_end(key)
+        self._wake(key)
+
+    def release(self, key: str) -> None:
+        """Forget a claim whose request failed, so a retry runs again."""
+        self._records.pop(key, None)
+        self._wake(key)
+
+    async def wait(self, key: str, timeout: float) -> None:
+        event = self._done.get(key)
+        if event is None:
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _wake(self, key: str) -> None:
+        event = self._done.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def _drop(self, key: str) -> None:
+        self._records.pop(key, None)
+        self._wake(key)
+
+    def _expire(self, now: float) -> None:
+        # Completed records are moved to the end, so expired ones collect at the front
+        while self._records:
+            key, oldest = next(iter(self._records.items()))
+            if oldest.expires > now:
+                break
+            self._drop(key)
+
+    def stats(self) -> dict:
+        pending = sum(1 for record in self._records.values() if record.response is None)
+        return {"entries": len(self), "pending": pending, "capacity": self.max_entries, "ttl_seconds": self.ttl}
+
+
+def fingerprint(payload: dict) -> str:
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+async def run_idempotent(request: Request, scope: str, key: str, payload: dict, model: Type[BaseModel],
+                         create: Callable[[], Awaitable[Tuple[dict, Dict[str, str]]]]) -> Response:
+    """Run ``create`` once per key; returns its 201 (or the stored copy) as a Response.
+
+    ``create`` returns the created resource and extra response headers, and
+    raises HTTPException on failure (which releases the key).
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+    store = getattr(request.app.state, "idempotency", None)
+    if store is None:
+        body, headers = await create()
+        return Response(orjson.dumps(model.model_validate(body).model_dump(mode="json")), 201, headers,
+                        media_type="application/json")
+    settings = request.app.state.settings
+    full_key = f"{scope}:{key}"
+    digest = fingerprint(payload)
+    deadline = time.monotonic() + settings.idempotency_wait
+    while True:
+        state, stored = store.claim(full_key, digest)
+        if state == CLAIMED:
+            break
+        if state == DONE:
+            IDEMPOTENT_REQUESTS.inc("replayed")
+            return Response(stored.body, stored.status, {**stored.headers, "Idempotent-Replayed": "true"},
+                            media_type="application/json")
+        if state == MISMATCH:
+            IDEMPOTENT_REQUESTS.inc("mismatch")
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            IDEMPOTENT_REQUESTS.inc("conflict")
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        await store.wait(full_key, remaining)
+
+    IDEMPOTENT_REQUESTS.inc("new")
+    try:
+        body, headers = await create()
+    except BaseException:
+        store.release(full_key)
+        raise
+    stored = StoredResponse(201, orjson.dumps(model.model_validate(body).model_dump(mode="json")), headers)
+    store.complete(full_key, stored)
+    return Response(stored.body, stored.status, stored.headers, media_type="application/json")
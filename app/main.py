@@ -1,28 +1,162 @@
 # Coded by Dev Mulchandani
-from fastapi import FastAPI
-from fastapi.responses import ORJSONResponse
+"""
+Application factory.
+
+``create_app()`` only wires routes and middleware; everything that does I/O
+or holds resources (settings, state backend, upstream clients, webhook
+workers, event log, mirror) is built by the lifespan when the server starts.
+Run it with ``uvicorn app.main:app`` or ``uvicorn --factory app.main:create_app``.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .config import get_settings
-from .routes import issues, comments, webhook
+from .breaker import CircuitOpen
+from .config import Settings, get_settings
+from .eventstream import EventBroker
+from .github import GitHubClient
+from .metrics import MetricsMiddleware, render
+from .timing import ServerTimingMiddleware, TimedRoute
+from .ratelimit import RateLimited
+from .registry import ClientRegistry
+from .state_backend import create_backend
+from .webhook_pipeline import WebhookPipeline
+from .routes import admin, issues, comments, webhook
 
-app = FastAPI(default_response_class=ORJSONResponse)
-app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_credentials=False, allow_methods=['*'], allow_headers=['*'])
 
 # startup by lordphone
-@app.on_event('startup')
-async def startup():
-    app.state.settings = get_settings()
-    # Initialize webhook storage for idempotency
-    app.state.processed_webhooks = set()
-    app.state.webhook_events = []
-    # Initialize ETag cache for conditional GET
-    app.state.etag_cache = {}
-
-
-@app.get('/healthz')
-async def healthz():
-    return {'status': 'ok'}
-
-app.include_router(issues.router)
-app.include_router(comments.router)
-app.include_router(webhook.router)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settings are read and validated once per server, here (or handed to create_app)
+    app.state.settings = s = getattr(app.state, 'settings', None) or get_settings()
+    # Cache, webhook dedupe/events and rate budget: per process, or shared by all workers (STATE_BACKEND)
+    app.state.backend = backend = create_backend(s)
+    # One pooled upstream client for the whole process (keep-alive, optional HTTP/2)
+    app.state.github = GitHubClient(s, rate=backend.rate_scheduler())
+    # Clients for /repos/{owner}/{repo}/...: one pool and rate budget per token, idle ones closed
+    app.state.github_registry = ClientRegistry(s, app.state.github, backend.rate_scheduler)
+    # Initialize webhook storage for idempotency (bounded by size and TTL)
+    app.state.processed_webhooks = backend.dedupe_store()
+    app.state.webhook_events = backend.event_ring()
+    # Completed POST /issues and POST /issues/{number}/comments, replayed for retried Idempotency-Keys
+    app.state.idempotency = backend.idempotency_store()
+    app.state.event_log = None
+    if s.event_log_dir:
+        from .eventlog import EventLog
+        app.state.event_log = EventLog(
+            s.event_log_dir,
+            segment_bytes=s.event_log_segment_bytes,
+            retention_seconds=s.event_log_retention_days * 24 * 3600,
+            fsync=s.event_log_fsync,
+        )
+    # Subscribers of GET /events/stream, fed by the webhook workers
+    app.state.event_stream = EventBroker(s.events_stream_queue, s.events_stream_max_subscribers)
+    # Response cache (body + ETag/Last-Modified/Link) for conditional GET
+    app.state.issue_cache = backend.response_cache()
+    # Background refreshes of stale cache entries, one per key
+    app.state.cache_revalidations = {}
+    # Optional local replica of all issues (MIRROR_MODE)
+    app.state.mirror = None
+    backfill_task = None
+    if s.mirror_mode:
+        from .mirror import IssueStore, backfill
+        app.state.mirror = IssueStore()
+        backfill_task = asyncio.create_task(backfill(app.state.mirror, app.state.github))
+    # Verified webhook deliveries are acked immediately and handled in arrival order (started on the first one)
+    app.state.webhook_pipeline = WebhookPipeline(
+        lambda job: webhook.handle_delivery(app.state, job),
+        max_queue=s.webhook_queue_size,
+    )
+    try:
+        yield
+    finally:
+        await app.state.webhook_pipeline.drain(s.webhook_drain_timeout)
+        app.state.event_stream.close()
+        if app.state.event_log is not None:
+            app.state.event_log.close()
+        if backfill_task is not None:
+            backfill_task.cancel()
+        for task in app.state.cache_revalidations.values():
+            task.cancel()
+        await app.state.github_registry.close()
+        await app.state.github.close()
+        backend.close()
+
+
+def repo_path(owner: str, repo: str) -> None:
+    """Declares the /repos/{owner}/{repo} path parameters; get_github resolves the client."""
+
+
+async def rate_limited(request: Request, exc: RateLimited):
+    return ORJSONResponse(status_code=429, content={'detail': exc.detail},
+                          headers={'Retry-After': str(exc.retry_after)})
+
+
+async def circuit_open(request: Request, exc: CircuitOpen):
+    return ORJSONResponse(status_code=503, content={'detail': exc.detail},
+                          headers={'Retry-After': str(exc.retry_after)})
+
+
+async def healthz(request: Request):
+    health = {'status': 'ok'}
+    backend = getattr(request.app.state, 'backend', None)
+    if backend is not None:
+        health['state'] = backend.stats()
+    gh = getattr(request.app.state, 'github', None)
+    if gh is not None:
+        health['rate_limit'] = gh.rate.snapshot()
+        health['circuits'] = gh.breaker_stats()
+        if any(c['state'] != 'closed' for c in health['circuits'].values()):
+            health['status'] = 'degraded'
+    registry = getattr(request.app.state, 'github_registry', None)
+    if registry is not None:
+        health['clients'] = registry.stats()
+    idempotency = getattr(request.app.state, 'idempotency', None)
+    if idempotency is not None:
+        health['idempotency'] = idempotency.stats()
+    pipeline = getattr(request.app.state, 'webhook_pipeline', None)
+    if pipeline is not None:
+        health['webhooks'] = {
+            **pipeline.stats(),
+            'dedupe': request.app.state.processed_webhooks.stats(),
+            'events': request.app.state.webhook_events.stats(),
+            'stream': request.app.state.event_stream.stats(),
+        }
+        if getattr(request.app.state, 'event_log', None) is not None:
+            health['webhooks']['event_log'] = request.app.state.event_log.stats()
+    return health
+
+
+async def metrics(request: Request):
+    """Prometheus text exposition of this worker's metrics."""
+    return PlainTextResponse(render(request.app.state), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the application; ``settings`` defaults to the environment, read when the server starts."""
+    app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+    app.state.settings = settings
+    app.router.route_class = TimedRoute
+    app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_credentials=False, allow_methods=['*'],
+                       allow_headers=['*'])
+    app.add_middleware(ServerTimingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_exception_handler(RateLimited, rate_limited)
+    app.add_exception_handler(CircuitOpen, circuit_open)
+    app.add_api_route('/healthz', healthz, methods=['GET'])
+    app.add_api_route('/metrics', metrics, methods=['GET'], response_class=PlainTextResponse)
+    app.include_router(issues.router)
+    app.include_router(comments.router)
+    # The same issue and comment routes for configured repositories (GITHUB_REPOS / GITHUB_REPO_TOKENS)
+    for router in (issues.router, comments.router):
+        app.include_router(router, prefix='/repos/{owner}/{repo}', dependencies=[Depends(repo_path)])
+    app.include_router(webhook.router)
+    app.include_router(admin.router)
+    return app
+
+
+app = create_app()
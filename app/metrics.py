@@ -0,0 +1,215 @@
+# app/metrics.py
+"""
+Minimal in-process metrics registry with Prometheus text exposition (GET /metrics).
+
+Counters and histograms are plain dicts keyed by label values, so recording
+is a dict lookup plus a few additions (histograms find their bucket with
+bisect over fixed bounds; no configuration needed). Values that already live
+elsewhere - cache and pipeline counters, the rate-limit budget - are read
+only when /metrics is scraped. Every worker process has its own registry.
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+# Seconds; wide enough for both in-process cache hits and slow GitHub calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: Dict[Tuple, List[float]] = {}  # labels -> per-bucket counts + [sum]
+
+    def observe(self, seconds: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else int(sum(series[:-1]))
+
+    def samples(self) -> Iterable[str]:
+        bounds = self.buckets + (float("inf"),)
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, hits in zip(bounds, series):
+                cumulative += hits
+                le = 'le="%s"' % _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames))
+
+    def render(self) -> List[str]:
+        lines = []
+        for metric in self._metrics.values():
+            lines += [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += metric.samples()
+        return lines
+
+
+REGISTRY = Registry()
+
+HTTP_DURATION = REGISTRY.histogram(
+    "gateway_http_request_duration_seconds", "Time to answer a request, by route template and status",
+    ("method", "route", "status"))
+CACHE_RESULTS = REGISTRY.counter(
+    "gateway_cache_results_total", "Issue reads by X-Cache outcome (HIT, STALE, REVALIDATED, DELTA, MISS, MIRROR)",
+    ("result",))
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "github_request_duration_seconds", "GitHub API call latency, by GitHubClient method and status",
+    ("operation", "status"))
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "github_request_errors_total", "GitHub API calls that failed without a response", ("operation", "error"))
+WEBHOOK_DELIVERIES = REGISTRY.counter(
+    "gateway_webhook_deliveries_total",
+    "Webhook deliveries by outcome (accepted, duplicate, invalid_signature, queue_full)", ("result",))
+
+IDEMPOTENT_REQUESTS = REGISTRY.counter(
+    "gateway_idempotent_requests_total",
+    "Writes carrying an Idempotency-Key, by outcome (new, replayed, conflict, mismatch)", ("result",))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request (no per-request objects beyond a closure)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"x-cache":
+                        CACHE_RESULTS.inc(value.decode("latin-1"))
+                        break
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unmatched paths share one series
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_DURATION.observe(time.perf_counter() - start, scope["method"], path, status[0])
+
+
+def _gauge(name: str, documentation: str, samples: Iterable[Tuple[str, float]], kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{labels} {_number(value)}" for labels, value in samples if value is not None]
+    return lines
+
+
+def collect_state(state) -> List[str]:
+    """Scrape-time metrics read from the stores on app.state."""
+    lines: List[str] = []
+    cache = getattr(state, "issue_cache", None)
+    if cache is not None:
+        stats = cache.stats()
+        for key in ("hits", "stale", "misses", "evictions"):
+            lines += _gauge(f"gateway_cache_{key}_total", f"Response cache {key}", [("", stats[key])], "counter")
+        lines += _gauge("gateway_cache_entries", "Entries in the response cache", [("", stats["entries"])])
+        lines += _gauge("gateway_cache_bytes", "Body bytes held by the response cache", [("", stats["bytes"])])
+    gh = getattr(state, "github", None)
+    if gh is not None:
+        snapshot = gh.rate.snapshot()
+        resources = snapshot["resources"].items()
+        lines += _gauge("github_rate_limit_remaining", "Remaining GitHub rate-limit budget",
+                        [(f'{{resource="{_escape(r)}"}}', b["remaining"]) for r, b in resources])
+        lines += _gauge("github_rate_limit_limit", "GitHub rate-limit budget per window",
+                        [(f'{{resource="{_escape(r)}"}}', b["limit"]) for r, b in resources])
+        lines += _gauge("github_rate_limit_reset_seconds", "Seconds until the GitHub rate-limit window resets",
+                        [(f'{{resource="{_escape(r)}"}}', b["reset_in"]) for r, b in resources])
+        lines += _gauge("github_rate_limit_shed_total", "Calls refused to protect the budget",
+                        [("", snapshot["shed"])], "counter")
+        lines += _gauge("github_requests_coalesced_total", "Reads that joined an identical in-flight call",
+                        [("", gh.flights.coalesced)], "counter")
+        breakers = gh.breakers.items()
+        lines += _gauge("github_circuit_open", "1 while calls of this endpoint class are refused (open or half-open)",
+                        [(f'{{endpoint="{n}"}}', int(b.state != "closed")) for n, b in breakers])
+        lines += _gauge("github_circuit_rejected_total", "Calls refused by the circuit breaker",
+                        [(f'{{endpoint="{n}"}}', b.rejected) for n, b in breakers], "counter")
+    pipeline = getattr(state, "webhook_pipeline", None)
+    if pipeline is not None:
+        stats = pipeline.stats()
+        lines += _gauge("gateway_webhook_queue_depth", "Verified deliveries waiting for a worker",
+                        [("", stats["queue_depth"])])
+        lines += _gauge("gateway_webhook_processed_total", "Deliveries handled by the webhook workers",
+                        [('{result="ok"}', stats["processed"]), ('{result="failed"}', stats["failed"])], "counter")
+        lines += _gauge("gateway_webhook_lag_seconds", "Queue wait of the most recent delivery",
+                        [("", stats["lag_seconds"])])
+    stream = getattr(state, "event_stream", None)
+    if stream is not None:
+        stats = stream.stats()
+        lines += _gauge("gateway_event_stream_subscribers", "Open GET /events/stream connections",
+                        [("", stats["subscribers"])])
+        lines += _gauge("gateway_event_stream_dropped_total", "Event stream subscribers dropped for falling behind",
+                        [("", stats["dropped"])], "counter")
+    return lines
+
+
+def render(state) -> str:
+    return "\n".join(REGISTRY.render() + collect_state(state)) + "\n"
@@ -0,0 +1,148 @@
+# app/mirror.py
+"""
+Optional local read replica of the repository's issues (MIRROR_MODE=true).
+
+The store is backfilled once by paging GitHubClient.list_issues and then kept
+fresh from webhook deliveries and our own writes. Issues are kept as compact
+pre-serialized IssueOut projections and indexed by number, state and label,
+so GET /issues and GET /issues/{number} can be answered without GitHub.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+import orjson
+
+from .projection import ISSUE_FIELDS, project_issue
+from .ratelimit import Priority, RateLimited
+
+logger = logging.getLogger(__name__)
+
+STATES = ("open", "closed")
+
+
+class IssueStore:
+    """In-memory issue replica indexed by number, state and (lower-cased) label name."""
+
+    def __init__(self):
+        self._issues: Dict[int, bytes] = {}
+        self._meta: Dict[int, Tuple[str, Tuple[str, ...], str]] = {}  # number -> (state, labels, updated_at)
+        self._by_state: Dict[str, Set[int]] = {state: set() for state in STATES}
+        self._by_label: Dict[str, Set[int]] = {}
+        self.ready = False
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._issues)
+
+    def get(self, number: int) -> Optional[bytes]:
+        return self._issues.get(number)
+
+    def upsert(self, issue: dict) -> bool:
+        """Insert or replace an issue; older copies never overwrite newer ones."""
+        if not all(field in issue for field in ISSUE_FIELDS):
+            return False
+        number = issue["number"]
+        current = self._meta.get(number)
+        if current is not None and current[2] > (issue.get("updated_at") or ""):
+            return False
+        self._unindex(number)
+        projected = project_issue(issue)
+        labels = tuple(lbl["name"].lower() for lbl in projected["labels"])
+        self._issues[number] = orjson.dumps(projected)
+        self._meta[number] = (projected["state"], labels, projected["updated_at"] or "")
+        self._by_state.setdefault(projected["state"], set()).add(number)
+        for name in labels:
+            self._by_label.setdefault(name, set()).add(number)
+        self.version += 1
+        return True
+
+    def remove(self, number: int) -> None:
+        if self._unindex(number):
+            self._issues.pop(number, None)
+            self.version += 1
+
+    def _unindex(self, number: int) -> bool:
+        meta = self._meta.pop(number, None)
+        if meta is None:
+            return False
+        state, labels, _ = meta
+        self._by_state.get(state, set()).discard(number)
+        for name in labels:
+            members = self._by_label.get(name)
+            if members is not None:
+                members.discard(number)
+                if not members:
+                    del self._by_label[name]
+        return True
+
+    def query(self, state: str, labels: Optional[str], page: int, per_page: int) -> Tuple[List[bytes], int]:
+        """Return one page of serialized issues (newest first) and the total match count."""
+        if state == "all":
+            candidates: Set[int] = set(self._issues)
+        else:
+            candidates = self._by_state.get(state, set())
+        wanted = [name.strip().lower() for name in (labels or "").split(",") if name.strip()]
+        if wanted:
+            # GitHub's labels filter requires every listed label; intersect smallest sets first
+            sets = sorted((self._by_label.get(name, set()) for name in wanted), key=len)
+            candidates = candidates.intersection(*sets)
+        # Issue numbers grow with creation time, matching GitHub's default sort=created&direction=desc
+        ordered = sorted(candidates, reverse=True)
+        start = (page - 1) * per_page
+        return [self._issues[n] for n in ordered[start:start + per_page]], len(ordered)
+
+    def apply_webhook(self, event_type: str, action: str, payload: dict) -> None:
+        issue = payload.get("issue")
+        if event_type not in ("issues", "issue_comment") or not isinstance(issue, dict) or "number" not in issue:
+            return
+        if event_type == "issues" and action in ("deleted", "transferred"):
+            self.remove(issue["number"])
+        else:
+            self.upsert(issue)
+
+
+def build_link_header(base_url: str, params: dict, page: int, per_page: int, total: int) -> Optional[str]:
+    """Build a GitHub-style Link header (first/prev/next/last) for a locally served page."""
+    last = max(1, -(-total // per_page))
+    rels = []
+    if page > 1:
+        rels += [("prev", page - 1), ("first", 1)]
+    if page < last:
+        rels += [("next", page + 1), ("last", last)]
+    if not rels:
+        return None
+    return ", ".join(
+        f'<{base_url}?{urlencode({**params, "page": p, "per_page": per_page})}>; rel="{rel}"' for rel, p in rels
+    )
+
+
+async def backfill(store: IssueStore, gh, per_page: int = 100, retries: int = 5) -> None:
+    """Load every issue once by following GitHub's pagination, then mark the store ready."""
+    page = 1
+    attempt = 0
+    while True:
+        try:
+            r = await gh.list_issues({"state": "all", "page": page, "per_page": per_page}, priority=Priority.BULK)
+        except RateLimited as e:
+            # Budget is reserved for live traffic; resume once the window resets
+            await asyncio.sleep(e.retry_after)
+            continue
+        except Exception:
+            r = None
+        if r is None or r.status_code != 200:
+            attempt += 1
+            if attempt > retries:
+                logger.error("Mirror backfill gave up at page %s; serving reads from GitHub", page)
+                return
+            await asyncio.sleep(min(2 ** attempt, 60))
+            continue
+        attempt = 0
+        for issue in r.json():
+            store.upsert(issue)
+        if "next" not in r.links:
+            break
+        page += 1
+    store.ready = True
+    logger.info("Mirror backfill complete: %s issues", len(store))
@@ -34,3 +34,26 @@ class CommentOut(BaseModel):
     user: Dict[str, Any]
     created_at: str
     html_url: str
+
+class CommentBatchIn(CommentIn):
+    number: int
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: int
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class IssueNumbersIn(BaseModel):
+    numbers: List[int]
+
+class IssueLookupResult(BaseModel):
+    number: int
+    status: int
+    data: Optional[IssueOut] = None
+    error: Optional[str] = None
+
+class IssueChanges(BaseModel):
+    issues: List[IssueOut]
+    cursor: str
+    has_more: bool
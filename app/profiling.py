@@ -0,0 +1,97 @@
+# app/profiling.py
+"""
+On-demand sampling profiler for the event-loop thread (POST /admin/profile).
+
+A daemon thread snapshots the loop thread's Python stack with
+``sys._current_frames()`` at a fixed interval while a session is active, and
+counts identical stacks. The result is in "collapsed stack" format - one
+``root;...;leaf count`` line per stack - which flamegraph.pl, speedscope and
+inferno read directly. Only the stdlib is used, and nothing runs when no
+session is active.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+_active: Optional["ProfileSession"] = None
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """Sample one thread until ``seconds`` elapse or ``max_requests`` requests finish."""
+
+    def __init__(self, thread_id: int, seconds: float, max_requests: Optional[int] = None,
+                 interval: float = 0.005):
+        self.thread_id = thread_id
+        self.seconds = seconds
+        self.max_requests = max_requests
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.requests = 0
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        global _active
+        if _active is not None:
+            raise RuntimeError("A profiling session is already running")
+        _active = self
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        deadline = self.started_at + self.seconds
+        while not self._done.is_set() and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            self._done.wait(self.interval)
+        self._done.set()
+
+    def request_finished(self) -> None:
+        self.requests += 1
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def stop(self) -> None:
+        global _active
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+        if _active is self:
+            _active = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def active() -> Optional[ProfileSession]:
+    return _active
+
+
+def request_finished() -> None:
+    """Called by the timing middleware after every request; a no-op unless profiling."""
+    session = _active
+    if session is not None:
+        session.request_finished()
@@ -0,0 +1,68 @@
+# app/projection.py
+"""
+Single-pass projection of GitHub issue (and comment) JSON onto the IssueOut
+(and CommentOut) contract.
+
+Read endpoints parse the upstream bytes once with orjson, keep only the
+IssueOut fields (or a client-selected ``?fields=`` subset) and write the
+resulting bytes straight to the response, skipping per-item pydantic
+validation and re-serialization.
+"""
+from typing import Iterable, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+
+from . import timing
+from .models import CommentOut, IssueOut
+
+ISSUE_FIELDS = tuple(IssueOut.model_fields)
+COMMENT_FIELDS = tuple(CommentOut.model_fields)
+# GitHub's user object has ~20 URLs; cached comment threads keep only these
+COMMENT_USER_FIELDS = ("login", "id", "type", "avatar_url", "html_url")
+
+
+def project_issue(issue: dict, fields: Iterable[str] = ISSUE_FIELDS) -> dict:
+    """Reduce a GitHub issue to the given IssueOut fields (labels to their names)."""
+    out = {field: issue.get(field) for field in fields}
+    if "labels" in out:
+        out["labels"] = [{"name": lbl["name"] if isinstance(lbl, dict) else str(lbl)}
+                         for lbl in issue.get("labels") or []]
+    return out
+
+
+def project_comment(comment: dict) -> dict:
+    """Reduce a GitHub issue comment to the CommentOut fields, with a compact ``user``."""
+    out = {field: comment.get(field) for field in COMMENT_FIELDS}
+    user = comment.get("user") or {}
+    out["user"] = {key: user.get(key) for key in COMMENT_USER_FIELDS if key in user}
+    return out
+
+
+def project_json(content: bytes, fields: Iterable[str] = ISSUE_FIELDS) -> bytes:
+    """Project a JSON issue or list of issues, returning serialized bytes."""
+    with timing.phase("decode"):
+        data = orjson.loads(content)
+        if isinstance(data, list):
+            return orjson.dumps([project_issue(issue, fields) for issue in data])
+        return orjson.dumps(project_issue(data, fields))
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Validate a ``?fields=a,b`` selection against IssueOut; None means every field."""
+    if not fields:
+        return None
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in selected if f not in ISSUE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected or None
+
+
+def variant_etag(etag: Optional[str], fields: Optional[Tuple[str, ...]]) -> Optional[str]:
+    """A field subset is a different representation, so it gets its own (weak) validator."""
+    if not etag or not fields:
+        return etag
+    opaque = etag.removeprefix("W/").strip('"')
+    # Fields are joined with "+" because If-None-Match is itself a comma-separated list
+    return f'W/"{opaque};{"+".join(fields)}"'
@@ -0,0 +1,147 @@
+# app/ratelimit.py
+"""
+Rate-limit-aware scheduling of upstream GitHub calls.
+
+The scheduler tracks the remaining budget per GitHub rate-limit resource from
+X-RateLimit-* response headers. Each call declares a priority; as the budget
+gets low, bulk and then normal reads are queued until the window resets (when
+that is soon) or shed with RateLimited, so the remaining calls go to writes.
+Secondary rate limits (403/429 with Retry-After or the "secondary rate limit"
+message) block all calls for a jittered backoff.
+"""
+import asyncio
+import random
+import time
+from enum import IntEnum
+from typing import Dict, Optional
+
+import httpx
+
+
+class Priority(IntEnum):
+    WRITE = 0
+    READ = 1
+    BULK = 2
+
+
+class RateLimited(Exception):
+    """Raised instead of calling GitHub when the budget cannot cover the call soon enough."""
+
+    def __init__(self, retry_after: float, detail: str = "GitHub rate limit exhausted"):
+        super().__init__(detail)
+        self.retry_after = max(1, int(retry_after + 0.999))
+        self.detail = detail
+
+
+class _Budget:
+    __slots__ = ("limit", "remaining", "reset_at")
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None  # epoch seconds
+
+
+class RateLimitScheduler:
+    def __init__(self, read_reserve: int = 50, bulk_reserve: int = 500, max_wait: float = 10.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.reserves = {Priority.WRITE: 0, Priority.READ: read_reserve, Priority.BULK: bulk_reserve}
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._budgets: Dict[str, _Budget] = {}
+        self.blocked_until = 0.0  # epoch seconds, set by secondary rate limits
+        self.shed = 0
+        self.queued = 0
+
+    def _budget(self, resource: str) -> _Budget:
+        budget = self._budgets.get(resource)
+        if budget is None:
+            budget = self._budgets[resource] = _Budget()
+        return budget
+
+    async def acquire(self, priority: Priority = Priority.READ, resource: str = "core") -> None:
+        """Wait for (or refuse) permission to spend one unit of the resource's budget."""
+        while True:
+            now = time.time()
+            if self.blocked_until > now:
+                await self._wait_or_shed(self.blocked_until - now, "GitHub secondary rate limit")
+                continue
+            budget = self._budget(resource)
+            if budget.remaining is None or budget.remaining > self.reserves[priority]:
+                break
+            reset_in = (budget.reset_at or now) - now
+            if reset_in <= 0:
+                # Window has rolled over; the next response will tell us the new budget
+                budget.remaining = None
+                self._save(resource, budget)
+                break
+            await self._wait_or_shed(reset_in, "GitHub rate limit budget reserved for higher-priority calls")
+        if budget.remaining is not None:
+            self._spend(resource, budget)
+
+    def _spend(self, resource: str, budget: _Budget) -> None:
+        budget.remaining -= 1  # optimistic, corrected by the response headers
+
+    def _save(self, resource: str, budget: _Budget) -> None:
+        """Hook for schedulers whose budgets live outside this process (see app.sqlite_state)."""
+
+    async def _wait_or_shed(self, delay: float, detail: str) -> None:
+        if delay > self.max_wait:
+            self.shed += 1
+            raise RateLimited(delay, detail)
+        self.queued += 1
+        await asyncio.sleep(delay)
+
+    def update(self, r: httpx.Response) -> None:
+        headers = r.headers
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        resource = headers.get("X-RateLimit-Resource", "core")
+        budget = self._budget(resource)
+        try:
+            budget.remaining = int(remaining)
+            budget.limit = int(headers.get("X-RateLimit-Limit", budget.limit or 0)) or budget.limit
+            if headers.get("X-RateLimit-Reset"):
+                budget.reset_at = float(headers["X-RateLimit-Reset"])
+        except ValueError:
+            return
+        self._save(resource, budget)
+
+    def retry_delay(self, r: httpx.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a rate-limited response, or None if it was not rate limited."""
+        if r.status_code not in (403, 429):
+            return None
+        retry_after = r.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = self.backoff_base
+        elif r.headers.get("X-RateLimit-Remaining") == "0" and r.headers.get("X-RateLimit-Reset"):
+            # Primary limit exhausted: nothing to do until the window resets
+            return max(0.0, float(r.headers["X-RateLimit-Reset"]) - time.time())
+        elif r.status_code == 429 or "secondary rate limit" in r.text.lower():
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        else:
+            return None  # ordinary permission error
+        delay += random.uniform(0, self.backoff_base)  # jitter so retries don't arrive in lockstep
+        self.blocked_until = max(self.blocked_until, time.time() + delay)
+        return delay
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {
+            "resources": {
+                name: {
+                    "limit": b.limit,
+                    "remaining": b.remaining,
+                    "reset_in": None if b.reset_at is None else max(0, round(b.reset_at - now)),
+                }
+                for name, b in self._budgets.items()
+            },
+            "blocked_for": max(0, round(self.blocked_until - now, 1)),
+            "queued": self.queued,
+            "shed": self.shed,
+        }
@@ -0,0 +1,166 @@
+# app/registry.py
+"""
+Upstream clients for the ``/repos/{owner}/{repo}/...`` routes.
+
+Only the default repository (GITHUB_OWNER/GITHUB_REPO) and repositories
+matching GITHUB_REPOS or GITHUB_REPO_TOKENS are served; anything else is a
+404, so GITHUB_TOKEN is never lent to repositories nobody configured.
+Repositories are mapped to a GitHub token by GITHUB_REPO_TOKENS
+(``owner/repo=token`` or ``owner/*=token`` entries; anything else uses
+GITHUB_TOKEN). Each token gets one pooled GitHubClient with its own
+rate-limit scheduler and request coalescing, because GitHub meters the budget
+per token; every repository using that token shares the pool. Pools are
+created on first use, kept in LRU order, and closed once idle for
+GITHUB_CLIENT_IDLE_TTL or when more than GITHUB_CLIENTS_MAX are open. The
+default client from the lifespan (GITHUB_TOKEN) is never evicted.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .config import Settings
+from .github import GitHubClient
+from .ratelimit import RateLimitScheduler
+
+
+def _split(value: str) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def parse_repo_tokens(value: str) -> List[Tuple[str, str]]:
+    """``"a/b=t1, a/*=t2"`` -> ``[("a/b", "t1"), ("a/*", "t2")]`` (patterns lowercased)."""
+    pairs = []
+    for entry in _split(value):
+        pattern, sep, token = entry.partition("=")
+        if not sep or "/" not in pattern or not token.strip():
+            raise ValueError(f"Invalid GITHUB_REPO_TOKENS entry {entry!r}; expected owner/repo=token")
+        pairs.append((pattern.strip().lower(), token.strip()))
+    return pairs
+
+
+def _matches(pattern: str, full_name: str) -> bool:
+    owner, _, repo = pattern.partition("/")
+    want_owner, _, want_repo = full_name.partition("/")
+    return owner == want_owner and repo in ("*", want_repo)
+
+
+def token_id(token: str) -> str:
+    """Stable, non-reversible name for a token in stats and rate-limit storage."""
+    return hashlib.sha256(token.encode()).hexdigest()[:12]
+
+
+class _Pool:
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client: GitHubClient):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class ClientRegistry:
+    def __init__(self, settings: Settings, default: GitHubClient,
+                 rate_factory: Callable[[str], RateLimitScheduler]):
+        self.settings = settings
+        self.default = default
+        self.default_name = f"{settings.github_owner}/{settings.github_repo}".lower()
+        self.rate_factory = rate_factory
+        self.tokens = parse_repo_tokens(settings.github_repo_tokens)
+        self.allowed = [p.lower() for p in _split(settings.github_repos)]
+        self.max_pools = max(settings.github_clients_max, 1)
+        self.idle_ttl = settings.github_client_idle_ttl
+        self._pools: "OrderedDict[str, _Pool]" = OrderedDict()
+        self._closing: Dict[asyncio.Task, GitHubClient] = {}
+        self.created = 0
+        self.evicted = 0
+
+    def token_for(self, owner: str, repo: str) -> str:
+        full_name = f"{owner}/{repo}".lower()
+        for pattern, token in self.tokens:
+            if _matches(pattern, full_name):
+                return token
+        return self.settings.github_token
+
+    def get(self, owner: str, repo: str) -> GitHubClient:
+        """A client for one repository, sharing its token's pool; 404 if the repo is not served."""
+        full_name = f"{owner}/{repo}".lower()
+        if full_name == self.default_name:
+            return self.default
+        if not self.serves(full_name):
+            raise HTTPException(status_code=404, detail="Repository not served by this gateway")
+        token = self.token_for(owner, repo)
+        if token == self.settings.github_token:
+            return self.default.for_repo(owner, repo)
+        return self._pool(token).for_repo(owner, repo)
+
+    def serves(self, full_name: str) -> bool:
+        """Whether a lowercased ``owner/repo`` other than the default is listed in GITHUB_REPOS or GITHUB_REPO_TOKENS."""
+        return (any(_matches(p, full_name) for p in self.allowed)
+                or any(_matches(p, full_name) for p, _ in self.tokens))
+
+    def _pool(self, token: str) -> GitHubClient:
+        now = time.monotonic()
+        self._evict_idle(now)
+        pool = self._pools.get(token)
+        if pool is None:
+            pool = self._pools[token] = _Pool(
+                GitHubClient(self.settings, rate=self.rate_factory(token_id(token)), token=token))
+            self.created += 1
+            while len(self._pools) > self.max_pools:
+                self._close(self._pools.popitem(last=False)[1])
+        else:
+            self._pools.move_to_end(token)
+        pool.last_used = now
+        return pool.client
+
+    def _evict_idle(self, now: float) -> None:
+        while self._pools:
+            token, oldest = next(iter(self._pools.items()))
+            if now - oldest.last_used < self.idle_ttl:
+                return
+            del self._pools[token]
+            self._close(oldest)
+
+    def _close(self, pool: _Pool) -> None:
+        # Requests that already hold the client may still be using it; close after they can finish
+        self.evicted += 1
+
+        async def close_later():
+            await asyncio.sleep(self.settings.http_timeout)
+            await pool.client.close()
+
+        task = asyncio.ensure_future(close_later())
+        self._closing[task] = pool.client
+        task.add_done_callback(lambda t: self._closing.pop(t, None))
+
+    async def close(self) -> None:
+        """Close every pool now, including evicted ones still in their grace period."""
+        clients = list(self._closing.values()) + [pool.client for pool in self._pools.values()]
+        for task in list(self._closing):
+            task.cancel()
+        self._closing.clear()
+        self._pools.clear()
+        for client in clients:
+            await client.close()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        pools: Dict[str, dict] = {
+            token_id(token): {"idle_seconds": round(now - pool.last_used, 1),
+                              "rate_limit": pool.client.rate.snapshot(),
+                              "circuits": {name: b.state for name, b in pool.client.breakers.items()}}
+            for token, pool in self._pools.items()
+        }
+        return {"pools": len(pools), "max_pools": self.max_pools, "idle_ttl": self.idle_ttl,
+                "created": self.created, "evicted": self.evicted, "tokens": pools}
+
+
+def repo_scope(settings: Settings, owner: Optional[str], repo: Optional[str]) -> Optional[str]:
+    """Cache namespace for a repository: None for the default repo, else lowercased ``owner/repo``."""
+    if owner is None or repo is None:
+        return None
+    full_name = f"{owner}/{repo}".lower()
+    return None if full_name == f"{settings.github_owner}/{settings.github_repo}".lower() else full_name
@@ -0,0 +1,55 @@
+import asyncio
+import hmac
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from ..profiling import ProfileSession, active
+from ..timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+MAX_PROFILE_SECONDS = 120
+
+
+def require_admin(request: Request) -> None:
+    """Admin endpoints only exist when ADMIN_TOKEN is set, and need it as a Bearer token."""
+    token = request.app.state.settings.admin_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/admin/profile", response_class=PlainTextResponse)
+async def profile(request: Request, seconds: float = 10.0, requests: Optional[int] = None,
+                  interval_ms: float = 5.0):
+    """Sample the event loop for ``seconds`` or until ``requests`` more requests finish.
+
+    Returns collapsed stacks (``frame;frame;... count``), ready for
+    flamegraph.pl or speedscope.
+    """
+    require_admin(request)
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS}]")
+    if requests is not None and requests < 1:
+        raise HTTPException(status_code=400, detail="requests must be at least 1")
+    if active() is not None:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    session = ProfileSession(threading.get_ident(), seconds, requests, max(interval_ms, 1.0) / 1000)
+    session.start()
+    try:
+        while not session.done:
+            await asyncio.sleep(0.05)
+    finally:
+        session.stop()
+    headers = {
+        "X-Profile-Samples": str(session.samples),
+        "X-Profile-Requests": str(session.requests),
+        "X-Profile-Seconds": f"{session.elapsed:.3f}",
+    }
+    return PlainTextResponse(session.collapsed(), headers=headers)
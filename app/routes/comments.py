@@ -4,40 +4,228 @@ Authors:
 Mikkilineni Sasi Nikhil
 """
 
-from fastapi import APIRouter, HTTPException, status
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 import httpx
+import orjson
+
+from ..batch import check_batch_size, run_batch
+from ..breaker import CircuitOpen
+from ..cache import CacheEntry, ResponseCache
+from ..models import BatchItemResult, CommentBatchIn, CommentIn, CommentOut
+from ..github import GitHubClient, get_github
+from ..idempotency import run_idempotent
+from ..projection import project_comment
+from .. import timing
+from .issues import _cache, _check_client_etag_match, _generate_cache_key, _issue_cache_key, _repo_scope
 
-from ..models import CommentIn, CommentOut
-from ..github import GitHubClient
+router = APIRouter(route_class=timing.TimedRoute)
 
-router = APIRouter()
+MAX_COMMENTS_LIMIT = 100
 
 @router.post("/issues/{number}/comments", status_code=status.HTTP_201_CREATED, response_model=CommentOut)
-async def create_comment(number: int, body: CommentIn):
-    gh = GitHubClient()
-    try:
-        r = await gh.create_comment(number, body.model_dump())
-    except httpx.HTTPError as e:
-        # Network/transport layer error talking to GitHub → treat as upstream
-        raise HTTPException(status_code=502, detail=f"GitHub request failed: {e}") from e
-    finally:
-        await gh.close()
+async def create_comment(number: int, body: CommentIn, request: Request, gh: GitHubClient = Depends(get_github),
+                         idempotency_key: Optional[str] = Header(None)):
+    payload = body.model_dump()
+    scope = _repo_scope(request)
+
+    async def create():
+        try:
+            r = await gh.create_comment(number, payload)
+        except httpx.HTTPError as e:
+            # Network/transport layer error talking to GitHub → treat as upstream
+            raise HTTPException(status_code=502, detail=f"GitHub request failed: {e}") from e
+
+        # Happy path
+        if r.status_code == 201:
+            comment = r.json()
+            _record_comment_write(request, number, comment, scope)
+            return comment, {}
+
+        raise _comment_error(r)
+
+    # Retries with the same Idempotency-Key replay the first 201 instead of posting the comment twice
+    if idempotency_key is not None:
+        return await run_idempotent(request, f"create_comment:{scope or ''}:{number}", idempotency_key,
+                                    payload, CommentOut, create)
+    comment, _ = await create()
+    return comment
+
+
+def _record_comment_write(request: Request, number: int, comment: dict, scope: Optional[str]) -> None:
+    cache = getattr(request.app.state, "issue_cache", None)
+    if cache is None:
+        return
+    # The issue's comment count and updated_at changed: drop the cached copy. Its state and labels did not,
+    # so list pages keep their membership and stay cached
+    cache.pop(_issue_cache_key(number, scope))
+    apply_comment_change(cache, number, comment, repo=scope)
 
-    # Happy path
-    if r.status_code == 201:
-        return r.json()
 
+def _comment_error(r: httpx.Response) -> HTTPException:
     # Client-side mappings
     if r.status_code == 404:
-        raise HTTPException(status_code=404, detail="Issue not found")
+        return HTTPException(status_code=404, detail="Issue not found")
     if r.status_code in (401, 403):
-        raise HTTPException(status_code=401, detail=r.text)
+        return HTTPException(status_code=401, detail=r.text)
     if r.status_code == 422:
-        raise HTTPException(status_code=400, detail=r.text)
+        return HTTPException(status_code=400, detail=r.text)
 
     # Upstream/server errors from GitHub → map to 502 gateway error
     if 500 <= r.status_code < 600:
-        raise HTTPException(status_code=502, detail=r.text)
+        return HTTPException(status_code=502, detail=r.text)
 
     # Fallback for anything unexpected
-    raise HTTPException(status_code=502, detail=f"GitHub error {r.status_code}: {r.text}")
+    return HTTPException(status_code=502, detail=f"GitHub error {r.status_code}: {r.text}")
+
+
+@router.post("/issues/comments:batch", response_model=List[BatchItemResult])
+async def create_comments_batch(items: List[CommentBatchIn], request: Request, gh: GitHubClient = Depends(get_github)):
+    """Create many comments (each naming its issue number) in one call, with per-item results."""
+    settings = request.app.state.settings
+    check_batch_size(items, settings.batch_max_items)
+    scope = _repo_scope(request)
+
+    async def create(item: CommentBatchIn):
+        r = await gh.create_comment(item.number, item.model_dump(exclude={"number"}))
+        if r.status_code != 201:
+            raise _comment_error(r)
+        comment = r.json()
+        _record_comment_write(request, item.number, comment, scope)
+        return 201, comment
+
+    return await run_batch(items, create, settings.batch_concurrency)
+
+
+def _thread_key(number: int, repo: Optional[str] = None) -> str:
+    return _generate_cache_key({"comments": number} if repo is None else {"comments": number, "repo": repo})
+
+
+def _store_thread(cache: ResponseCache, key: str, comments: Dict[int, dict], params: dict,
+                  etag: Optional[str], fetched_at: Optional[float] = None) -> CacheEntry:
+    body = orjson.dumps(sorted(comments.values(), key=lambda c: c["id"]))
+    entry = CacheEntry(body, etag=etag, params={**params, "version": hashlib.md5(body).hexdigest()[:16]})
+    if fetched_at is not None:
+        entry.fetched_at = fetched_at
+    return cache.put(key, entry)
+
+
+def apply_comment_change(cache: Optional[ResponseCache], number: int, comment: Optional[dict],
+                         removed: bool = False, repo: Optional[str] = None) -> None:
+    """Write a created/edited comment through to a cached thread, or drop a deleted one.
+
+    The thread keeps its sync cursor and validator, so the next refresh still
+    asks GitHub from the same point and simply finds this comment again.
+    """
+    if cache is None or not isinstance(comment, dict) or "id" not in comment:
+        return
+    key = _thread_key(number, repo)
+    entry = cache.peek(key)
+    if entry is None:
+        return
+    comments = {c["id"]: c for c in orjson.loads(entry.body)}
+    if removed:
+        comments.pop(comment["id"], None)
+    else:
+        comments[comment["id"]] = project_comment(comment)
+    _store_thread(cache, key, comments, entry.params, entry.etag, entry.fetched_at)
+
+
+async def _sync_thread(request: Request, gh: GitHubClient, number: int) -> Tuple[CacheEntry, str]:
+    """Bring an issue's cached comment thread up to date; returns it with its X-Cache status.
+
+    A thread is refreshed at most once per CACHE_TTL. Refreshes ask only for
+    comments updated at or after the newest ``updated_at`` already held
+    (GitHub's ``since``), conditionally on the previous answer's ETag, so an
+    unchanged thread costs one 304 however long it is. ``since`` cannot report
+    deletions, so every COMMENTS_RESYNC_INTERVAL the thread is fetched in full
+    (webhooks remove deleted comments in between). While GitHub's circuit is
+    open the cached thread is served as is (FALLBACK).
+    """
+    cache = _cache(request)
+    key = _thread_key(number, _repo_scope(request))
+    with timing.phase("cache"):
+        entry = cache.get(key)
+    if entry is not None and cache.is_fresh(entry):
+        return entry, "HIT"
+
+    now = time.time()
+    resync = request.app.state.settings.comments_resync_interval
+    incremental = entry is not None and now - entry.params["synced_at"] < resync
+    since = entry.params["since"] if incremental else None
+    params = {"per_page": 100, **({"since": since} if since else {})}
+    try:
+        r = await gh.list_comments(number, params,
+                                   {"If-None-Match": entry.etag} if incremental and entry.etag else {})
+    except CircuitOpen:
+        if entry is None:
+            raise
+        return entry, "FALLBACK"
+    if r.status_code == 304 and incremental:
+        return cache.touch(key, entry), "REVALIDATED"
+    if r.status_code != 200:
+        raise _comment_error(r)
+
+    etag = r.headers.get("ETag")
+    comments = {c["id"]: c for c in orjson.loads(entry.body)} if incremental else {}
+    newest, page = since, 1
+    while True:
+        with timing.phase("decode"):
+            for comment in orjson.loads(r.content):
+                comments[comment["id"]] = project_comment(comment)
+                updated = comment.get("updated_at")
+                if updated and (newest is None or updated > newest):
+                    newest = updated
+        if "next" not in r.links:
+            break
+        page += 1
+        r = await gh.list_comments(number, {**params, "page": page})
+        if r.status_code != 200:
+            raise _comment_error(r)
+
+    thread = {"comments": number, "since": newest, "synced_at": entry.params["synced_at"] if incremental else now}
+    # The ETag belongs to the ?since= query just made; it only validates the next poll if the cursor stayed put
+    entry = _store_thread(cache, key, comments, thread, etag if newest == since else None)
+    return entry, "DELTA" if incremental else "MISS"
+
+
+@router.get("/issues/{number}/comments", response_model=List[CommentOut])
+async def list_comments(number: int, request: Request, cursor: Optional[int] = None, limit: int = 30,
+                        gh: GitHubClient = Depends(get_github)):
+    """List an issue's comments oldest first from the cached, incrementally synced thread.
+
+    Pages are chained with a ``Link: <...>; rel="next"`` header carrying the
+    cursor (the last comment id of the page).
+    """
+    limit = min(max(limit, 1), MAX_COMMENTS_LIMIT)
+    entry, cache_status = await _sync_thread(request, gh, number)
+    headers = {"X-Cache": cache_status, "ETag": f'W/"{entry.params["version"]}-{cursor or 0}-{limit}"'}
+    if _check_client_etag_match(request.headers.get("If-None-Match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    comments = orjson.loads(entry.body)
+    start = 0 if cursor is None else bisect_right(comments, cursor, key=lambda c: c["id"])
+    page = comments[start:start + limit]
+    if start + limit < len(comments):
+        next_url = request.url.include_query_params(cursor=page[-1]["id"], limit=limit)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return Response(content=orjson.dumps(page), media_type="application/json", headers=headers)
+
+
+@router.get("/issues/{number}/comments/stream", response_class=StreamingResponse,
+            responses={200: {"content": {"application/x-ndjson": {}}}})
+async def stream_comments(number: int, request: Request, gh: GitHubClient = Depends(get_github)):
+    """Export an issue's whole comment thread as NDJSON (one CommentOut per line), oldest first."""
+    entry, cache_status = await _sync_thread(request, gh, number)
+    comments = orjson.loads(entry.body)
+
+    async def ndjson():
+        for start in range(0, len(comments), MAX_COMMENTS_LIMIT):
+            yield b"".join(orjson.dumps(c) + b"\n" for c in comments[start:start + MAX_COMMENTS_LIMIT])
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", headers={"X-Cache": cache_status})
@@ -3,37 +3,128 @@
 Mikkilineni Sasi Nikhil
 """
 
-from typing import Dict, List, Optional, Union
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+import asyncio
 import hashlib
 import json
-
-from fastapi import APIRouter, HTTPException, Response, status, Request
-
-from ..github import GitHubClient
-from ..models import IssueIn, IssueOut, IssueUpdate
-
-router = APIRouter()
+import logging
+
+import httpx
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Request
+from fastapi.responses import StreamingResponse
+
+from ..batch import check_batch_size, run_batch
+from ..breaker import CircuitOpen
+from ..cache import CacheEntry, ResponseCache
+from ..changes import ChangeCursor
+from ..github import GitHubClient, get_github
+from ..mirror import IssueStore, build_link_header
+from ..graphql import build_issues_query, parse_issues_response
+from ..idempotency import run_idempotent
+from ..models import (BatchItemResult, IssueChanges, IssueIn, IssueLookupResult, IssueNumbersIn, IssueOut,
+                      IssueUpdate)
+from ..projection import parse_fields, project_issue, project_json, variant_etag
+from ..ratelimit import Priority, RateLimited
+from ..registry import repo_scope
+from .. import timing
+
+router = APIRouter(route_class=timing.TimedRoute)
+logger = logging.getLogger(__name__)
 
 
 @router.post("/issues", status_code=status.HTTP_201_CREATED, response_model=IssueOut)
-async def create_issue(issue: IssueIn, response: Response):
-    gh = GitHubClient()
-    try:
-        payload = issue.model_dump()
-        r = await gh.create_issue(payload)
-    finally:
-        await gh.close()
+async def create_issue(issue: IssueIn, request: Request, response: Response, gh: GitHubClient = Depends(get_github),
+                       idempotency_key: Optional[str] = Header(None)):
+    payload = issue.model_dump()
 
-    if r.status_code == 201:
+    async def create():
+        r = await gh.create_issue(payload)
+        if r.status_code != 201:
+            raise _create_issue_error(r)
         body = r.json()
-        response.headers["Location"] = f"/issues/{body['number']}"
-        return body
+        _record_issue_write(request, body, r)
+        return body, {"Location": f"{request.url.path.rstrip('/')}/{body['number']}"}
+
+    # Retries with the same Idempotency-Key replay the first 201 instead of creating a duplicate
+    if idempotency_key is not None:
+        return await run_idempotent(request, f"create_issue:{_repo_scope(request) or ''}", idempotency_key,
+                                    payload, IssueOut, create)
+    body, headers = await create()
+    response.headers.update(headers)
+    return body
 
+
+def _create_issue_error(r: httpx.Response) -> HTTPException:
     if r.status_code in (401, 403):
-        raise HTTPException(status_code=401, detail=r.text)
+        return HTTPException(status_code=401, detail=r.text)
     if r.status_code == 422:
-        raise HTTPException(status_code=400, detail=r.text)
-    raise HTTPException(status_code=502, detail=f"GitHub error {r.status_code}: {r.text}")
+        return HTTPException(status_code=400, detail=r.text)
+    return HTTPException(status_code=502, detail=f"GitHub error {r.status_code}: {r.text}")
+
+
+def _record_issue_write(request: Request, body: dict, r: httpx.Response) -> None:
+    """Write a freshly created/updated issue through to the cache and mirror."""
+    scope = _repo_scope(request)
+    apply_issue_change(getattr(request.app.state, "issue_cache", None), body["number"], body,
+                       etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"), repo=scope)
+    mirror = getattr(request.app.state, "mirror", None)
+    if mirror is not None and scope is None:
+        mirror.upsert(body)
+
+
+@router.post("/issues:batch", response_model=List[BatchItemResult])
+async def create_issues_batch(items: List[IssueIn], request: Request, gh: GitHubClient = Depends(get_github)):
+    """Create many issues in one call; each item reports its own status (201 or a mapped error)."""
+    settings = request.app.state.settings
+    check_batch_size(items, settings.batch_max_items)
+
+    async def create(issue: IssueIn):
+        r = await gh.create_issue(issue.model_dump())
+        if r.status_code != 201:
+            raise _create_issue_error(r)
+        body = r.json()
+        _record_issue_write(request, body, r)
+        return 201, body
+
+    return await run_batch(items, create, settings.batch_concurrency)
+
+
+MAX_LOOKUP_NUMBERS = 100
+
+
+@router.post("/issues:get", response_model=List[IssueLookupResult])
+async def get_issues_by_number(lookup: IssueNumbersIn, request: Request, gh: GitHubClient = Depends(get_github)):
+    """Resolve many issue numbers with one GraphQL request (mirror hits need none)."""
+    numbers = list(dict.fromkeys(lookup.numbers))
+    if len(numbers) > MAX_LOOKUP_NUMBERS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_LOOKUP_NUMBERS} numbers per request")
+
+    found: Dict[int, dict] = {}
+    errors: Dict[int, str] = {}
+    mirror = _mirror(request)
+    if mirror is not None:
+        for n in numbers:
+            local = mirror.get(n)
+            if local is not None:
+                found[n] = orjson.loads(local)
+
+    missing = [n for n in numbers if n not in found]
+    if missing:
+        r = await gh.graphql(build_issues_query(missing), {"owner": gh.owner, "repo": gh.repo})
+        if r.status_code in (401, 403):
+            raise HTTPException(status_code=401, detail=r.text)
+        if r.status_code != 200:
+            raise HTTPException(status_code=502, detail=r.text)
+        remote, errors = parse_issues_response(missing, r.json())
+        found.update(remote)
+
+    return [
+        {"number": n, "status": 200, "data": found[n]} if n in found
+        else {"number": n, "status": 404, "error": errors.get(n, "Issue not found")}
+        for n in numbers
+    ]
 
 
 # by lordphone
@@ -44,119 +135,418 @@ def _generate_cache_key(params: Dict[str, Union[str, int]]) -> str:
     return hashlib.md5(sorted_params.encode()).hexdigest()
 
 
-# by lordphone
-def _handle_etag_cache(etag_cache: dict, cache_key: str, github_etag: str):
-    """Handle ETag caching with size limits."""
-    etag_cache[cache_key] = github_etag
-
-    # Limit cache size to prevent memory growth
-    if len(etag_cache) > 1000:
-        # Remove oldest entries (simple FIFO)
-        keys_to_remove = list(etag_cache.keys())[:100]
-        for key in keys_to_remove:
-            etag_cache.pop(key, None)
-
-
 # by lordphone
 def _check_client_etag_match(client_etag: str, github_etag: str) -> bool:
     """Check if client ETag matches GitHub ETag."""
     if not (client_etag and github_etag):
         return False
-    return client_etag.strip('"') == github_etag.strip('"')
+    if client_etag.strip() == "*":
+        return True
+    current = github_etag.removeprefix("W/").strip('"')
+    return any(tag.strip().removeprefix("W/").strip('"') == current for tag in client_etag.split(","))
+
+
+def _not_modified_since(client_date: Optional[str], last_modified: Optional[str]) -> bool:
+    """True if the resource's Last-Modified is not newer than the client's If-Modified-Since."""
+    if not (client_date and last_modified):
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(client_date)
+    except (TypeError, ValueError):
+        return False
+
+
+def _issue_cache_key(number: int, repo: Optional[str] = None) -> str:
+    return _generate_cache_key({"number": number} if repo is None else {"number": number, "repo": repo})
+
+
+def _repo_scope(request: Request) -> Optional[str]:
+    """Cache namespace of the repository a request targets (None for GITHUB_OWNER/GITHUB_REPO)."""
+    return repo_scope(request.app.state.settings, request.path_params.get("owner"), request.path_params.get("repo"))
+
+
+def _cache(request: Request) -> ResponseCache:
+    return request.app.state.issue_cache
+
+
+def _mirror(request: Request) -> Optional[IssueStore]:
+    """The local replica (of the default repository only), once its backfill has completed."""
+    mirror = getattr(request.app.state, "mirror", None)
+    if mirror is None or not mirror.ready or _repo_scope(request) is not None:
+        return None
+    return mirror
+
+
+def _json_bytes_response(request: Request, content: bytes, headers: dict,
+                         fields: Optional[Tuple[str, ...]] = None) -> Response:
+    """Write already-projected IssueOut JSON straight to the client (no pydantic round trip)."""
+    if fields:
+        headers["ETag"] = variant_etag(headers.get("ETag"), fields)
+    if _check_client_etag_match(request.headers.get("If-None-Match"), headers.get("ETag")):
+        return Response(status_code=304, headers=headers)
+    if fields:
+        content = project_json(content, fields)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def _label_names(issue: dict) -> Optional[Set[str]]:
+    labels = issue.get("labels")
+    if labels is None:
+        return None
+    return {lbl["name"] if isinstance(lbl, dict) else str(lbl) for lbl in labels}
+
+
+def _list_page_matches(params: dict, states: Optional[Set[str]], labels: Optional[Set[str]]) -> bool:
+    """Could a cached GET /issues page with these params contain an issue with these states/labels?
+
+    ``None`` means "unknown" and matches everything, so partial data errs on invalidating.
+    """
+    wanted_state = params.get("state", "open")
+    if states is not None and wanted_state != "all" and wanted_state not in states:
+        return False
+    if labels is None:
+        return True
+    # GitHub's labels filter requires every listed label to be present, and ignores case
+    wanted_labels = [x.strip().lower() for x in str(params.get("labels") or "").split(",") if x.strip()]
+    labels = {name.lower() for name in labels}
+    return all(name in labels for name in wanted_labels)
+
+
+def apply_issue_change(cache: Optional[ResponseCache], number: int, issue: Optional[dict] = None,
+                       etag: Optional[str] = None, last_modified: Optional[str] = None,
+                       previous_states: Iterable[str] = (), previous_labels: Iterable[str] = (),
+                       removed: bool = False, repo: Optional[str] = None) -> None:
+    """Bring the cache in line with a known change to one issue.
+
+    When ``issue`` is a complete GitHub issue it is written through as the new
+    cached copy; otherwise (or when ``removed``) the cached copy is dropped.
+    List pages whose state and label filters match the issue before or after
+    the change are invalidated regardless of page, since an insert or removal
+    shifts every later page. ``repo`` is the repository's cache namespace
+    (see ``_repo_scope``); only that repository's entries are touched. An
+    ``issue`` older than the cached copy (a late or retried webhook delivery)
+    is ignored, as in ``IssueStore.upsert``.
+    """
+    if cache is None:
+        return
+    key = _issue_cache_key(number, repo)
+    states: Optional[Set[str]] = set(previous_states)
+    labels: Optional[Set[str]] = set(previous_labels)
+
+    current = cache.peek(key)
+    if not removed and issue and current is not None:
+        cached_at = orjson.loads(current.body).get("updated_at") or ""
+        if cached_at > (issue.get("updated_at") or cached_at):
+            return
+    old = cache.pop(key)
+    if old is not None:
+        old_issue = orjson.loads(old.body)
+        states.add(old_issue.get("state"))
+        labels |= _label_names(old_issue) or set()
+
+    issue = issue or {}
+    if "state" in issue:
+        states.add(issue["state"])
+    elif old is None:
+        states = None  # unknown: match list pages of every state
+    new_labels = _label_names(issue)
+    if new_labels is not None:
+        labels |= new_labels
+    elif old is None:
+        labels = None  # unknown: match list pages of every label filter
+
+    if not removed and all(field in issue for field in IssueOut.model_fields):
+        cache.put(key, CacheEntry(orjson.dumps(project_issue(issue)), etag=etag, last_modified=last_modified))
+
+    # Comment threads (routes.comments) also carry params but are not list pages
+    cache.invalidate_where(lambda e: e.params is not None and "comments" not in e.params
+                           and e.params.get("repo") == repo and _list_page_matches(e.params, states, labels))
+
+
+async def _fetch_into_cache(cache: ResponseCache, cache_key: str, fetch: Callable[[dict], Awaitable[httpx.Response]],
+                            params: Optional[dict] = None) -> Tuple[Optional[CacheEntry], httpx.Response]:
+    """Fetch from GitHub, revalidating any cached copy, and store the result.
+
+    Returns the (possibly refreshed) cache entry, or None when GitHub answered
+    with something other than 200/304, together with the upstream response.
+    """
+    entry = cache.peek(cache_key)
+    github_headers = {}
+    if entry is not None:
+        # Send validators to GitHub so an unchanged resource costs a 304
+        if entry.etag:
+            github_headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            github_headers["If-Modified-Since"] = entry.last_modified
+
+    r = await fetch(github_headers)
+
+    if r.status_code == 304 and entry is not None:
+        return cache.touch(cache_key, entry), r
+    if r.status_code == 200:
+        # Project to IssueOut once per fetch; every hit then serves these bytes as-is
+        entry = CacheEntry(
+            project_json(r.content),
+            etag=r.headers.get("ETag"),
+            last_modified=r.headers.get("Last-Modified"),
+            link=r.headers.get("Link"),
+            params=params,
+        )
+        return cache.put(cache_key, entry), r
+    return None, r
+
+
+def _revalidate_in_background(request: Request, cache_key: str, fetch, params: Optional[dict] = None):
+    """Refresh a stale entry without making the current request wait for GitHub."""
+    pending = request.app.state.cache_revalidations
+    if cache_key in pending:
+        return
+    cache = _cache(request)
+
+    async def run():
+        try:
+            await _fetch_into_cache(cache, cache_key, fetch, params)
+        except Exception:
+            logger.warning("Background revalidation failed for %s", cache_key, exc_info=True)
+        finally:
+            pending.pop(cache_key, None)
+
+    pending[cache_key] = asyncio.create_task(run())
+
+
+def _serve_cached(entry: CacheEntry, request: Request, cache_status: str, fields: Optional[Tuple[str, ...]] = None):
+    """Answer from a cache entry, honouring the client's conditional headers."""
+    headers = {"X-Cache": cache_status}
+    if entry.etag:
+        headers["ETag"] = entry.etag
+    if entry.last_modified:
+        headers["Last-Modified"] = entry.last_modified
+    # Forward GitHub's Link header for pagination
+    if entry.link:
+        headers["Link"] = entry.link
+
+    if not request.headers.get("If-None-Match") and _not_modified_since(
+        request.headers.get("If-Modified-Since"), entry.last_modified
+    ):
+        return Response(status_code=304, headers=headers)
+    return _json_bytes_response(request, entry.body, headers, fields)
+
+
+async def _cached_get(request: Request, cache_key: str, fetch, params: Optional[dict] = None,
+                      fields: Optional[Tuple[str, ...]] = None):
+    """Serve a cached GitHub read: fresh hit, stale-while-revalidate, or conditional refetch.
+
+    Returns (result, upstream_response); upstream_response is None when no
+    synchronous call was made, and result is None when GitHub returned an error.
+    """
+    entry, cache_status, r = await _cached_entry(request, cache_key, fetch, params)
+    if entry is None:
+        return None, r
+    return _serve_cached(entry, request, cache_status, fields), r
+
+
+async def _cached_entry(request: Request, cache_key: str, fetch, params: Optional[dict] = None):
+    """The cache entry for a GitHub read, fetched or revalidated as needed.
+
+    Returns (entry, X-Cache status, upstream_response) with the same meaning as ``_cached_get``.
+    While GitHub's circuit is open an expired entry is still served, marked FALLBACK.
+    """
+    cache = _cache(request)
+    with timing.phase("cache"):
+        entry = cache.get(cache_key)
+    if entry is not None:
+        if cache.is_fresh(entry):
+            return entry, "HIT", None
+        if cache.is_servable_stale(entry):
+            _revalidate_in_background(request, cache_key, fetch, params)
+            return entry, "STALE", None
+
+    try:
+        fetched, r = await _fetch_into_cache(cache, cache_key, fetch, params)
+    except CircuitOpen:
+        if entry is None:
+            raise
+        return entry, "FALLBACK", None
+    return fetched, "REVALIDATED" if r.status_code == 304 else "MISS", r
 
 
 # ETag conditional GET implementation by lordphone
 @router.get("/issues", response_model=List[IssueOut])
 async def list_issues(
     request: Request,
-    response: Response,
     state: str = "open",
     labels: Optional[str] = None,  # comma-separated list to filter
     page: int = 1,
     per_page: int = 30,
+    fields: Optional[str] = None,  # comma-separated IssueOut fields to return
+    gh: GitHubClient = Depends(get_github),
 ):
-    if per_page > 100:
-        per_page = 100
+    # GitHub's own bounds; the mirror pages locally and would divide by a zero per_page
+    page, per_page = max(page, 1), min(max(per_page, 1), 100)
+    selected = parse_fields(fields)
 
     params: Dict[str, Union[str, int]] = {"state": state, "page": page, "per_page": per_page}
     if labels:
         params["labels"] = labels
 
-    # Generate cache key for this request
-    cache_key = _generate_cache_key(params)
+    # Generate cache key for this request; other repositories get their own namespace
+    scope = _repo_scope(request)
+    key_params = params if scope is None else {**params, "repo": scope}
+    cache_key = _generate_cache_key(key_params)
 
-    # Check if we have a cached ETag for this request
-    etag_cache = getattr(request.app.state, 'etag_cache', {})
-    cached_etag = etag_cache.get(cache_key)
+    mirror = _mirror(request)
+    if mirror is not None and state in ("open", "closed", "all"):
+        items, total = mirror.query(state, labels, page, per_page)
+        headers = {"ETag": f'W/"m{mirror.version}-{cache_key}"', "X-Cache": "MIRROR"}
+        link_params = {"state": state, **({"labels": labels} if labels else {})}
+        link = build_link_header(str(request.url.replace(query="")), link_params, page, per_page, total)
+        if link:
+            headers["Link"] = link
+        return _json_bytes_response(request, b"[" + b",".join(items) + b"]", headers, selected)
 
-    # Check if client sent If-None-Match header
-    client_etag = request.headers.get("If-None-Match")
+    async def fetch(github_headers: dict):
+        return await gh.list_issues(params, headers=github_headers)
 
-    gh = GitHubClient()
-    try:
-        # Send If-None-Match to GitHub if we have a cached ETag
-        github_headers = {}
-        if cached_etag:
-            github_headers["If-None-Match"] = cached_etag
-
-        r = await gh.list_issues(params, headers=github_headers)
-    finally:
-        await gh.close()
-
-    # Handle 304 Not Modified from GitHub
-    if r.status_code == 304:
-        response.status_code = 304
-        if cached_etag:
-            response.headers["ETag"] = cached_etag
-        return Response(status_code=304)
+    result, r = await _cached_get(request, cache_key, fetch, key_params, selected)
+    if r is not None and result is None:
+        raise _list_error(r)
+    return result
 
-    if r.status_code != 200:
-        if r.status_code in (401, 403):
-            raise HTTPException(status_code=401, detail=r.text)
-        raise HTTPException(status_code=502, detail=r.text)
 
-    # Extract and cache ETag from GitHub response
-    github_etag = r.headers.get("ETag")
-    if github_etag:
-        _handle_etag_cache(etag_cache, cache_key, github_etag)
-        response.headers["ETag"] = github_etag
+def _list_error(r: httpx.Response) -> HTTPException:
+    if r.status_code in (401, 403):
+        return HTTPException(status_code=401, detail=r.text)
+    return HTTPException(status_code=502, detail=r.text)
 
-    # Forward GitHub's Link header for pagination
-    link = r.headers.get("Link")
-    if link:
-        response.headers["Link"] = link
 
-    # Check if client's ETag matches current ETag (client-side conditional GET)
-    if _check_client_etag_match(client_etag, github_etag):
-        response.status_code = 304
-        return Response(status_code=304)
+# Declared before /issues/{number} so "stream" is not parsed as an issue number
+@router.get("/issues/stream", response_class=StreamingResponse,
+            responses={200: {"content": {"application/x-ndjson": {}}}})
+async def stream_issues(state: str = "open", labels: Optional[str] = None, gh: GitHubClient = Depends(get_github)):
+    """Export every matching issue as NDJSON (one IssueOut per line), following pagination server-side.
 
-    return r.json()
+    While one page is being written out the next is already being fetched, and
+    at most two pages are held in memory regardless of repository size.
+    """
+    params: Dict[str, Union[str, int]] = {"state": state, "per_page": 100}
+    if labels:
+        params["labels"] = labels
 
+    def fetch(page: int):
+        return gh.list_issues({**params, "page": page}, priority=Priority.BULK)
+
+    # Fetch the first page before committing to a 200 so errors keep their status codes
+    first = await fetch(1)
+    if first.status_code != 200:
+        raise _list_error(first)
+
+    async def ndjson():
+        r, page = first, 1
+        prefetch = None
+        try:
+            while True:
+                if "next" in r.links:
+                    page += 1
+                    prefetch = asyncio.ensure_future(fetch(page))
+                yield b"".join(orjson.dumps(project_issue(issue)) + b"\n" for issue in orjson.loads(r.content))
+                if prefetch is None:
+                    return
+                try:
+                    r = await prefetch
+                except (httpx.HTTPError, RateLimited, CircuitOpen) as e:
+                    r = None
+                    detail = str(e)
+                prefetch = None
+                if r is None or r.status_code != 200:
+                    # Headers are already sent: report the failure in-band as a final line
+                    error = _list_error(r).detail if r is not None else f"GitHub request failed: {detail}"
+                    yield orjson.dumps({"error": error, "page": page}) + b"\n"
+                    return
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/issues/changes", response_model=IssueChanges)
+async def issue_changes(
+    request: Request,
+    cursor: Optional[str] = None,
+    state: str = "all",
+    labels: Optional[str] = None,
+    per_page: int = 100,
+    gh: GitHubClient = Depends(get_github),
+):
+    """Issues updated since ``cursor``, oldest change first, plus the cursor to poll with next.
+
+    Without a cursor every matching issue is returned, a page at a time;
+    ``has_more`` means further changes are waiting and the next call can
+    follow immediately. GitHub is asked with ``since`` and ``sort=updated``
+    through the response cache, so an unchanged poll costs at most one 304.
+    """
+    position = ChangeCursor.decode(cursor)
+    overlap = request.app.state.settings.changes_overlap
+    params: Dict[str, Union[str, int]] = {"state": state, "sort": "updated", "direction": "asc",
+                                          "per_page": min(max(per_page, 1), 100)}
+    if labels:
+        params["labels"] = labels
+    since = position.since(overlap)
+    if since:
+        params["since"] = since
+    scope = _repo_scope(request)
+
+    page, first_status = 1, None
+    while True:
+        page_params = {**params, "page": page}
+        key_params = page_params if scope is None else {**page_params, "repo": scope}
+
+        async def fetch(github_headers: dict, page_params=page_params):
+            return await gh.list_issues(page_params, headers=github_headers)
+
+        entry, cache_status, r = await _cached_entry(request, _generate_cache_key(key_params), fetch, key_params)
+        if entry is None:
+            raise _list_error(r)
+        first_status = first_status or cache_status
+        with timing.phase("decode"):
+            changed, position = position.advance(orjson.loads(entry.body), overlap)
+        has_more = 'rel="next"' in (entry.link or "")
+        # A page holding only issues the cursor already returned (a burst of ties): look further
+        if changed or not has_more:
+            break
+        page += 1
+
+    body = orjson.dumps({"issues": changed, "cursor": position.encode(), "has_more": has_more})
+    return Response(content=body, media_type="application/json", headers={"X-Cache": first_status})
 
-@router.get("/issues/{number}", response_model=IssueOut)
-async def get_issue(number: int):
-    gh = GitHubClient()
-    try:
-        r = await gh.get_issue(number)
-    finally:
-        await gh.close()
 
-    if r.status_code == 404:
-        raise HTTPException(status_code=404, detail="Issue not found")
-    if r.status_code != 200:
+@router.get("/issues/{number}", response_model=IssueOut)
+async def get_issue(number: int, request: Request, fields: Optional[str] = None,
+                    gh: GitHubClient = Depends(get_github)):
+    selected = parse_fields(fields)
+    mirror = _mirror(request)
+    local = mirror.get(number) if mirror is not None else None
+    if local is not None:
+        headers = {"ETag": f'W/"{hashlib.md5(local).hexdigest()}"', "X-Cache": "MIRROR"}
+        return _json_bytes_response(request, local, headers, selected)
+
+    cache_key = _issue_cache_key(number, _repo_scope(request))
+
+    async def fetch(github_headers: dict):
+        return await gh.get_issue(number, headers=github_headers)
+
+    result, r = await _cached_get(request, cache_key, fetch, fields=selected)
+    if r is not None and result is None:
+        if r.status_code == 404:
+            raise HTTPException(status_code=404, detail="Issue not found")
         raise HTTPException(status_code=502, detail=r.text)
-    return r.json()
+    return result
 
 
 @router.patch("/issues/{number}", response_model=IssueOut)
-async def update_issue(number: int, patch: IssueUpdate):
-    gh = GitHubClient()
-    try:
-        payload = patch.model_dump(exclude_unset=True)
-        r = await gh.update_issue(number, payload)
-    finally:
-        await gh.close()
+async def update_issue(number: int, patch: IssueUpdate, request: Request, gh: GitHubClient = Depends(get_github)):
+    payload = patch.model_dump(exclude_unset=True)
+    r = await gh.update_issue(number, payload)
 
     if r.status_code == 404:
         raise HTTPException(status_code=404, detail="Issue not found")
@@ -165,4 +555,6 @@ async def update_issue(number: int, patch: IssueUpdate):
     if r.status_code != 200:
         raise HTTPException(status_code=502, detail=r.text)
 
-    return r.json()
+    body = r.json()
+    _record_issue_write(request, body, r)
+    return body
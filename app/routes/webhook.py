@@ -1,74 +1,289 @@
-from fastapi import APIRouter, Request, Response, HTTPException
+from fastapi import APIRouter, Header, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
+import asyncio
 import hmac
 import hashlib
-import json
-from datetime import datetime
+from typing import Optional, Tuple
 
-router = APIRouter()
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+from ..eventstream import sse_frame
+from ..metrics import WEBHOOK_DELIVERIES
+from ..registry import repo_scope
+from ..webhook_pipeline import WebhookJob
+from ..webhook_store import EventRecord, EventRing
+from ..timing import TimedRoute
+from .comments import apply_comment_change
+from .issues import apply_issue_change
+
+router = APIRouter(route_class=TimedRoute)
 
 
 def verify_signature(secret: str, signature: str, body: bytes) -> bool:
     mac = hmac.new(secret.encode(), msg=body, digestmod=hashlib.sha256)
+    return signature_matches(mac, signature)
+
+
+def signature_matches(mac: "hmac.HMAC", signature: Optional[str]) -> bool:
     expected = "sha256=" + mac.hexdigest()
     return hmac.compare_digest(signature or "", expected)
 
+
+async def read_signed_body(request: Request, secret: str, max_bytes: int, offload_bytes: int) -> Tuple[bytes, "hmac.HMAC"]:
+    """Read the body as it streams in, enforcing ``max_bytes`` and computing its HMAC.
+
+    Small bodies are hashed chunk by chunk as they arrive. Bodies declared at
+    ``offload_bytes`` or more are hashed once in a worker thread (hashlib
+    releases the GIL), so a large delivery cannot stall other requests.
+    """
+    declared = request.headers.get("content-length")
+    declared_size = int(declared) if declared and declared.isdigit() else None
+    if declared_size is not None and declared_size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Payload exceeds {max_bytes} bytes")
+
+    mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+    offload = declared_size is not None and declared_size >= offload_bytes
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Payload exceeds {max_bytes} bytes")
+        chunks.append(chunk)
+        if not offload:
+            mac.update(chunk)
+    body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+    if offload:
+        await run_in_threadpool(mac.update, body)
+    return body, mac
+
+
+def sync_cache_from_webhook(cache, event_type: str, action: str, payload: dict, repo: Optional[str] = None) -> None:
+    """Invalidate or write through cached issue data for a verified delivery.
+
+    ``repo`` is the cache namespace of the delivery's repository (None for the default one).
+    """
+    issue = payload.get("issue")
+    if event_type not in ("issues", "issue_comment") or not isinstance(issue, dict) or "number" not in issue:
+        return
+
+    # What the issue looked like before this event, as far as the payload tells us
+    previous_states = []
+    previous_labels = []
+    if action == "closed":
+        previous_states.append("open")
+    elif action == "reopened":
+        previous_states.append("closed")
+    elif action == "unlabeled" and isinstance(payload.get("label"), dict):
+        previous_labels.append(payload["label"].get("name"))
+
+    apply_issue_change(
+        cache,
+        issue["number"],
+        issue,
+        previous_states=previous_states,
+        previous_labels=previous_labels,
+        removed=event_type == "issues" and action in ("deleted", "transferred"),
+        repo=repo,
+    )
+    if event_type == "issue_comment":
+        apply_comment_change(cache, issue["number"], payload.get("comment"), removed=action == "deleted", repo=repo)
+
+def parse_payload(body: bytes) -> dict:
+    # orjson works on the raw bytes, no str decode
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+async def handle_delivery(state, job: WebhookJob) -> None:
+    """Pipeline handler: parse in a worker thread, then apply on the event loop."""
+    process_delivery(state, job, await run_in_threadpool(parse_payload, job.body))
+
+
+def process_delivery(state, job: WebhookJob, payload: Optional[dict] = None) -> None:
+    """Handle one verified delivery; ``payload`` is its parsed body, parsed here if not given."""
+    if payload is None:
+        payload = parse_payload(job.body)
+    # Parsed payload gives the action for the dedupe key
+    action = payload.get("action", "unknown")
+
+    # Create dedupe key using delivery ID + action
+    dedupe_key = f"{job.delivery_id}:{action}"
+
+    # Check if already processed (idempotency); remembers the key otherwise
+    if state.processed_webhooks.seen_or_add(dedupe_key):
+        WEBHOOK_DELIVERIES.inc("duplicate")
+        return
+
+    issue_number = payload.get("issue", {}).get("number") if payload.get("issue") else None
+
+    # Durable history (optional), then the in-memory ring buffer of recent deliveries
+    record = EventRecord(job.delivery_id, job.event_type, action, issue_number, len(job.body))
+    event_log = getattr(state, "event_log", None)
+    if event_log is not None:
+        record.seq = event_log.append(job.delivery_id, job.event_type, action, issue_number, job.body,
+                                      record.received_at)
+    state.webhook_events.append(record)
+    stream = getattr(state, "event_stream", None)
+    if stream is not None:
+        stream.publish(record)
+
+    # Keep cached issue reads consistent with GitHub (organization hooks may cover several repositories)
+    repository = payload.get("repository")
+    full_name = repository.get("full_name") if isinstance(repository, dict) else None
+    owner, _, name = (full_name or "").partition("/")
+    scope = repo_scope(state.settings, owner, name) if full_name else None
+    sync_cache_from_webhook(getattr(state, "issue_cache", None), job.event_type, action, payload, scope)
+    mirror = getattr(state, "mirror", None)
+    if mirror is not None and scope is None:
+        mirror.apply_webhook(job.event_type, action, payload)
+
+
 # webhook by lordphone
 @router.post("/webhook", status_code=204)
 async def webhook(request: Request):
-    body = await request.body()
-    signature = request.headers.get("X-Hub-Signature-256")
-    delivery_id = request.headers.get("X-GitHub-Delivery")
-    event_type = request.headers.get("X-GitHub-Event", "unknown")
-    secret = request.app.state.settings.webhook_secret
+    settings = request.app.state.settings
+    body, mac = await read_signed_body(
+        request, settings.webhook_secret, settings.webhook_max_bytes, settings.webhook_hmac_offload_bytes
+    )
 
-    if not verify_signature(secret, signature, body):
+    if not signature_matches(mac, request.headers.get("X-Hub-Signature-256")):
+        WEBHOOK_DELIVERIES.inc("invalid_signature")
         raise HTTPException(status_code=401, detail="Invalid signature")
 
-    # Parse payload to get action for dedupe key
-    try:
-        payload = json.loads(body.decode('utf-8'))
-        action = payload.get("action", "unknown")
-    except (json.JSONDecodeError, UnicodeDecodeError):
-        payload = {}
-        action = "unknown"
-
-    # Create dedupe key using delivery ID + action
-    dedupe_key = f"{delivery_id}:{action}"
-
-    # Check if already processed (idempotency)
-    if dedupe_key in request.app.state.processed_webhooks:
-        # Already processed - return 200 for idempotent response
-        return Response(status_code=200)
-
-    # Store webhook event for debugging
-    event_data = {
-        "id": delivery_id,
-        "event": event_type,
-        "action": action,
-        "issue_number": payload.get("issue", {}).get("number") if payload.get("issue") else None,
-        "timestamp": datetime.utcnow().isoformat(),
-        "payload_size": len(body)
-    }
-
-    # Add to storage
-    request.app.state.webhook_events.append(event_data)
-    request.app.state.processed_webhooks.add(dedupe_key)
-
-    # Keep only last 100 events to prevent memory growth
-    if len(request.app.state.webhook_events) > 100:
-        request.app.state.webhook_events = request.app.state.webhook_events[-100:]
+    job = WebhookJob(
+        request.headers.get("X-GitHub-Delivery"),
+        request.headers.get("X-GitHub-Event", "unknown"),
+        body,
+    )
+    pipeline = getattr(request.app.state, "webhook_pipeline", None)
+    if pipeline is not None and not pipeline.submit(job):
+        # Backpressure: ask the sender to retry instead of buffering without bound
+        WEBHOOK_DELIVERIES.inc("queue_full")
+        raise HTTPException(status_code=503, detail="Webhook queue full", headers={"Retry-After": "5"})
+    WEBHOOK_DELIVERIES.inc("accepted")
+    if pipeline is None:
+        process_delivery(request.app.state, job)
 
+    # Acknowledge immediately; parsing and handling happen in the pipeline
     return Response(status_code=204)
 
 
+MAX_EVENTS_PAGE = 1000
+
+
 # get_events by lordphone
 @router.get("/events")
-async def get_events(request: Request, limit: int = 50):
+async def get_events(
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[int] = None,
+    event: Optional[str] = None,
+    action: Optional[str] = None,
+    issue_number: Optional[int] = None,
+    include_payload: bool = False,
+):
     """
-    Get the last N processed webhook deliveries for debugging.
+    Get processed webhook deliveries for debugging, most recent first.
     Optional endpoint as mentioned in assignment.
+
+    Pages are chained with a ``Link: <...>; rel="next"`` header carrying the
+    cursor. With EVENT_LOG_DIR set the full on-disk history is searchable;
+    otherwise only the in-memory ring buffer of recent deliveries is.
     """
-    events = request.app.state.webhook_events
-    # Return last N events (most recent first)
-    limited_events = events[-limit:] if limit > 0 else events
-    return list(reversed(limited_events))  # Most recent first
+    limit = MAX_EVENTS_PAGE if limit <= 0 else min(limit, MAX_EVENTS_PAGE)
+    event_log = getattr(request.app.state, "event_log", None)
+    if event_log is not None:
+        # A filter can walk a long stretch of the on-disk index; keep that off the event loop
+        events, next_cursor = await run_in_threadpool(
+            event_log.query, cursor, limit, event, action, issue_number, include_payload)
+    else:
+        events, next_cursor = request.app.state.webhook_events.query(cursor, limit, event, action, issue_number)
+
+    if next_cursor is not None:
+        next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return events
+
+
+REPLAY_PAGE = 500
+
+
+@router.get("/events/stream", response_class=StreamingResponse,
+            responses={200: {"content": {"text/event-stream": {}}}})
+async def stream_events(
+    request: Request,
+    event: Optional[str] = None,  # comma-separated event types, e.g. issues,issue_comment
+    action: Optional[str] = None,
+    issue_number: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """Push each new verified delivery as a Server-Sent Event (``id`` = its ``seq``), oldest first.
+
+    With ``Last-Event-ID`` (sent by EventSource on reconnect) the deliveries
+    after that id still held in history are replayed before live ones. A
+    client that falls too far behind is disconnected after an ``event:
+    dropped`` frame and should reconnect.
+    """
+    broker = getattr(request.app.state, "event_stream", None)
+    if broker is None:
+        raise HTTPException(status_code=503, detail="Event stream not available")
+    try:
+        after = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an event seq")
+    types = frozenset(t.strip() for t in (event or "").split(",") if t.strip())
+    if broker.subscribers >= broker.max_subscribers:
+        raise HTTPException(status_code=503, detail="Too many event stream subscribers", headers={"Retry-After": "5"})
+    heartbeat = request.app.state.settings.events_stream_heartbeat
+    event_log = getattr(request.app.state, "event_log", None)
+    history = event_log if event_log is not None else request.app.state.webhook_events
+    if after is not None and after >= history.next_seq:
+        # An id history never reached: it restarted (no EVENT_LOG_DIR) or another worker numbered it; start over
+        after = 0
+    # The in-memory ring is read inline; the event log and the sqlite ring do file reads
+    read_inline = isinstance(history, EventRing)
+
+    async def sse():
+        # Subscribed here, not before the response starts, so a request that never streams holds no slot;
+        # and before replaying, so nothing published meanwhile is missed (duplicates are skipped by seq)
+        sub = broker.subscribe(types, action, issue_number)
+        if sub is None:  # the last slot was taken since the check above; the client retries
+            yield b"retry: 5000\n\n"
+            return
+        last = after
+        try:
+            yield b"retry: 3000\n\n"
+            while last is not None:
+                page = (history.after(last, REPLAY_PAGE) if read_inline
+                        else await run_in_threadpool(history.after, last, REPLAY_PAGE))
+                for record in page:
+                    if sub.matches(record):
+                        yield sse_frame(record)
+                    last = record["seq"]
+                if len(page) < REPLAY_PAGE:
+                    break
+            while True:
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    if sub.dropped:
+                        yield b"event: dropped\ndata: {\"reason\": \"slow consumer\"}\n\n"
+                    return
+                seq, data = frame
+                if last is None or seq > last:
+                    yield data
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
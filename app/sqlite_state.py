@@ -0,0 +1,497 @@
+# app/sqlite_state.py
+"""
+SQLite-backed state shared by every worker process on a node (STATE_BACKEND=sqlite).
+
+Each worker opens its own connection to the same database file in WAL mode,
+so readers never block the single writer and a write is visible to every
+worker as soon as it commits. All statements are short single-row lookups or
+updates on primary keys, so they run inline on the event loop. Writes that
+must land (webhook dedupe, recent events, idempotency claims) wait up to
+STATE_DB_BUSY_TIMEOUT for another worker's write lock. Best-effort writes
+wait only a couple of milliseconds and are skipped if the lock is still
+held: the cache's (storing a response, bumping its LRU recency) and the
+rate-limit bookkeeping, which the next response's headers correct anyway.
+Cross-worker
+races are settled inside SQLite: the dedupe check is one conditional upsert,
+budget spending is an in-place decrement, and budget updates from response
+headers keep the lowest ``remaining`` seen in the current window.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from .cache import CacheEntry
+from .idempotency import CLAIMED, DONE, MISMATCH, PENDING, StoredResponse
+from .ratelimit import RateLimitScheduler, _Budget
+from .state_backend import StateBackend, idempotency_pending_ttl
+from .webhook_store import EventRecord
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, last_modified TEXT, link TEXT,
+    params TEXT, fetched_at REAL NOT NULL, used_at REAL NOT NULL, size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_used_at ON cache (used_at);
+CREATE TABLE IF NOT EXISTS webhook_dedupe (key TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS webhook_dedupe_expires_at ON webhook_dedupe (expires_at);
+CREATE TABLE IF NOT EXISTS webhook_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT, event TEXT NOT NULL, action TEXT NOT NULL,
+    issue_number INTEGER, received_at REAL NOT NULL, payload_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_budget (resource TEXT PRIMARY KEY, "limit" INTEGER, remaining INTEGER, reset_at REAL);
+CREATE TABLE IF NOT EXISTS idempotency (
+    key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status INTEGER, body BLOB, headers TEXT, expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_expires_at ON idempotency (expires_at);
+CREATE TABLE IF NOT EXISTS rate_blocks (scope TEXT PRIMARY KEY, blocked_until REAL NOT NULL);
+"""
+
+# Bump LRU recency at most this often per entry, so cache hits rarely need the write lock
+_TOUCH_INTERVAL = 1.0
+# How long best-effort writes wait for the write lock before giving up (milliseconds)
+_OPTIONAL_BUSY_MS = 2
+
+
+def connect(path: str, busy_timeout: float = 1.0) -> sqlite3.Connection:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Autocommit; multi-statement updates open their own IMMEDIATE transaction
+    db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def try_execute(db: sqlite3.Connection, *statement) -> Optional[sqlite3.Cursor]:
+    """Run a write the caller can do without; None if another worker held the write lock."""
+    restore = db.execute("PRAGMA busy_timeout").fetchone()[0]
+    db.execute(f"PRAGMA busy_timeout = {_OPTIONAL_BUSY_MS}")
+    try:
+        return db.execute(*statement)
+    except sqlite3.OperationalError as e:
+        if "locked" not in str(e):
+            raise
+        return None
+    finally:
+        db.execute(f"PRAGMA busy_timeout = {restore}")
+
+
+class SqliteResponseCache:
+    """ResponseCache with the same interface, stored in the shared database."""
+
+    def __init__(self, db: sqlite3.Connection, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024,
+                 ttl: float = 15.0, stale_ttl: float = 45.0):
+        self.db = db
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.evictions = 0
+        self.busy = 0  # optional writes skipped because another worker held the lock
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _try_write(self, *statement) -> bool:
+        if try_execute(self.db, *statement) is None:
+            self.busy += 1
+            return False
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return self.db.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is not None
+
+    @property
+    def bytes(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    @staticmethod
+    def _entry(row) -> CacheEntry:
+        body, etag, last_modified, link, params, fetched_at = row
+        entry = CacheEntry(body, etag=etag, last_modified=last_modified, link=link,
+                           params=None if params is None else orjson.loads(params))
+        entry.fetched_at = fetched_at
+        return entry
+
+    def _select(self, key: str):
+        return self.db.execute(
+            "SELECT body, etag, last_modified, link, params, fetched_at, used_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = self._select(key)
+        if row is None:
+            self.misses += 1
+            return None
+        now = time.time()
+        if now - row[6] > _TOUCH_INTERVAL:
+            self._try_write("UPDATE cache SET used_at = ? WHERE key = ?", (now, key))
+        entry = self._entry(row[:6])
+        self._count(entry)
+        return entry
+
+    def _count(self, entry: CacheEntry) -> None:
+        if self.is_fresh(entry):
+            self.hits += 1
+        elif self.is_servable_stale(entry):
+            self.stale += 1
+        else:
+            self.misses += 1
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        row = self._select(key)
+        return None if row is None else self._entry(row[:6])
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age() <= self.ttl
+
+    def is_servable_stale(self, entry: CacheEntry) -> bool:
+        return self.ttl < entry.age() <= self.ttl + self.stale_ttl
+
+    def put(self, key: str, entry: CacheEntry) -> CacheEntry:
+        if entry.size > self.max_bytes:
+            self.pop(key)
+            return entry
+        params = None if entry.params is None else orjson.dumps(entry.params)
+        if not self._try_write("BEGIN IMMEDIATE"):
+            return entry  # served uncached this time; the next fetch stores it
+        try:
+            self.db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.body, entry.etag, entry.last_modified, entry.link, params,
+                 entry.fetched_at, time.time(), entry.size),
+            )
+            self._evict()
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return entry
+
+    def touch(self, key: str, entry: CacheEntry) -> CacheEntry:
+        entry.fetched_at = time.time()
+        updated = self.db.execute("UPDATE cache SET fetched_at = ?, used_at = ? WHERE key = ?",
+                                  (entry.fetched_at, entry.fetched_at, key)).rowcount
+        return entry if updated else self.put(key, entry)
+
+    def pop(self, key: str) -> Optional[CacheEntry]:
+        entry = self.peek(key)
+        if entry is not None:
+            self.db.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return entry
+
+    def invalidate_where(self, predicate: Callable[[CacheEntry], bool]) -> int:
+        """Drop every entry the predicate selects (only metadata is loaded to evaluate it)."""
+        rows = self.db.execute("SELECT key, etag, last_modified, link, params, fetched_at FROM cache").fetchall()
+        doomed = [row[0] for row in rows if predicate(self._entry((b"",) + row[1:]))]
+        if doomed:
+            self.db.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in doomed])
+        return len(doomed)
+
+    def clear(self) -> None:
+        self.db.execute("DELETE FROM cache")
+
+    def _evict(self) -> None:
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM cache ORDER BY used_at").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "stale": self.stale, "misses": self.misses,
+                "evictions": self.evictions, "busy": self.busy}
+
+
+class SqliteDedupeStore:
+    """DedupeStore shared by all workers: a delivery key is claimed by exactly one of them."""
+
+    def __init__(self, db: sqlite3.Connection, max_entries: int = 100_000, ttl: float = 24 * 3600,
+                 prune_every: int = 1000):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._adds = 0
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM webhook_dedupe WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        row = self.db.execute("SELECT expires_at FROM webhook_dedupe WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def seen_or_add(self, key: str) -> bool:
+        """Return True if the key was already seen (and unexpired); otherwise remember it."""
+        now = time.time()
+        # Inserts a new key or revives an expired one; an unexpired key changes no row
+        claimed = self.db.execute(
+            "INSERT INTO webhook_dedupe VALUES (?, ?) ON CONFLICT (key) DO UPDATE "
+            "SET expires_at = excluded.expires_at WHERE webhook_dedupe.expires_at <= ?",
+            (key, now + self.ttl, now),
+        ).rowcount
+        if not claimed:
+            return True
+        self._adds += 1
+        if self._adds % self.prune_every == 0:
+            self.prune(now)
+        return False
+
+    def prune(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self.db.execute("DELETE FROM webhook_dedupe WHERE expires_at <= ?", (now,))
+        self.db.execute(
+            "DELETE FROM webhook_dedupe WHERE key IN (SELECT key FROM webhook_dedupe ORDER BY expires_at DESC "
+            "LIMIT -1 OFFSET ?)", (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "capacity": self.max_entries, "ttl_seconds": self.ttl}
+
+
+class SqliteEventRing:
+    """EventRing shared by all workers; keeps the newest ``capacity`` records."""
+
+    def __init__(self, db: sqlite3.Connection, capacity: int = 100):
+        self.db = db
+        self.capacity = max(1, capacity)
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM webhook_events").fetchone()[0]
+
+    def append(self, record: EventRecord) -> None:
+        """Store a record, assigning the next sequence number unless it already has one."""
+        cursor = self.db.execute(
+            "INSERT OR REPLACE INTO webhook_events VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (record.seq or None, record.id, record.event, record.action, record.issue_number,
+             record.received_at, record.payload_size),
+        )
+        record.seq = cursor.lastrowid
+        self.db.execute("DELETE FROM webhook_events WHERE seq <= ?", (record.seq - self.capacity,))
+
+    def query(self, before: Optional[int] = None, limit: int = 50, event: Optional[str] = None,
+              action: Optional[str] = None, issue_number: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """Newest-first records with ``seq < before`` matching the filters, plus the next-page cursor."""
+        clauses, args = [], []
+        for column, value in (("seq <", before), ("event =", event), ("action =", action),
+                              ("issue_number =", issue_number)):
+            if value is not None:
+                clauses.append(f"{column} ?")
+                args.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.db.execute(
+            "SELECT seq, id, event, action, issue_number, received_at, payload_size FROM webhook_events "
+            f"{where} ORDER BY seq DESC LIMIT ?", (*args, limit),
+        ).fetchall()
+        results = [EventRecord(id, ev, act, number, size, ts, seq=seq).to_dict()
+                   for seq, id, ev, act, number, ts, size in rows]
+        return results, (rows[-1][0] if len(rows) >= limit else None)
+
+    @property
+    def next_seq(self) -> int:
+        row = self.db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'webhook_events'").fetchone()
+        return (row[0] if row else 0) + 1
+
+    def after(self, seq: int, limit: int = 500) -> List[dict]:
+        """Up to ``limit`` records with a sequence number above ``seq``, oldest first."""
+        rows = self.db.execute(
+            "SELECT seq, id, event, action, issue_number, received_at, payload_size FROM webhook_events "
+            "WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit),
+        ).fetchall()
+        return [EventRecord(id, ev, act, number, size, ts, seq=seq).to_dict()
+                for seq, id, ev, act, number, ts, size in rows]
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "capacity": self.capacity}
+
+
+class SqliteIdempotencyStore:
+    """IdempotencyStore shared by all workers: a key is claimed by one of them, and others poll for its result."""
+
+    def __init__(self, db: sqlite3.Connection, max_entries: int = 10_000, ttl: float = 24 * 3600,
+                 pending_ttl: float = 120.0, poll_interval: float = 0.05, prune_every: int = 100):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.poll_interval = poll_interval
+        self.prune_every = prune_every
+        self._claims = 0
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM idempotency WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        now = time.time()
+        # Inserts a new claim or takes over an expired one; a live key changes no row
+        claimed = self.db.execute(
+            "INSERT INTO idempotency VALUES (?, ?, NULL, NULL, NULL, ?) ON CONFLICT (key) DO UPDATE "
+            "SET fingerprint = excluded.fingerprint, status = NULL, body = NULL, headers = NULL, "
+            "expires_at = excluded.expires_at WHERE idempotency.expires_at <= ?",
+            (key, fingerprint, now + self.pending_ttl, now),
+        ).rowcount
+        if claimed:
+            self._claims += 1
+            if self._claims % self.prune_every == 0:
+                self.prune(now)
+            return CLAIMED, None
+        row = self.db.execute("SELECT fingerprint, status, body, headers FROM idempotency WHERE key = ?",
+                              (key,)).fetchone()
+        if row is None:  # released between the two statements
+            return PENDING, None
+        stored_fingerprint, status, body, headers = row
+        if stored_fingerprint != fingerprint:
+            return MISMATCH, None
+        if status is None:
+            return PENDING, None
+        return DONE, StoredResponse(status, body, orjson.loads(headers))
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        self.db.execute("UPDATE idempotency SET status = ?, body = ?, headers = ?, expires_at = ? WHERE key = ?",
+                        (response.status, response.body, orjson.dumps(response.headers), time.time() + self.ttl, key))
+
+    def release(self, key: str) -> None:
+        self.db.execute("DELETE FROM idempotency WHERE key = ? AND status IS NULL", (key,))
+
+    async def wait(self, key: str, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            row = self.db.execute("SELECT status FROM idempotency WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] is not None:
+                return
+            await asyncio.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+
+    def prune(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self.db.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+        self.db.execute(
+            "DELETE FROM idempotency WHERE key IN (SELECT key FROM idempotency ORDER BY expires_at DESC "
+            "LIMIT -1 OFFSET ?)", (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        count, pending = self.db.execute(
+            "SELECT COUNT(*), COUNT(*) - COUNT(status) FROM idempotency WHERE expires_at > ?", (time.time(),)
+        ).fetchone()
+        return {"entries": count, "pending": pending, "capacity": self.max_entries, "ttl_seconds": self.ttl}
+
+
+class SqliteRateLimitScheduler(RateLimitScheduler):
+    """RateLimitScheduler whose budgets and secondary-limit block are shared by all workers.
+
+    ``namespace`` separates the budgets of different tokens (see app.registry);
+    the default token's budget is stored under the bare resource names.
+    """
+
+    def __init__(self, db: sqlite3.Connection, namespace: str = "", **kwargs):
+        self.db = db
+        self.namespace = namespace
+        self.busy = 0  # updates skipped because another worker held the lock
+        super().__init__(**kwargs)
+
+    def _key(self, resource: str) -> str:
+        return f"{self.namespace}:{resource}" if self.namespace else resource
+
+    @property
+    def blocked_until(self) -> float:
+        row = self.db.execute("SELECT blocked_until FROM rate_blocks WHERE scope = ?", (self.namespace,)).fetchone()
+        return 0.0 if row is None else row[0]
+
+    @blocked_until.setter
+    def blocked_until(self, value: float) -> None:
+        # Only ever extended: another worker may already have backed off for longer
+        self._try_write(
+            "INSERT INTO rate_blocks VALUES (?, ?) ON CONFLICT (scope) DO UPDATE "
+            "SET blocked_until = MAX(blocked_until, excluded.blocked_until)", (self.namespace, value)
+        )
+
+    def _try_write(self, *statement) -> None:
+        # Bookkeeping runs after GitHub answered; a busy lock must not turn that answer into an error
+        if try_execute(self.db, *statement) is None:
+            self.busy += 1
+            logger.warning("Skipped a rate-limit update for %r: state database is locked", self.namespace or "default")
+
+    def _budget(self, resource: str) -> _Budget:
+        budget = super()._budget(resource)
+        row = self.db.execute('SELECT "limit", remaining, reset_at FROM rate_budget WHERE resource = ?',
+                              (self._key(resource),)).fetchone()
+        if row is not None:
+            budget.limit, budget.remaining, budget.reset_at = row
+        return budget
+
+    def _spend(self, resource: str, budget: _Budget) -> None:
+        # Decrement in place so concurrent workers never spend the same unit twice
+        self._try_write("UPDATE rate_budget SET remaining = remaining - 1 WHERE resource = ? AND remaining IS NOT NULL",
+                        (self._key(resource),))
+        budget.remaining -= 1
+
+    def _save(self, resource: str, budget: _Budget) -> None:
+        # Responses from different workers arrive out of order; within one window the lowest count wins
+        self._try_write(
+            'INSERT INTO rate_budget VALUES (?, ?, ?, ?) ON CONFLICT (resource) DO UPDATE SET "limit" = excluded."limit", '
+            "remaining = CASE WHEN excluded.remaining IS NULL OR rate_budget.remaining IS NULL "
+            "OR rate_budget.reset_at IS NOT excluded.reset_at THEN excluded.remaining "
+            "ELSE MIN(rate_budget.remaining, excluded.remaining) END, reset_at = excluded.reset_at",
+            (self._key(resource), budget.limit, budget.remaining, budget.reset_at),
+        )
+
+    def snapshot(self) -> dict:
+        for (key,) in self.db.execute("SELECT resource FROM rate_budget").fetchall():
+            namespace, _, resource = key.rpartition(":")
+            if namespace == self.namespace:
+                self._budget(resource)
+        return {**super().snapshot(), "busy": self.busy}
+
+
+class SqliteBackend(StateBackend):
+    name = "sqlite"
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.path = settings.state_db_path
+        self.db = connect(self.path, settings.state_db_busy_timeout)
+
+    def response_cache(self) -> SqliteResponseCache:
+        s = self.settings
+        return SqliteResponseCache(self.db, max_entries=s.cache_max_entries, max_bytes=s.cache_max_bytes,
+                                   ttl=s.cache_ttl, stale_ttl=s.cache_stale_ttl)
+
+    def dedupe_store(self) -> SqliteDedupeStore:
+        return SqliteDedupeStore(self.db, max_entries=self.settings.webhook_dedupe_max,
+                                 ttl=self.settings.webhook_dedupe_ttl)
+
+    def event_ring(self) -> SqliteEventRing:
+        return SqliteEventRing(self.db, self.settings.webhook_events_capacity)
+
+    def idempotency_store(self) -> SqliteIdempotencyStore:
+        s = self.settings
+        return SqliteIdempotencyStore(self.db, max_entries=s.idempotency_max_entries, ttl=s.idempotency_ttl,
+                                      pending_ttl=idempotency_pending_ttl(s))
+
+    def rate_scheduler(self, namespace: str = "") -> SqliteRateLimitScheduler:
+        s = self.settings
+        return SqliteRateLimitScheduler(self.db, namespace, read_reserve=s.rate_limit_read_reserve,
+                                        bulk_reserve=s.rate_limit_bulk_reserve, max_wait=s.rate_limit_max_wait)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "path": self.path, "pid": os.getpid()}
+
+    def close(self) -> None:
+        self.db.close()
@@ -0,0 +1,93 @@
+# app/state_backend.py
+"""
+Pluggable storage for the state the app keeps between requests.
+
+A backend builds the response cache, the webhook dedupe store, the recent
+events buffer, the Idempotency-Key store and the rate-limit scheduler that
+the lifespan puts on ``app.state``. Route code only uses their common
+methods, so either backend can be plugged in:
+
+* ``memory`` (default) - per-process structures; right for a single worker.
+* ``sqlite`` - one SQLite database in WAL mode shared by every worker on the
+  node (``uvicorn --workers N``), so workers share one cache, one rate-limit
+  budget and process each webhook delivery exactly once.
+"""
+from .cache import ResponseCache
+from .config import Settings
+from .idempotency import IdempotencyStore
+from .ratelimit import RateLimitScheduler
+from .webhook_store import DedupeStore, EventRing
+
+BACKENDS = ("memory", "sqlite")
+
+
+def idempotency_pending_ttl(settings: Settings) -> float:
+    # An unfinished claim outlives any request that could still be running for it
+    return 2 * max(settings.idempotency_wait, settings.http_timeout + settings.rate_limit_max_wait)
+
+
+class StateBackend:
+    """Factory for the stores kept on app.state; subclasses decide where the data lives."""
+
+    name = ""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+
+    def response_cache(self):
+        raise NotImplementedError
+
+    def dedupe_store(self):
+        raise NotImplementedError
+
+    def event_ring(self):
+        raise NotImplementedError
+
+    def idempotency_store(self):
+        raise NotImplementedError
+
+    def rate_scheduler(self, namespace: str = "") -> RateLimitScheduler:
+        """``namespace`` names the token whose budget this scheduler tracks ("" for GITHUB_TOKEN)."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(StateBackend):
+    name = "memory"
+
+    def response_cache(self) -> ResponseCache:
+        s = self.settings
+        return ResponseCache(max_entries=s.cache_max_entries, max_bytes=s.cache_max_bytes,
+                             ttl=s.cache_ttl, stale_ttl=s.cache_stale_ttl)
+
+    def dedupe_store(self) -> DedupeStore:
+        return DedupeStore(max_entries=self.settings.webhook_dedupe_max, ttl=self.settings.webhook_dedupe_ttl)
+
+    def event_ring(self) -> EventRing:
+        return EventRing(self.settings.webhook_events_capacity)
+
+    def idempotency_store(self) -> IdempotencyStore:
+        s = self.settings
+        return IdempotencyStore(max_entries=s.idempotency_max_entries, ttl=s.idempotency_ttl,
+                                pending_ttl=idempotency_pending_ttl(s))
+
+    def rate_scheduler(self, namespace: str = "") -> RateLimitScheduler:
+        s = self.settings
+        return RateLimitScheduler(read_reserve=s.rate_limit_read_reserve, bulk_reserve=s.rate_limit_bulk_reserve,
+                                  max_wait=s.rate_limit_max_wait)
+
+
+def create_backend(settings: Settings) -> StateBackend:
+    """Build the backend named by STATE_BACKEND."""
+    name = settings.state_backend.strip().lower()
+    if name == "memory":
+        return MemoryBackend(settings)
+    if name == "sqlite":
+        from .sqlite_state import SqliteBackend
+        return SqliteBackend(settings)
+    raise ValueError(f"Unknown STATE_BACKEND {settings.state_backend!r}; expected one of {', '.join(BACKENDS)}")
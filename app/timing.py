@@ -0,0 +1,102 @@
+# app/timing.py
+"""
+Per-request phase timing, reported in a ``Server-Timing`` response header.
+
+ServerTimingMiddleware gives every request a fresh phase table in a
+contextvar; code on the request path adds to it with ``phase(name)`` or
+``record(name, seconds)``. Repeated phases (e.g. several upstream calls)
+accumulate. TimedRoute splits FastAPI's own work from the endpoint body:
+``handler`` is time inside the endpoint function and ``validate`` is the rest
+of the route (request parsing, dependencies, response-model validation and
+serialization). ``total`` is measured when the response headers are sent.
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+
+from . import profiling
+
+_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar("server_timing_phases", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def header_value(phases: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items())
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware adding ``Server-Timing`` to every HTTP response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        phases: Dict[str, float] = {}
+        token = _phases.set(phases)
+        settings = getattr(scope["app"].state, "settings", None) if "app" in scope else None
+        enabled = settings is None or settings.server_timing
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and enabled:
+                phases["total"] = time.perf_counter() - start
+                message["headers"] = list(message.get("headers", ())) + [
+                    (b"server-timing", header_value(phases).encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _phases.reset(token)
+            profiling.request_finished()
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records ``handler`` and ``validate`` phases for Server-Timing."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            original = endpoint
+
+            @functools.wraps(original)
+            async def endpoint(*args, **kw):
+                with phase("handler"):
+                    return await original(*args, **kw)
+
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                phases = _phases.get()
+                if phases is not None:
+                    phases["validate"] = max(0.0, time.perf_counter() - start - phases.get("handler", 0.0))
+
+        return timed_handler
@@ -0,0 +1,102 @@
+# app/webhook_pipeline.py
+"""
+Verify-then-enqueue webhook ingestion.
+
+The /webhook handler only checks the HMAC and submits the raw delivery here;
+one consumer task hands deliveries to the (async) handler in arrival order,
+off the request path. The handler does its CPU-heavy part - parsing - in a
+thread, and its state updates on the event loop, where the stores it touches
+need no locking; more consumers would only interleave those updates. The
+queue is bounded: when it is full the handler answers 503 so GitHub (or an
+operator redelivering) retries later. On shutdown queued deliveries are drained.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookJob:
+    __slots__ = ("delivery_id", "event_type", "body", "received_at")
+
+    def __init__(self, delivery_id: Optional[str], event_type: str, body: bytes):
+        self.delivery_id = delivery_id
+        self.event_type = event_type
+        self.body = body
+        self.received_at = time.monotonic()
+
+
+class WebhookPipeline:
+    def __init__(self, handler: Callable[[WebhookJob], Awaitable[None]], max_queue: int = 1000):
+        self.handler = handler
+        self.queue: "asyncio.Queue[WebhookJob]" = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List["asyncio.Task"] = []
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._work())]
+
+    def submit(self, job: WebhookJob) -> bool:
+        """Enqueue without waiting; False means the queue is full (apply backpressure).
+
+        The consumer is started by the first delivery, so a server that never
+        receives webhooks never runs it.
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                lag = time.monotonic() - job.received_at
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                await self.handler(job)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Webhook delivery %s failed", job.delivery_id)
+            finally:
+                self.queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every delivery queued so far has been handled."""
+        await self.queue.join()
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Finish queued deliveries (up to ``timeout`` seconds), then stop the consumer."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %s queued webhook deliveries on shutdown", self.queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "lag_seconds": round(self.last_lag, 4),
+            "max_lag_seconds": round(self.max_lag, 4),
+        }
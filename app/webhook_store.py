@@ -0,0 +1,164 @@
+# app/webhook_store.py
+"""
+Memory-bounded bookkeeping for webhook deliveries.
+
+DedupeStore remembers delivery keys for a TTL in an LRU bounded by entry
+count, so a long-running process no longer accumulates one string per
+delivery forever. EventRing keeps the last N deliveries as compact
+``__slots__`` records in a fixed-capacity ring buffer, so appending never
+copies the log. Both can report their approximate memory footprint.
+"""
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+_FLOAT_SIZE = sys.getsizeof(0.0)
+
+
+class DedupeStore:
+    """TTL-keyed LRU set of delivery keys."""
+
+    def __init__(self, max_entries: int = 100_000, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self._key_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def __contains__(self, key: str) -> bool:
+        expires = self._expiry.get(key)
+        return expires is not None and expires > time.monotonic()
+
+    def seen_or_add(self, key: str) -> bool:
+        """Return True if the key was already seen (and unexpired); otherwise remember it."""
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._expiry:
+            return True
+        self._expiry[key] = now + self.ttl
+        self._key_bytes += sys.getsizeof(key)
+        while len(self._expiry) > self.max_entries:
+            self._drop_oldest()
+        return False
+
+    def _expire(self, now: float) -> None:
+        # Insertion order == expiry order (constant TTL), so expired keys are at the front
+        while self._expiry:
+            oldest = next(iter(self._expiry.values()))
+            if oldest > now:
+                break
+            self._drop_oldest()
+
+    def _drop_oldest(self) -> None:
+        key, _ = self._expiry.popitem(last=False)
+        self._key_bytes -= sys.getsizeof(key)
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._expiry) + self._key_bytes + len(self._expiry) * _FLOAT_SIZE
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "capacity": self.max_entries, "ttl_seconds": self.ttl,
+                "memory_bytes": self.memory_bytes()}
+
+
+class EventRecord:
+    __slots__ = ("seq", "id", "event", "action", "issue_number", "received_at", "payload_size")
+
+    def __init__(self, id: Optional[str], event: str, action: str, issue_number: Optional[int],
+                 payload_size: int, received_at: Optional[float] = None, seq: int = 0):
+        self.seq = seq
+        self.id = id
+        self.event = event
+        self.action = action
+        self.issue_number = issue_number
+        self.payload_size = payload_size
+        self.received_at = time.time() if received_at is None else received_at
+
+    def matches(self, event: Optional[str], action: Optional[str], issue_number: Optional[int]) -> bool:
+        return ((event is None or self.event == event)
+                and (action is None or self.action == action)
+                and (issue_number is None or self.issue_number == issue_number))
+
+    def to_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "id": self.id,
+            "event": self.event,
+            "action": self.action,
+            "issue_number": self.issue_number,
+            "timestamp": datetime.fromtimestamp(self.received_at, timezone.utc).replace(tzinfo=None).isoformat(),
+            "payload_size": self.payload_size,
+        }
+
+    def memory_bytes(self) -> int:
+        size = sys.getsizeof(self)
+        for name in self.__slots__:
+            size += sys.getsizeof(getattr(self, name))
+        return size
+
+
+class EventRing:
+    """Fixed-capacity ring buffer of EventRecords; the oldest record is overwritten when full."""
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = max(1, capacity)
+        self._slots: List[Optional[EventRecord]] = [None] * self.capacity
+        self._next = 0
+        self._size = 0
+        self.next_seq = 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, record: EventRecord) -> None:
+        """Store a record, assigning the next sequence number unless it already has one."""
+        if not record.seq:
+            record.seq = self.next_seq
+        self.next_seq = record.seq + 1
+        self._slots[self._next] = record
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def newest_first(self) -> Iterator[EventRecord]:
+        for i in range(1, self._size + 1):
+            yield self._slots[(self._next - i) % self.capacity]
+
+    def latest(self, limit: int) -> List[EventRecord]:
+        """The last ``limit`` records, most recent first (all of them if limit <= 0)."""
+        count = self._size if limit <= 0 else min(limit, self._size)
+        records = self.newest_first()
+        return [next(records) for _ in range(count)]
+
+    def query(self, before: Optional[int] = None, limit: int = 50, event: Optional[str] = None,
+              action: Optional[str] = None, issue_number: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """Newest-first records with ``seq < before`` matching the filters, plus the next-page cursor."""
+        results: List[dict] = []
+        for record in self.newest_first():
+            if before is not None and record.seq >= before:
+                continue
+            if record.matches(event, action, issue_number):
+                results.append(record.to_dict())
+                if len(results) >= limit:
+                    return results, record.seq
+        return results, None
+
+    def after(self, seq: int, limit: int = 500) -> List[dict]:
+        """Up to ``limit`` records with a sequence number above ``seq``, oldest first."""
+        results: List[dict] = []
+        for i in range(self._size, 0, -1):
+            record = self._slots[(self._next - i) % self.capacity]
+            if record.seq > seq:
+                results.append(record.to_dict())
+                if len(results) >= limit:
+                    break
+        return results
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._slots) + sum(r.memory_bytes() for r in self._slots if r is not None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "capacity": self.capacity, "memory_bytes": self.memory_bytes()}
@@ -0,0 +1,109 @@
+# benchmarks/bench_client_pool.py
+"""
+Per-request GitHubClient vs the shared, pooled client.
+
+Starts a tiny keep-alive HTTP server on localhost that counts TCP connections,
+then issues the same number of GETs both ways:
+
+    python benchmarks/bench_client_pool.py --requests 500 --concurrency 20
+
+The per-request mode pays client construction (SSL context + certifi load) and
+a fresh connect every time; the pooled mode connects once per pool slot. Against
+api.github.com each fresh connect also costs a TLS handshake, so real savings
+are larger than the loopback numbers shown here.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import github  # noqa: E402
+from app.config import Settings  # noqa: E402
+
+BODY = b'{"number": 1, "title": "bench", "state": "open"}'
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+)
+
+
+class CountingServer:
+    def __init__(self):
+        self.connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _run(mode: str, settings: Settings, n: int, concurrency: int, server: CountingServer):
+    server.connections = 0
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    shared = github.GitHubClient(settings) if mode == "pooled" else None
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            if shared is None:
+                gh = github.GitHubClient(settings)
+                try:
+                    await gh.get_issue(1)
+                finally:
+                    await gh.close()
+            else:
+                await shared.get_issue(1)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - t0
+    if shared is not None:
+        await shared.close()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rps": round(n / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "connections": server.connections,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    server = CountingServer()
+    srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    os.environ["GITHUB_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("GITHUB_TOKEN", "bench")
+    os.environ.setdefault("GITHUB_OWNER", "bench")
+    os.environ.setdefault("GITHUB_REPO", "bench")
+    settings = Settings()
+
+    async with srv:
+        for mode in ("per-request", "pooled"):
+            print(await _run(mode, settings, args.requests, args.concurrency, server))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
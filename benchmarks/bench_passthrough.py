@@ -0,0 +1,86 @@
+# benchmarks/bench_passthrough.py
+"""
+Micro-benchmark of the CPU spent turning one upstream page of issues into a response body.
+
+old:       json = r.json(); FastAPI validates List[IssueOut] and serializes it again
+project:   orjson parse + IssueOut projection + orjson dump (cache miss / refetch)
+cached:    the projected bytes are already in the cache; nothing to do but write them
+
+    python benchmarks/bench_passthrough.py --per-page 30 100
+
+Issues are synthetic but GitHub-shaped (user, labels with ids/colors, reactions,
+URLs), so the projection drops roughly as much as it does in production.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models import IssueOut  # noqa: E402
+from app.projection import project_json  # noqa: E402
+
+
+def make_page(per_page: int) -> bytes:
+    issues = []
+    for n in range(per_page):
+        issues.append({
+            "number": 1000 + n, "title": f"Issue {n}", "body": "Steps to reproduce...\n" * 10, "state": "open",
+            "html_url": f"https://github.com/octocat/Hello-World/issues/{1000 + n}",
+            "url": f"https://api.github.com/repos/octocat/Hello-World/issues/{1000 + n}",
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-02T00:00:00Z",
+            "user": {"login": "octocat", "id": 1, "avatar_url": "https://github.com/images/error/octocat.gif"},
+            "labels": [{"id": i, "name": f"label-{i}", "color": "f29513", "default": False} for i in range(4)],
+            "reactions": {"total_count": 0, "+1": 0, "-1": 0},
+            "comments": 3, "locked": False, "assignees": [], "milestone": None,
+        })
+    return json.dumps(issues).encode()
+
+
+ADAPTER = TypeAdapter(List[IssueOut])
+
+
+def old_path(content: bytes) -> bytes:
+    # What a route returning r.json() costs: stdlib parse, then response_model validation + dump
+    data = json.loads(content)
+    return ADAPTER.dump_json(ADAPTER.validate_python(data))
+
+
+def project_path(content: bytes) -> bytes:
+    return project_json(content)
+
+
+def cached_path(content: bytes) -> bytes:
+    return content
+
+
+def bench(fn, arg, seconds: float = 0.5):
+    n = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        fn(arg)
+        n += 1
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-page", type=int, nargs="+", default=[30, 100])
+    args = parser.parse_args()
+    for per_page in args.per_page:
+        page = make_page(per_page)
+        projected = project_path(page)
+        assert orjson.loads(old_path(page)) == orjson.loads(projected)
+        old_us, new_us, hit_us = bench(old_path, page), bench(project_path, page), bench(cached_path, projected)
+        print(f"{per_page:>4} issues  old {old_us:8.1f} us  project {new_us:8.1f} us ({old_us / new_us:.1f}x)  "
+              f"cache hit {hit_us:6.2f} us  body {len(page)} -> {len(projected)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark: how long a fresh process takes to answer its first request.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --output results/after.json --compare results/before.json
+
+Each run uses a new interpreter, so nothing is warm but the OS page cache:
+
+phases:   ``import app.main``, ``create_app()``, lifespan startup and the first
+          ``GET /healthz`` through the ASGI app, timed inside one process
+process:  ``uvicorn app.main:app`` spawned until ``/healthz`` first answers 200
+          (interpreter start included - what a scale-to-zero instance pays)
+
+Medians over the runs are printed and written to a JSON file; ``--compare``
+exits non-zero if any median grew by more than ``--max-regression``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+ENV = {"GITHUB_TOKEN": "bench", "GITHUB_OWNER": "bench", "GITHUB_REPO": "bench", "WEBHOOK_SECRET": "bench"}
+
+
+async def _phases() -> Dict[str, float]:
+    start = time.perf_counter()
+    sys.path.insert(0, str(ROOT))
+    from app.main import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            r = await client.get("/healthz")
+            r.raise_for_status()
+        answered = time.perf_counter()
+    return {
+        "import_ms": (imported - start) * 1000,
+        "create_app_ms": (created - imported) * 1000,
+        "lifespan_ms": (started - created) * 1000,
+        "first_response_ms": (answered - started) * 1000,
+        "total_ms": (answered - start) * 1000,
+    }
+
+
+def run_phases() -> Dict[str, float]:
+    out = subprocess.run([sys.executable, __file__, "--phases-child"], cwd=ROOT, env={**os.environ, **ENV},
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_process(port: int) -> float:
+    start = time.perf_counter()
+    proc = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--no-access-log",
+    ], cwd=ROOT, env={**os.environ, **ENV}, stdout=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=1) as client:
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError("gateway exited during startup")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/healthz").status_code == 200:
+                        return (time.perf_counter() - start) * 1000
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Medians that grew by more than ``max_regression`` (a fraction)."""
+    regressions = []
+    for name, now in current["medians"].items():
+        before = baseline.get("medians", {}).get(name)
+        if before and now > before * (1 + max_regression):
+            regressions.append(f"{name}: {before} -> {now} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-process", action="store_true", help="only time the in-process phases")
+    parser.add_argument("--output", help="JSON results file (default benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--phases-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phases_child:
+        print(json.dumps(asyncio.run(_phases())))
+        return 0
+
+    samples: Dict[str, List[float]] = {}
+    for _ in range(args.runs):
+        for name, ms in run_phases().items():
+            samples.setdefault(name, []).append(ms)
+        if not args.skip_process:
+            samples.setdefault("process_ms", []).append(run_process(_free_port()))
+
+    medians = {name: round(statistics.median(values), 1) for name, values in samples.items()}
+    for name, ms in medians.items():
+        print(f"{name:<20} {ms:>8} ms  (min {min(samples[name]):.1f}, max {max(samples[name]):.1f})")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k != "phases_child"},
+        },
+        "medians": medians,
+        "samples": {name: [round(v, 1) for v in values] for name, values in samples.items()},
+    }
+    output = Path(args.output) if args.output else (
+        ROOT / "benchmarks" / "results" / f"startup-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"results written to {output}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# benchmarks/fake_github.py
+"""
+Local stand-in for the parts of the GitHub REST/GraphQL API this gateway uses.
+
+    python benchmarks/fake_github.py --port 9100 --latency-ms 40 --jitter-ms 10 --issues 500
+
+Behaves enough like api.github.com for load tests to be meaningful:
+
+* configurable per-call latency (mean + uniform jitter)
+* strong ETags on every read, ``If-None-Match`` answered with 304
+* ``page``/``per_page`` pagination with a GitHub-style ``Link`` header, and
+  ``since``/``sort=updated`` on issue and comment listings
+* ``X-RateLimit-*`` headers counting down from ``--rate-limit``; once the
+  budget is gone calls get 403 until the window resets
+* issue/comment writes, and the aliased ``issueOrPullRequest`` GraphQL query
+
+``GET /_stats`` returns upstream call counts per route (``POST /_stats/reset``
+clears them), so a benchmark can report how many GitHub calls each gateway
+route cost.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import orjson
+from fastapi import FastAPI, Request, Response
+
+_ALIAS = re.compile(r"(i\d+): issueOrPullRequest\(number: (\d+)\)")
+
+
+def _issue(number: int, now: str) -> dict:
+    return {
+        "number": number, "title": f"Issue {number}", "body": "Steps to reproduce...\n" * 5,
+        "state": "open" if number % 3 else "closed",
+        "html_url": f"https://github.com/bench/bench/issues/{number}",
+        "url": f"https://api.github.com/repos/bench/bench/issues/{number}",
+        "labels": [{"id": number % 5, "name": f"label-{number % 5}", "color": "f29513", "default": False}],
+        "user": {"login": "octocat", "id": 1}, "comments": 0, "locked": False,
+        "created_at": now, "updated_at": now,
+    }
+
+
+def create_fake_github(latency_ms: float = 0.0, jitter_ms: float = 0.0, issues: int = 500,
+                       rate_limit: int = 5000, rate_window: float = 3600.0) -> FastAPI:
+    app = FastAPI()
+    now = "2024-01-01T00:00:00Z"
+    store: Dict[int, dict] = {n: _issue(n, now) for n in range(1, issues + 1)}
+    threads: Dict[int, List[dict]] = {}
+    calls: Counter = Counter()
+    budget = {"remaining": rate_limit, "reset_at": time.time() + rate_window}
+
+    async def upstream(route: str, request: Request, status: int = 200, body=None,
+                       link: Optional[str] = None) -> Response:
+        calls[route] += 1
+        if latency_ms or jitter_ms:
+            await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+        resource = "graphql" if route == "graphql" else "core"
+        if time.time() >= budget["reset_at"]:
+            budget.update(remaining=rate_limit, reset_at=time.time() + rate_window)
+        headers = {"X-RateLimit-Limit": str(rate_limit), "X-RateLimit-Resource": resource,
+                   "X-RateLimit-Reset": str(int(budget["reset_at"]))}
+        if budget["remaining"] <= 0:
+            headers["X-RateLimit-Remaining"] = "0"
+            calls["rate_limited"] += 1
+            return Response(orjson.dumps({"message": "API rate limit exceeded"}), 403, headers,
+                            media_type="application/json")
+        budget["remaining"] -= 1
+        headers["X-RateLimit-Remaining"] = str(budget["remaining"])
+        content = orjson.dumps(body)
+        if request.method == "GET" and status == 200:
+            etag = f'"{hashlib.md5(content).hexdigest()}"'
+            headers["ETag"] = etag
+            if link:
+                headers["Link"] = link
+            if request.headers.get("If-None-Match") == etag:
+                calls[f"{route}:304"] += 1
+                return Response(status_code=304, headers=headers)
+        return Response(content, status, headers, media_type="application/json")
+
+    def page_of(request: Request, items: List[dict]):
+        page = int(request.query_params.get("page", 1))
+        per_page = min(int(request.query_params.get("per_page", 30)), 100)
+        last = max(1, -(-len(items) // per_page))
+        base = str(request.url.remove_query_params(["page", "per_page"]))
+        sep = "&" if "?" in base else "?"
+        rels = ([("next", page + 1), ("last", last)] if page < last else []) + \
+               ([("prev", page - 1), ("first", 1)] if page > 1 else [])
+        link = ", ".join(f'<{base}{sep}page={p}&per_page={per_page}>; rel="{rel}"' for rel, p in rels) or None
+        start = (page - 1) * per_page
+        return items[start:start + per_page], link
+
+    @app.get("/repos/{owner}/{repo}/issues")
+    async def list_issues(request: Request, state: str = "open", labels: Optional[str] = None,
+                          since: Optional[str] = None, sort: str = "created", direction: str = "desc"):
+        order = (lambda i: (i["updated_at"], i["number"])) if sort == "updated" else (lambda i: i["number"])
+        items = [i for i in sorted(store.values(), key=order, reverse=direction != "asc")
+                 if (state == "all" or i["state"] == state) and (since is None or i["updated_at"] >= since)]
+        if labels:
+            wanted = set(labels.split(","))
+            items = [i for i in items if wanted <= {lbl["name"] for lbl in i["labels"]}]
+        body, link = page_of(request, items)
+        return await upstream("list_issues", request, body=body, link=link)
+
+    @app.post("/repos/{owner}/{repo}/issues")
+    async def create_issue(request: Request):
+        payload = orjson.loads(await request.body())
+        number = max(store, default=0) + 1
+        store[number] = {**_issue(number, now), "title": payload.get("title", ""), "body": payload.get("body")}
+        return await upstream("create_issue", request, 201, store[number])
+
+    @app.get("/repos/{owner}/{repo}/issues/{number}")
+    async def get_issue(number: int, request: Request):
+        if number not in store:
+            return await upstream("get_issue", request, 404, {"message": "Not Found"})
+        return await upstream("get_issue", request, body=store[number])
+
+    @app.patch("/repos/{owner}/{repo}/issues/{number}")
+    async def update_issue(number: int, request: Request):
+        if number not in store:
+            return await upstream("update_issue", request, 404, {"message": "Not Found"})
+        payload = orjson.loads(await request.body())
+        store[number].update({k: v for k, v in payload.items() if k in ("title", "body", "state")})
+        store[number]["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        return await upstream("update_issue", request, body=store[number])
+
+    @app.post("/repos/{owner}/{repo}/issues/{number}/comments")
+    async def create_comment(number: int, request: Request):
+        payload = orjson.loads(await request.body())
+        calls["comment_id"] += 1
+        comment = {"id": calls["comment_id"], "body": payload.get("body", ""), "user": {"login": "octocat"},
+                   "created_at": now, "updated_at": now,
+                   "html_url": f"https://github.com/bench/bench/issues/{number}#issuecomment-{calls['comment_id']}"}
+        threads.setdefault(number, []).append(comment)
+        return await upstream("create_comment", request, 201, comment)
+
+    @app.get("/repos/{owner}/{repo}/issues/{number}/comments")
+    async def list_comments(number: int, request: Request, since: Optional[str] = None):
+        items = [c for c in threads.get(number, []) if since is None or c["updated_at"] >= since]
+        body, link = page_of(request, items)
+        return await upstream("list_comments", request, body=body, link=link)
+
+    @app.post("/graphql")
+    async def graphql(request: Request):
+        query = orjson.loads(await request.body())["query"]
+        repository = {}
+        for alias, number in _ALIAS.findall(query):
+            issue = store.get(int(number))
+            repository[alias] = None if issue is None else {
+                "number": issue["number"], "url": issue["html_url"], "title": issue["title"], "body": issue["body"],
+                "state": issue["state"].upper(), "createdAt": issue["created_at"], "updatedAt": issue["updated_at"],
+                "labels": {"nodes": [{"name": lbl["name"]} for lbl in issue["labels"]]},
+            }
+        return await upstream("graphql", request, body={"data": {"repository": repository}})
+
+    @app.get("/_stats")
+    async def stats():
+        return {"calls": {k: v for k, v in calls.items() if k != "comment_id"}, "rate_remaining": budget["remaining"]}
+
+    @app.post("/_stats/reset")
+    async def reset():
+        comment_id = calls["comment_id"]
+        calls.clear()
+        calls["comment_id"] = comment_id
+        return {"ok": True}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--issues", type=int, default=500)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    args = parser.parse_args()
+    app = create_fake_github(args.latency_ms, args.jitter_ms, args.issues, args.rate_limit)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
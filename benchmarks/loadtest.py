@@ -0,0 +1,276 @@
+# benchmarks/loadtest.py
+"""
+Reproducible load test of every gateway route against a local GitHub stand-in.
+
+    python benchmarks/loadtest.py --requests 300 --concurrency 20 --latency-ms 30
+    python benchmarks/loadtest.py --workers 4 --output results/after.json --compare results/before.json
+
+Starts benchmarks/fake_github.py and the gateway (``uvicorn app.main:app``,
+with ``GITHUB_API_URL`` pointing at the fake) as subprocesses on free ports,
+then drives each scenario with a fixed number of requests at a fixed
+concurrency. Per scenario it reports RPS, p50/p95/p99/max latency, status
+codes, errors (plus failed items inside 200 batch and lookup responses)
+and the upstream GitHub calls the scenario cost, and writes
+everything to a JSON file. ``--compare`` checks the run against an earlier
+result file and exits non-zero if any scenario's p95 or RPS regressed by more
+than ``--max-regression``.
+
+Environment variables such as STATE_BACKEND or CACHE_TTL are passed through
+to the gateway, so configurations can be compared run against run.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
+
+ROOT = Path(__file__).resolve().parents[1]
+SECRET = "bench-secret"
+Request = Tuple[str, str, dict]
+# Routes answering 200 with a per-item status for each element of the body
+MULTI_STATUS_SUFFIXES = (":batch", ":get")
+
+
+def _signed_delivery(i: int) -> dict:
+    body = orjson.dumps({"action": "edited", "issue": {
+        "number": i % 200 + 1, "title": f"Issue {i % 200 + 1}", "state": "open", "labels": [],
+        "html_url": "https://github.com/bench/bench/issues/1", "body": None,
+        "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+    }})
+    signature = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return {"content": body, "headers": {
+        "Content-Type": "application/json", "X-Hub-Signature-256": signature,
+        "X-GitHub-Event": "issues", "X-GitHub-Delivery": f"bench-{time.time_ns()}-{i}",
+    }}
+
+
+# name -> (request builder for the i-th call, fraction of --requests to send)
+SCENARIOS: Dict[str, Tuple[Callable[[int], Request], float]] = {
+    "healthz": (lambda i: ("GET", "/healthz", {}), 1.0),
+    "list_issues": (lambda i: ("GET", "/issues", {"params": {"state": "all", "page": i % 5 + 1, "per_page": 50}}), 1.0),
+    "get_issue": (lambda i: ("GET", f"/issues/{i % 200 + 1}", {}), 1.0),
+    "get_issues_by_number": (lambda i: ("POST", "/issues:get",
+                                        {"json": {"numbers": list(range(i % 50 + 1, i % 50 + 21))}}), 1.0),
+    "issue_changes": (lambda i: ("GET", "/issues/changes", {}), 1.0),
+    "stream_issues": (lambda i: ("GET", "/issues/stream", {"params": {"state": "all"}}), 0.1),
+    "create_issue": (lambda i: ("POST", "/issues", {"json": {"title": f"bench {i}", "body": "load test"}}), 1.0),
+    # Retry storm: every key is sent ten times and should reach GitHub once
+    "create_issue_retries": (lambda i: ("POST", "/issues", {"json": {"title": f"retry {i // 10}"},
+                                                             "headers": {"Idempotency-Key": f"bench-{i // 10}"}}), 1.0),
+    "update_issue": (lambda i: ("PATCH", f"/issues/{i % 200 + 1}", {"json": {"title": f"renamed {i}"}}), 1.0),
+    "create_comment": (lambda i: ("POST", f"/issues/{i % 200 + 1}/comments", {"json": {"body": f"c{i}"}}), 1.0),
+    "list_comments": (lambda i: ("GET", f"/issues/{i % 200 + 1}/comments", {"params": {"limit": 50}}), 1.0),
+    "create_issues_batch": (lambda i: ("POST", "/issues:batch",
+                                       {"json": [{"title": f"batch {i}.{k}"} for k in range(10)]}), 0.2),
+    "create_comments_batch": (lambda i: ("POST", "/issues/comments:batch",
+                                         {"json": [{"number": k + 1, "body": f"b{i}.{k}"} for k in range(10)]}), 0.2),
+    "webhook": (lambda i: ("POST", "/webhook", _signed_delivery(i)), 1.0),
+    "events": (lambda i: ("GET", "/events", {"params": {"limit": 50}}), 1.0),
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {proc.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def run_scenario(client: httpx.AsyncClient, fake: Optional[httpx.AsyncClient], name: str,
+                       total: int, concurrency: int) -> dict:
+    build, _ = SCENARIOS[name]
+    if fake is not None:
+        await fake.post("/_stats/reset")
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    item_statuses: Counter = Counter()
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, path, kwargs = build(i)
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, **kwargs)
+                statuses[r.status_code] += 1
+                if r.status_code >= 400:
+                    errors += 1
+                elif path.endswith(MULTI_STATUS_SUFFIXES):
+                    for item in r.json():
+                        item_statuses[item["status"]] += 1
+            except httpx.HTTPError:
+                statuses["transport_error"] += 1
+                errors += 1
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    upstream = (await fake.get("/_stats")).json()["calls"] if fake is not None else {}
+    upstream_total = sum(v for k, v in upstream.items() if ":" not in k and k != "rate_limited")
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "errors": errors,
+        "status": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        # Failed items inside successful batch and lookup responses
+        "item_errors": sum(v for k, v in item_statuses.items() if k >= 400),
+        "item_status": {str(k): v for k, v in sorted(item_statuses.items())},
+        "upstream_calls": upstream,
+        "upstream_per_request": round(upstream_total / total, 3) if total else 0.0,
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Scenarios whose p95 rose or RPS fell by more than ``max_regression`` (a fraction)."""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if before["rps"] and now["rps"] < before["rps"] * (1 - max_regression):
+            regressions.append(f"{name}: rps {before['rps']} -> {now['rps']}")
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario (before its weight)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="fake GitHub latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--issues", type=int, default=500)
+    parser.add_argument("--rate-limit", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=1, help="gateway uvicorn workers")
+    parser.add_argument("--gateway-url", help="benchmark an already running gateway instead of starting one")
+    parser.add_argument("--output", help="JSON results file (default benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    procs: List[subprocess.Popen] = []
+    fake = None
+    try:
+        gateway_url = args.gateway_url
+        if gateway_url is None:
+            fake_port, gateway_port = _free_port(), _free_port()
+            fake_url = f"http://127.0.0.1:{fake_port}"
+            procs.append(subprocess.Popen([
+                sys.executable, str(ROOT / "benchmarks" / "fake_github.py"), "--port", str(fake_port),
+                "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                "--issues", str(args.issues), "--rate-limit", str(args.rate_limit),
+            ]))
+            await _wait_ready(f"{fake_url}/_stats", procs[-1])
+            env = {**os.environ, "GITHUB_API_URL": fake_url, "GITHUB_TOKEN": "bench", "GITHUB_OWNER": "bench",
+                   "GITHUB_REPO": "bench", "WEBHOOK_SECRET": SECRET}
+            procs.append(subprocess.Popen([
+                sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(gateway_port),
+                "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+            ], cwd=ROOT, env=env, stdout=subprocess.DEVNULL))
+            gateway_url = f"http://127.0.0.1:{gateway_port}"
+            await _wait_ready(f"{gateway_url}/healthz", procs[-1])
+            fake = httpx.AsyncClient(base_url=fake_url)
+
+        results = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": vars(args),
+            },
+            "scenarios": {},
+        }
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=gateway_url, limits=limits, timeout=60) as client:
+            for name in names:
+                total = max(1, int(args.requests * SCENARIOS[name][1]))
+                result = await run_scenario(client, fake, name, total, args.concurrency)
+                results["scenarios"][name] = result
+                print(f"{name:<22} {result['rps']:>8} rps  p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms"
+                      f"  p99 {result['p99_ms']:>8} ms  errors {result['errors']:>4}"
+                      f"  item errors {result['item_errors']:>4}"
+                      f"  upstream/req {result['upstream_per_request']}")
+    finally:
+        if fake is not None:
+            await fake.aclose()
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait(timeout=15)
+
+    output = Path(args.output) if args.output else (
+        ROOT / "benchmarks" / "results" / f"loadtest-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"results written to {output}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
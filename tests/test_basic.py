@@ -6,4 +6,4 @@ def test_healthz():
     c = TestClient(app)
     r = c.get("/healthz")
     assert r.status_code == 200
-    assert r.json() == {"status": "ok"}
+    assert r.json()["status"] == "ok"
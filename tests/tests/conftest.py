@@ -40,6 +40,27 @@ def client() -> TestClient:
         _seed_app_state()
         yield c
 
+@pytest.fixture(autouse=True)
+def _fresh_caches():
+    # the TestClient is session-scoped, so cached GitHub reads would leak across tests
+    cache = getattr(app.state, "issue_cache", None)
+    if cache is not None:
+        cache.clear()
+    gh = getattr(app.state, "github", None)
+    if gh is not None:
+        for breaker in gh.breakers.values():
+            breaker.reset()
+    yield
+
+@pytest.fixture
+def drain_webhooks(client):
+    # webhook deliveries are handled on background workers; wait for them in assertions
+    def drain():
+        pipeline = getattr(client.app.state, "webhook_pipeline", None)
+        if pipeline is not None:
+            client.portal.call(pipeline.join)
+    return drain
+
 @pytest.fixture
 def settings():
     return get_settings()
@@ -0,0 +1,31 @@
+# tests/unit/test_app_factory.py
+import pathlib
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+
+ROOT = pathlib.Path(__file__).resolve().parents[4]
+
+
+def test_create_app_uses_given_settings_and_defers_optional_work():
+    settings = Settings(github_token="t", github_owner="o", github_repo="r", webhook_secret="s")
+    app = create_app(settings)
+    with TestClient(app) as c:
+        assert c.get("/healthz").json()["status"] == "ok"
+        assert app.state.settings is settings
+        # No upstream call and no webhook yet: no TLS client built, no workers started
+        assert app.state.github._connections.client is None
+        assert app.state.webhook_pipeline._tasks == []
+    assert create_app(settings) is not app
+
+
+def test_importing_config_has_no_side_effects():
+    code = ("import sys; import app.config as c; assert 'dotenv' not in sys.modules; "
+            "c.get_settings(); c.get_settings()")
+    r = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout == ""
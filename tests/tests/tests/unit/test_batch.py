@@ -0,0 +1,20 @@
+# tests/unit/test_batch.py
+import asyncio
+
+from fastapi import HTTPException
+
+from app.batch import run_batch
+
+
+def test_unexpected_errors_fail_only_their_item():
+    async def handler(item):
+        if item == "missing":
+            raise HTTPException(status_code=404, detail="Issue not found")
+        if item == "broken":
+            raise ValueError("malformed upstream body")
+        return 201, {"title": item}
+
+    results = asyncio.run(run_batch(["a", "broken", "missing", "b"], handler, concurrency=2))
+    assert [r["status"] for r in results] == [201, 500, 404, 201]
+    assert results[1] == {"index": 1, "status": 500, "error": "Internal Server Error"}
+    assert results[3]["data"] == {"title": "b"}
@@ -0,0 +1,97 @@
+# tests/unit/test_breaker.py
+import pytest
+
+from app.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from app.config import get_settings
+
+S = get_settings()
+OWNER = S.github_owner or "octocat"
+REPO = S.github_repo or "hello-world"
+
+
+def _issue(number):
+    return {"number": number, "html_url": f"https://github.com/{OWNER}/{REPO}/issues/{number}",
+            "state": "open", "title": "t", "body": None, "labels": [],
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z"}
+
+
+def test_breaker_opens_probes_and_closes():
+    b = CircuitBreaker("read", failure_rate=0.5, window=10, min_calls=4, slow_call=1.0, open_seconds=30)
+    b.allow(); b.record(0.1, failed=False)
+    b.allow(); b.record(0.1, failed=True)
+    b.allow(); b.record(2.0, failed=False)  # slow counts as failed
+    assert b.state == CLOSED
+    b.allow(); b.record(0.1, failed=False)
+    assert b.state == OPEN and b.opened == 1
+    with pytest.raises(CircuitOpen) as exc:
+        b.allow()
+    assert exc.value.retry_after >= 29 and b.rejected == 1
+
+    b.opened_at -= 31
+    b.allow()  # the single half-open probe
+    assert b.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        b.allow()
+    b.record(0.1, failed=True)
+    assert b.state == OPEN and b.opened == 2
+
+    b.opened_at -= 31
+    b.allow()
+    b.record(0.1, failed=False)
+    assert b.state == CLOSED
+    b.allow()
+
+
+def test_abandoned_probe_frees_the_slot():
+    b = CircuitBreaker("write", min_calls=1, open_seconds=0)
+    b.allow(); b.record(0.1, failed=True)
+    b.allow()
+    b.abandon()
+    b.allow()
+    assert b.state == HALF_OPEN
+
+
+def test_timeouts_follow_observed_latency():
+    b = CircuitBreaker("read", read_timeout=30, connect_timeout=5, pool_timeout=5)
+    assert (b.timeout.read, b.timeout.connect, b.timeout.pool) == (30, 5, 5)
+    for _ in range(40):
+        b.record(0.1, failed=False)
+    assert (b.timeout.read, b.timeout.connect, b.timeout.pool) == (2.0, 0.5, 0.5)  # floors
+    for _ in range(200):
+        b.record(1.0, failed=False)
+    assert (b.timeout.read, b.timeout.connect, b.timeout.pool) == (4.0, 4.0, 2.0)
+    for _ in range(200):
+        b.record(9.0, failed=False)
+    assert (b.timeout.read, b.timeout.connect, b.timeout.pool) == (30, 5, 5)  # ceilings
+    assert b.stats()["latency_p99"] == 9.0
+
+
+def test_open_circuit_serves_cache_or_fails_fast(client, respx_mocked):
+    route = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/61").respond(status_code=200, json=_issue(61))
+    assert client.get("/issues/61").status_code == 200
+
+    cache = client.app.state.issue_cache
+    for entry in cache._entries.values():
+        entry.fetched_at -= cache.ttl + cache.stale_ttl + 1
+    breaker = client.app.state.github.breakers["read"]
+    breaker._trip()
+
+    cached = client.get("/issues/61")
+    assert cached.status_code == 200 and cached.headers["X-Cache"] == "FALLBACK"
+    assert cached.json()["number"] == 61
+    failed = client.get("/issues/62")  # not cached, and no upstream call is made
+    assert failed.status_code == 503 and int(failed.headers["Retry-After"]) > 0
+    assert route.call_count == 1
+
+    health = client.get("/healthz").json()
+    assert health["status"] == "degraded" and health["circuits"]["read"]["state"] == "open"
+    assert health["circuits"]["write"]["state"] == "closed"
+
+
+def test_upstream_5xx_trips_the_breaker(client, respx_mocked):
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/63").respond(status_code=500, json={"message": "down"})
+    breaker = client.app.state.github.breakers["read"]
+    for _ in range(breaker.min_calls):
+        assert client.get("/issues/63").status_code == 502
+    assert breaker.state == OPEN
+    assert client.get("/issues/63").status_code == 503
@@ -0,0 +1,46 @@
+# tests/unit/test_cache.py
+from app.cache import CacheEntry, ResponseCache
+
+
+def test_lru_evicts_least_recently_used_by_count():
+    c = ResponseCache(max_entries=2, max_bytes=1000)
+    c.put("a", CacheEntry(b"1"))
+    c.put("b", CacheEntry(b"2"))
+    c.get("a")                      # a becomes most recent
+    c.put("c", CacheEntry(b"3"))
+    assert "a" in c and "c" in c and "b" not in c
+    assert c.evictions == 1
+
+
+def test_byte_budget_and_oversized_entries():
+    c = ResponseCache(max_entries=10, max_bytes=10)
+    c.put("a", CacheEntry(b"x" * 6))
+    c.put("b", CacheEntry(b"y" * 6))
+    assert "a" not in c and c.bytes == 6
+    c.put("huge", CacheEntry(b"z" * 11))
+    assert "huge" not in c and "b" in c
+
+
+def test_ttl_and_stale_window():
+    c = ResponseCache(ttl=10, stale_ttl=5)
+    e = c.put("k", CacheEntry(b"{}"))
+    assert c.is_fresh(e)
+    e.fetched_at -= 12
+    assert not c.is_fresh(e) and c.is_servable_stale(e)
+    e.fetched_at -= 10
+    assert not c.is_servable_stale(e)
+    c.touch("k", e)
+    assert c.is_fresh(e)
+
+
+def test_only_fresh_lookups_count_as_hits():
+    c = ResponseCache(ttl=10, stale_ttl=5)
+    e = c.put("k", CacheEntry(b"{}"))
+    c.get("k")
+    e.fetched_at -= 12
+    c.get("k")
+    e.fetched_at -= 10
+    assert c.get("k") is e  # still returned, for conditional revalidation
+    c.get("missing")
+    assert (c.hits, c.stale, c.misses) == (1, 1, 2)
+    assert c.stats()["stale"] == 1
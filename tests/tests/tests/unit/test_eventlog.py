@@ -0,0 +1,102 @@
+# tests/unit/test_eventlog.py
+import os
+import time
+
+import pytest
+
+from app.eventlog import EventLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=200)
+    yield log
+    log.close()
+
+
+def _fill(log, n=10):
+    for i in range(1, n + 1):
+        log.append(f"d{i}", "issues" if i % 2 else "issue_comment", "opened" if i % 3 else "closed",
+                   i % 4 or None, b'{"n": %d}' % i)
+
+
+def test_append_rotates_and_queries_newest_first(log):
+    _fill(log)
+    assert len(log.segments) > 1
+    records, cursor = log.query(limit=4)
+    assert [r["seq"] for r in records] == [10, 9, 8, 7] and cursor == 7
+    older, _ = log.query(before=cursor, limit=100)
+    assert [r["seq"] for r in older] == [6, 5, 4, 3, 2, 1]
+    assert older[0]["id"] == "d6" and older[0]["payload_size"] == len(b'{"n": 6}')
+
+
+def test_after_reads_forward_across_segments(log):
+    _fill(log)
+    assert [r["seq"] for r in log.after(3)] == [4, 5, 6, 7, 8, 9, 10]
+    assert [r["seq"] for r in log.after(0, limit=2)] == [1, 2]
+    assert log.after(10) == [] and log.after(4, limit=1)[0]["id"] == "d5"
+
+
+def test_filters_use_the_index(log):
+    _fill(log)
+    assert [r["seq"] for r in log.query(event="issues", action="closed")[0]] == [9, 3]
+    assert [r["seq"] for r in log.query(issue_number=1)[0]] == [9, 5, 1]
+    with_payload, cursor = log.query(issue_number=1, limit=1, include_payload=True)
+    assert with_payload[0]["payload"] == {"n": 9} and cursor == 9
+
+
+def test_filters_on_long_names_check_the_full_name(log):
+    log.append("d1", "branch_protection_configuration", "enabled", None, b"{}")
+    log.append("d2", "branch_protection_configuration_x", "enabled", None, b"{}")
+    log.append("d3", "repository_vulnerability_alert", "create", None, b"{}")
+    assert [r["id"] for r in log.query(event="branch_protection_configuration")[0]] == ["d1"]
+    assert [r["id"] for r in log.query(event="branch_protection_configuration_x")[0]] == ["d2"]
+    assert [r["id"] for r in log.query(event="repository_vulnerability_alert")[0]] == ["d3"]
+    assert log.query(event="repository_vulnerability")[0] == []
+
+
+def test_query_from_a_thread_while_appending(log):
+    from concurrent.futures import ThreadPoolExecutor
+
+    _fill(log)
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(log.query, None, 1000, "issues")
+        for i in range(11, 41):  # rotates and remaps while the query may be running
+            log.append(f"d{i}", "issues", "opened", None, b"{}")
+        records, _ = future.result()
+    seqs = [r["seq"] for r in records]
+    assert seqs == sorted(seqs, reverse=True) and {1, 3, 5, 7, 9} <= set(seqs)
+
+
+def test_readers_skip_a_segment_deleted_mid_read(log):
+    _fill(log)
+    first = log.segments[0]
+    first.delete()  # as retention does while a replay thread holds its snapshot
+    assert [r["seq"] for r in log.after(0)] == list(range(first.next_seq, 11))
+    assert log.query(limit=100)[0][-1]["seq"] == first.next_seq
+
+
+def test_reopen_recovers_and_drops_torn_writes(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=1 << 20)
+    _fill(log, 3)
+    log.close()
+    active = sorted(p for p in os.listdir(tmp_path) if p.endswith(".idx"))[-1]
+    with open(tmp_path / active, "ab") as f:
+        f.write(b"partial")
+
+    reopened = EventLog(str(tmp_path), segment_bytes=1 << 20)
+    assert reopened.next_seq == 4
+    assert reopened.append("d4", "issues", "opened", 1, b"{}") == 4
+    assert [r["id"] for r in reopened.query()[0]] == ["d4", "d3", "d2", "d1"]
+    reopened.close()
+
+
+def test_retention_deletes_old_segments(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=50, retention_seconds=60)
+    old = time.time() - 3600
+    for i in range(3):
+        log.append(f"old{i}", "issues", "opened", 1, b"x" * 60, received_at=old)
+    log.append("new", "issues", "opened", 1, b"x" * 60)
+    log.append("newer", "issues", "opened", 1, b"x" * 60)
+    assert [r["id"] for r in log.query()[0]] == ["newer", "new"]
+    log.close()
@@ -0,0 +1,121 @@
+# tests/unit/test_eventstream.py
+import asyncio
+
+from app.config import Settings
+from app.eventstream import EventBroker
+from app.main import create_app
+from app.webhook_store import EventRecord, EventRing
+
+
+def _record(seq, event="issues", action="opened", number=1):
+    return EventRecord(f"d{seq}", event, action, number, 10, seq=seq)
+
+
+def test_broker_filters_and_drops_slow_consumers():
+    async def run():
+        broker = EventBroker(queue_size=2)
+        everything = broker.subscribe()
+        comments = broker.subscribe(frozenset({"issue_comment"}))
+        closed = broker.subscribe(action="closed", issue_number=7)
+        broker.publish(_record(1))
+        broker.publish(_record(2, "issue_comment"))
+        broker.publish(_record(3, action="closed", number=7))
+        assert everything.dropped and broker.dropped == 1 and broker.subscribers == 2
+        assert everything.queue.get_nowait() is None  # cleared and ended
+        seq, frame = comments.queue.get_nowait()
+        assert seq == 2 and frame.startswith(b"id: 2\ndata: {") and comments.queue.empty()
+        assert closed.queue.get_nowait()[0] == 3
+        broker.close()
+        assert broker.subscribers == 0 and closed.queue.get_nowait() is None
+
+    asyncio.run(run())
+
+
+def test_ring_after_is_oldest_first():
+    ring = EventRing(capacity=3)
+    for seq in range(1, 6):
+        ring.append(_record(seq))
+    assert [r["seq"] for r in ring.after(0)] == [3, 4, 5]
+    assert [r["seq"] for r in ring.after(3, limit=1)] == [4]
+
+
+async def _read_stream(app, path, query, headers, until):
+    body = bytearray()
+    done = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+            if until in body:
+                done.set()
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+             "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+             "client": ("test", 1), "server": ("test", 80)}
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return bytes(body)
+
+
+def _stream_ids(history, live, query, last_event_id, until):
+    async def run():
+        app = create_app(Settings(github_token="t", github_owner="o", github_repo="r", webhook_secret="s"))
+        async with app.router.lifespan_context(app):
+            ring, broker = app.state.webhook_events, app.state.event_stream
+            for record in history:
+                ring.append(record)
+
+            async def publish_live():
+                while broker.subscribers == 0:
+                    await asyncio.sleep(0.001)
+                for record in live:
+                    ring.append(record)
+                    broker.publish(record)
+
+            publisher = asyncio.ensure_future(publish_live())
+            body = await _read_stream(app, "/events/stream", query, {"Last-Event-ID": last_event_id}, until)
+            await publisher
+            assert broker.subscribers == 0
+        return body
+
+    body = asyncio.run(run())
+    assert body.startswith(b"retry: ")
+    return [line for line in body.split(b"\n") if line.startswith(b"id: ")]
+
+
+def test_stream_replays_after_last_event_id_then_pushes_live():
+    ids = _stream_ids([_record(1), _record(2, "issue_comment"), _record(3)], [_record(4, "issue_comment"), _record(5)],
+                      b"event=issues", "1", b"id: 5\n")
+    assert ids == [b"id: 3", b"id: 5"]
+
+
+def test_stream_starts_over_when_last_event_id_is_ahead_of_history():
+    # e.g. the ring restarted at seq 1 after a restart, or the reconnect reached another worker
+    ids = _stream_ids([_record(1), _record(2)], [_record(3)], b"", "500", b"id: 3\n")
+    assert ids == [b"id: 1", b"id: 2", b"id: 3"]
+
+
+def test_stream_that_never_starts_holds_no_subscriber_slot():
+    from starlette.requests import Request
+
+    from app.routes.webhook import stream_events
+
+    async def run():
+        app = create_app(Settings(github_token="t", github_owner="o", github_repo="r", webhook_secret="s"))
+        async with app.router.lifespan_context(app):
+            request = Request({"type": "http", "app": app, "method": "GET", "path": "/events/stream",
+                               "query_string": b"", "headers": []})
+            response = await stream_events(request, None, None, None, None)
+            del response  # e.g. the client went away before the body was sent
+            return app.state.event_stream.subscribers
+
+    assert asyncio.run(run()) == 0
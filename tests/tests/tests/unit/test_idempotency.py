@@ -0,0 +1,68 @@
+# tests/unit/test_idempotency.py
+import asyncio
+
+import httpx
+
+from app.config import get_settings
+from app.idempotency import CLAIMED, DONE, MISMATCH, PENDING, IdempotencyStore, StoredResponse
+
+S = get_settings()
+OWNER = S.github_owner or "octocat"
+REPO = S.github_repo or "hello-world"
+ISSUE = {"number": 41, "html_url": "u", "state": "open", "title": "t", "body": None, "labels": [],
+         "created_at": "c", "updated_at": "u"}
+
+
+def test_duplicates_wait_for_the_request_in_flight():
+    async def run():
+        store = IdempotencyStore(max_entries=2)
+        assert store.claim("k", "f1") == (CLAIMED, None)
+        assert store.claim("k", "f2") == (MISMATCH, None)
+        assert store.claim("k", "f1") == (PENDING, None)
+
+        waiter = asyncio.ensure_future(store.wait("k", 5))
+        await asyncio.sleep(0)
+        store.complete("k", StoredResponse(201, b"{}", {}))
+        await asyncio.wait_for(waiter, 1)
+        state, stored = store.claim("k", "f1")
+        assert state == DONE and stored.body == b"{}"
+
+        store.claim("a", "f")
+        store.claim("b", "f")  # over max_entries: the oldest record goes
+        assert len(store) == 2 and store.claim("k", "f1")[0] == CLAIMED
+        store.release("k")
+        assert store.claim("k", "f1")[0] == CLAIMED
+
+    asyncio.run(run())
+
+
+def test_create_issue_replays_first_response(client, respx_mocked):
+    route = respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues").mock(side_effect=[
+        httpx.Response(502, json={"message": "bad gateway"}),
+        httpx.Response(201, json={**ISSUE, "user": {"login": "me"}}),
+    ])
+    headers = {"Idempotency-Key": "create-41"}
+    # A failed attempt does not keep the key
+    assert client.post("/issues", json={"title": "t"}, headers=headers).status_code == 502
+
+    first = client.post("/issues", json={"title": "t"}, headers=headers)
+    assert first.status_code == 201 and first.json() == ISSUE and first.headers["Location"] == "/issues/41"
+    retry = client.post("/issues", json={"title": "t"}, headers=headers)
+    assert retry.status_code == 201 and retry.content == first.content
+    assert retry.headers["Idempotent-Replayed"] == "true" and retry.headers["Location"] == "/issues/41"
+    assert route.call_count == 2
+
+    assert client.post("/issues", json={"title": "other"}, headers=headers).status_code == 422
+
+
+def test_create_comment_replays_per_issue(client, respx_mocked):
+    comment = {"id": 7, "body": "hi", "user": {"login": "me"}, "created_at": "c", "html_url": "u"}
+    route = respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues/5/comments").respond(201, json=comment)
+    respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues/6/comments").respond(201, json=comment)
+    headers = {"Idempotency-Key": "comment-1"}
+    for _ in range(3):
+        r = client.post("/issues/5/comments", json={"body": "hi"}, headers=headers)
+        assert r.status_code == 201 and r.json() == comment
+    assert route.call_count == 1
+    # The same key on another issue is a different request
+    assert "Idempotent-Replayed" not in client.post("/issues/6/comments", json={"body": "hi"}, headers=headers).headers
@@ -1,6 +1,13 @@
 # tests/unit/test_issues_more.py
 # code by Nikhil Manam
-from app.config import get_settings
+import asyncio
+import json
+
+import httpx
+import respx
+
+from app.config import Settings, get_settings
+from app.github import GitHubClient
 
 S = get_settings()
 OWNER = S.github_owner or "octocat"
@@ -29,3 +36,221 @@ def test_patch_issue_502_on_upstream_error(client, respx_mocked):
     respx_mocked.patch(f"/repos/{OWNER}/{REPO}/issues/88").respond(status_code=500, json={"message": "oops"})
     r = client.patch("/issues/88", json={"state": "closed"})
     assert r.status_code == 502
+
+def _issue(number, **extra):
+    return {"number": number, "html_url": f"https://github.com/{OWNER}/{REPO}/issues/{number}",
+            "state": "open", "title": "t", "body": None, "labels": [],
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z", **extra}
+
+
+def test_requests_share_one_pooled_client(client, respx_mocked):
+    r41 = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/41").respond(status_code=200, json=_issue(41))
+    r42 = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/42").respond(status_code=200, json=_issue(42))
+    gh = client.app.state.github
+    assert client.get("/issues/41").status_code == 200
+    assert client.get("/issues/42").status_code == 200
+    assert r41.call_count == 1 and r42.call_count == 1
+    assert client.app.state.github is gh
+    assert not gh.client.is_closed
+    assert get_settings() is get_settings()
+
+
+def test_client_honours_github_api_url():
+    settings = Settings(github_api_url="http://127.0.0.1:9100/", github_owner="o", github_repo="r")
+
+    async def run():
+        gh = GitHubClient(settings)
+        try:
+            with respx.mock(base_url="http://127.0.0.1:9100") as mock:
+                route = mock.get("/repos/o/r/issues/1").respond(200, json=_issue(1))
+                graphql = mock.post("/graphql").respond(200, json={"data": {}})
+                assert (await gh.get_issue(1)).status_code == 200
+                await gh.graphql("query { viewer { login } }")
+                assert route.called and graphql.called
+        finally:
+            await gh.close()
+
+    asyncio.run(run())
+
+
+def test_list_issues_served_from_cache_and_revalidated(client, respx_mocked):
+    route = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues").mock(side_effect=[
+        httpx.Response(200, json=[_issue(1)], headers={"ETag": 'W/"v1"', "Link": '<x?page=2>; rel="next"'}),
+        httpx.Response(304, headers={"ETag": 'W/"v1"'}),
+    ])
+    first = client.get("/issues?state=closed")
+    assert first.status_code == 200
+    assert first.headers["ETag"] == 'W/"v1"' and first.headers["X-Cache"] == "MISS"
+
+    hit = client.get("/issues?state=closed")
+    assert hit.json() == first.json() and hit.headers["X-Cache"] == "HIT"
+    assert hit.headers["Link"] == '<x?page=2>; rel="next"'
+    assert route.call_count == 1
+
+    # Expire the entry: GitHub's 304 is answered with the cached body, not an empty 304
+    cache = client.app.state.issue_cache
+    for entry in cache._entries.values():
+        entry.fetched_at -= cache.ttl + cache.stale_ttl + 1
+    revalidated = client.get("/issues?state=closed")
+    assert revalidated.status_code == 200
+    assert revalidated.json() == first.json() and revalidated.headers["X-Cache"] == "REVALIDATED"
+    assert route.calls[-1].request.headers["If-None-Match"] == 'W/"v1"'
+
+    # Client-side conditional GET is answered from memory
+    assert client.get("/issues?state=closed", headers={"If-None-Match": 'W/"v1"'}).status_code == 304
+    assert route.call_count == 2
+
+
+def test_get_issue_conditional_headers(client, respx_mocked):
+    lm = "Mon, 01 Jan 2024 00:00:00 GMT"
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/9").respond(
+        status_code=200, json=_issue(9), headers={"ETag": '"e9"', "Last-Modified": lm}
+    )
+    r = client.get("/issues/9")
+    assert r.headers["ETag"] == '"e9"' and r.headers["Last-Modified"] == lm
+    assert client.get("/issues/9", headers={"If-None-Match": '"e9"'}).status_code == 304
+    assert client.get("/issues/9", headers={"If-Modified-Since": lm}).status_code == 304
+    assert client.get("/issues/9", headers={"If-None-Match": '"old"'}).status_code == 200
+
+
+def test_reads_return_projected_issueout_bytes(client, respx_mocked):
+    upstream = _issue(12, labels=[{"id": 1, "name": "bug", "color": "f00"}], user={"login": "octocat"}, comments=4)
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues", params={"state": "closed"}).respond(200, json=[upstream])
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/12").respond(200, json=upstream, headers={"ETag": '"e12"'})
+
+    listed = client.get("/issues", params={"state": "closed"})
+    assert listed.json() == [{**_issue(12), "labels": [{"name": "bug"}]}]
+
+    subset = client.get("/issues/12", params={"fields": "number,labels"})
+    assert subset.json() == {"number": 12, "labels": [{"name": "bug"}]}
+    assert subset.headers["ETag"] == 'W/"e12;number+labels"'
+    assert client.get("/issues/12").headers["ETag"] == '"e12"'
+    again = client.get("/issues/12", params={"fields": "number,labels"},
+                       headers={"If-None-Match": subset.headers["ETag"]})
+    assert again.status_code == 304
+
+    assert client.get("/issues/12", params={"fields": "number,user"}).status_code == 400
+
+
+def test_patch_writes_through_and_invalidates_matching_lists(client, respx_mocked):
+    listing = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues").respond(status_code=200, json=[_issue(5)])
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/5").respond(status_code=200, json=_issue(5))
+    respx_mocked.patch(f"/repos/{OWNER}/{REPO}/issues/5").respond(status_code=200, json=_issue(5, state="closed"))
+
+    client.get("/issues?state=open")
+    client.get("/issues?state=open&labels=bug")   # issue 5 has no "bug" label: unaffected
+    client.get("/issues/5")
+    assert listing.call_count == 2
+
+    assert client.patch("/issues/5", json={"state": "closed"}).status_code == 200
+
+    cached = client.get("/issues/5")
+    assert cached.headers["X-Cache"] == "HIT" and cached.json()["state"] == "closed"
+    assert client.get("/issues?state=open&labels=bug").headers["X-Cache"] == "HIT"
+    assert client.get("/issues?state=open").headers["X-Cache"] == "MISS"
+    assert listing.call_count == 3
+
+
+def test_label_filters_are_invalidated_regardless_of_case():
+    from app.cache import CacheEntry, ResponseCache
+    from app.routes.issues import _generate_cache_key, apply_issue_change
+
+    cache = ResponseCache()
+    keys = {}
+    for labels in ("Bug", "BUG,Docs", "feature"):
+        params = {"state": "open", "page": 1, "per_page": 30, "labels": labels}
+        keys[labels] = _generate_cache_key(params)
+        cache.put(keys[labels], CacheEntry(b"[]", params=params))
+
+    issue = {**_issue(5), "labels": [{"name": "bug"}, {"name": "docs"}]}
+    apply_issue_change(cache, 5, issue, previous_states=["open"], previous_labels=["bug", "docs"])
+    assert keys["Bug"] not in cache and keys["BUG,Docs"] not in cache
+    assert keys["feature"] in cache
+
+
+def test_create_issues_batch_reports_per_item_results(client, respx_mocked):
+    def create(request):
+        title = json.loads(request.content)["title"]
+        if title == "bad":
+            return httpx.Response(422, json={"message": "Validation Failed"})
+        number = int(title.split("-")[1])
+        return httpx.Response(201, json=_issue(number, title=title))
+
+    route = respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues").mock(side_effect=create)
+    r = client.post("/issues:batch", json=[{"title": "t-1"}, {"title": "bad"}, {"title": "t-3", "labels": ["x"]}])
+    assert r.status_code == 200
+    results = r.json()
+    assert [(i["index"], i["status"]) for i in results] == [(0, 201), (1, 400), (2, 201)]
+    assert results[2]["data"]["number"] == 3 and results[1]["error"]
+    assert route.call_count == 3
+
+    client.app.state.settings.batch_max_items, limit = 2, client.app.state.settings.batch_max_items
+    try:
+        assert client.post("/issues:batch", json=[{"title": "a"}] * 3).status_code == 413
+    finally:
+        client.app.state.settings.batch_max_items = limit
+
+
+def test_stream_issues_follows_pages_as_ndjson(client, respx_mocked):
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues", params={"page": "1"}).respond(
+        200, json=[_issue(3, comments=1), _issue(2)], headers={"Link": '<https://x/issues?page=2>; rel="next"'})
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues", params={"page": "2"}).respond(200, json=[_issue(1)])
+
+    r = client.get("/issues/stream?state=all")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [i["number"] for i in lines] == [3, 2, 1]
+    assert "comments" not in lines[0]  # projected to IssueOut
+
+
+def test_stream_issues_maps_first_page_error(client, respx_mocked):
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues").respond(401, json={"message": "Bad credentials"})
+    assert client.get("/issues/stream").status_code == 401
+
+
+def test_get_issues_by_number_uses_one_graphql_query(client, respx_mocked):
+    node = {"number": 1, "url": "https://github.com/o/r/issues/1", "state": "CLOSED", "title": "t", "body": None,
+            "createdAt": "c", "updatedAt": "u", "labels": {"nodes": [{"name": "bug"}]}}
+    route = respx_mocked.post("/graphql").respond(200, json={
+        "data": {"repository": {"i1": node, "i2": None}},
+        "errors": [{"type": "NOT_FOUND", "path": ["repository", "i2"],
+                    "message": "Could not resolve to an issue or pull request with the number of 2."}],
+    })
+    r = client.post("/issues:get", json={"numbers": [1, 2, 1]})
+    assert r.status_code == 200
+    found, missing = r.json()
+    assert found["status"] == 200 and found["data"]["html_url"] == node["url"]
+    assert found["data"]["state"] == "closed" and found["data"]["labels"] == [{"name": "bug"}]
+    assert missing["number"] == 2 and missing["status"] == 404 and "number of 2" in missing["error"]
+    assert route.call_count == 1
+    sent = json.loads(route.calls[0].request.content)
+    assert "i1: issueOrPullRequest(number: 1)" in sent["query"] and sent["variables"]["repo"] == REPO
+
+
+def test_issue_changes_returns_only_unseen_updates(client, respx_mocked):
+    t1, t2 = "2024-03-01T10:00:00Z", "2024-03-01T10:00:05Z"
+    route = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues").mock(side_effect=[
+        httpx.Response(200, json=[_issue(1, updated_at=t1), _issue(2, updated_at=t2)]),
+        # Issue 3 was updated in the same second as issue 2, after the first poll
+        httpx.Response(200, json=[_issue(2, updated_at=t2), _issue(3, updated_at=t2)], headers={"ETag": '"e1"'}),
+        httpx.Response(304),
+    ])
+    first = client.get("/issues/changes")
+    assert first.status_code == 200
+    assert [i["number"] for i in first.json()["issues"]] == [1, 2] and first.json()["has_more"] is False
+    assert "since" not in route.calls[0].request.url.params
+    assert route.calls[0].request.url.params["sort"] == "updated"
+
+    second = client.get("/issues/changes", params={"cursor": first.json()["cursor"]})
+    assert [i["number"] for i in second.json()["issues"]] == [3]
+    # Asked from before the cursor (CHANGES_OVERLAP), by GitHub's clock only
+    assert route.calls[1].request.url.params["since"] == "2024-03-01T09:59:55Z"
+
+    cache = client.app.state.issue_cache
+    for entry in cache._entries.values():
+        entry.fetched_at -= cache.ttl + cache.stale_ttl + 1
+    third = client.get("/issues/changes", params={"cursor": second.json()["cursor"]})
+    assert third.json()["issues"] == [] and third.headers["X-Cache"] == "REVALIDATED"
+    assert route.calls[2].request.headers["If-None-Match"] == '"e1"'
+    assert client.get("/issues/changes", params={"cursor": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,54 @@
+# tests/unit/test_metrics.py
+from app.config import get_settings
+from app.metrics import HTTP_DURATION, Registry, UPSTREAM_DURATION, WEBHOOK_DELIVERIES
+
+S = get_settings()
+OWNER = S.github_owner or "octocat"
+REPO = S.github_repo or "hello-world"
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    h = registry.histogram("demo_seconds", "Demo", ("route",))
+    c = registry.counter("demo_total", "Demo", ("result",))
+    for seconds in (0.002, 0.002, 0.3, 20):
+        h.observe(seconds, '/a"b')
+    c.inc("ok")
+    c.inc("ok", amount=2)
+
+    lines = registry.render()
+    assert "# TYPE demo_seconds histogram" in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="0.001"} 0' in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="0.0025"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="0.5"} 3' in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/a\\"b"} 4' in lines
+    assert 'demo_total{result="ok"} 3' in lines
+
+
+def test_metrics_endpoint_reports_routes_upstream_cache_and_webhooks(client, respx_mocked):
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/404").respond(404, json={"message": "Not Found"})
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/31").respond(200, json={
+        "number": 31, "html_url": "https://github.com/o/r/issues/31", "state": "open", "title": "t", "body": None,
+        "labels": [], "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z"},
+        headers={"X-RateLimit-Remaining": "4321", "X-RateLimit-Limit": "5000", "X-RateLimit-Resource": "core"})
+    routes_before = HTTP_DURATION.count("GET", "/issues/{number}", 200)
+    upstream_before = UPSTREAM_DURATION.count("get_issue", 404)
+    invalid_before = WEBHOOK_DELIVERIES.value("invalid_signature")
+
+    assert client.get("/issues/31").headers["X-Cache"] == "MISS"
+    assert client.get("/issues/31").headers["X-Cache"] == "HIT"
+    assert client.get("/issues/404").status_code == 404
+    assert client.post("/webhook", content=b"{}", headers={"X-Hub-Signature-256": "sha256=bad"}).status_code == 401
+
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert HTTP_DURATION.count("GET", "/issues/{number}", 200) == routes_before + 2
+    assert UPSTREAM_DURATION.count("get_issue", 404) == upstream_before + 1
+    assert WEBHOOK_DELIVERIES.value("invalid_signature") == invalid_before + 1
+    assert 'gateway_cache_results_total{result="HIT"}' in text
+    assert 'github_request_duration_seconds_count{operation="get_issue",status="200"}' in text
+    # 4321 from the headers, minus the optimistic unit spent on the later 404 call
+    assert 'github_rate_limit_remaining{resource="core"} 4320' in text
+    assert "gateway_cache_hits_total" in text and "gateway_webhook_queue_depth 0" in text
@@ -0,0 +1,111 @@
+# tests/unit/test_mirror.py
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+from app.config import get_settings
+from app.mirror import IssueStore, backfill, build_link_header
+
+S = get_settings()
+OWNER = S.github_owner or "octocat"
+REPO = S.github_repo or "hello-world"
+
+
+def _issue(number, state="open", labels=(), updated_at="2024-01-01T00:00:00Z"):
+    return {"number": number, "html_url": f"https://github.com/o/r/issues/{number}", "state": state,
+            "title": f"issue {number}", "body": None, "labels": [{"name": n, "color": "f00"} for n in labels],
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": updated_at, "comments": 3}
+
+
+def _numbers(items):
+    return [orjson.loads(b)["number"] for b in items]
+
+
+def test_store_indexes_by_state_and_labels():
+    store = IssueStore()
+    store.upsert(_issue(1, labels=("bug",)))
+    store.upsert(_issue(2, labels=("bug", "UI")))
+    store.upsert(_issue(3, state="closed", labels=("ui",)))
+
+    assert _numbers(store.query("open", None, 1, 30)[0]) == [2, 1]
+    assert _numbers(store.query("all", "bug,ui", 1, 30)[0]) == [2]
+    assert store.query("all", None, 2, 2) == ([store.get(1)], 3)
+
+    store.upsert(_issue(2, state="closed", updated_at="2024-02-01T00:00:00Z"))
+    assert _numbers(store.query("closed", None, 1, 30)[0]) == [3, 2]
+    assert _numbers(store.query("open", "bug", 1, 30)[0]) == [1]
+
+    # an older copy (e.g. from a slow backfill page) never overwrites a newer one
+    assert not store.upsert(_issue(2, state="open"))
+    store.remove(3)
+    assert _numbers(store.query("all", None, 1, 30)[0]) == [2, 1]
+    assert set(orjson.loads(store.get(1))) == {"number", "html_url", "state", "title", "body", "labels",
+                                               "created_at", "updated_at"}
+
+
+def test_link_header_matches_github_rels():
+    link = build_link_header("http://gw/issues", {"state": "open"}, 2, 10, 35)
+    assert 'page=1&per_page=10>; rel="prev"' in link and 'rel="first"' in link
+    assert 'page=3&per_page=10>; rel="next"' in link and 'page=4&per_page=10>; rel="last"' in link
+    assert build_link_header("http://gw/issues", {}, 1, 30, 5) is None
+
+
+def test_backfill_follows_pagination(respx_mocked):
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues", params={"page": "1"}).respond(
+        200, json=[_issue(2)], headers={"Link": '<https://api.github.com/x?page=2>; rel="next"'})
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues", params={"page": "2"}).respond(200, json=[_issue(1)])
+
+    from app.github import GitHubClient
+
+    async def run():
+        gh = GitHubClient()
+        store = IssueStore()
+        try:
+            await backfill(store, gh)
+        finally:
+            await gh.close()
+        return store
+
+    store = asyncio.run(run())
+    assert store.ready and len(store) == 2
+
+
+@pytest.fixture
+def mirrored(client):
+    store = IssueStore()
+    store.upsert(_issue(10, labels=("bug",)))
+    store.upsert(_issue(11))
+    store.ready = True
+    client.app.state.mirror = store
+    yield store
+    client.app.state.mirror = None
+
+
+def test_routes_answer_from_mirror_without_upstream(client, respx_mocked, mirrored):
+    r = client.get("/issues?per_page=1")
+    assert r.status_code == 200 and r.headers["X-Cache"] == "MIRROR"
+    assert [i["number"] for i in r.json()] == [11]
+    assert 'rel="next"' in r.headers["Link"]
+    assert client.get("/issues?per_page=1", headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+
+    assert client.get("/issues/10").json()["labels"] == [{"name": "bug"}]
+    assert not respx_mocked.calls
+
+    # webhook deliveries keep the replica fresh
+    mirrored.apply_webhook("issues", "closed", {"issue": _issue(11, state="closed", updated_at="2024-03-01")})
+    assert [i["number"] for i in client.get("/issues").json()] == [10]
+
+
+def test_mirror_clamps_page_and_per_page(client, respx_mocked, mirrored):
+    r = client.get("/issues?per_page=0")
+    assert r.status_code == 200 and [i["number"] for i in r.json()] == [11]
+    assert "per_page=1" in r.headers["Link"] and 'rel="next"' in r.headers["Link"]
+
+    r = client.get("/issues?per_page=-5&page=-3")
+    assert r.status_code == 200 and [i["number"] for i in r.json()] == [11]
+    assert 'rel="prev"' not in r.headers["Link"] and "page=2" in r.headers["Link"]
+
+    assert len(client.get("/issues?per_page=500").json()) == 2
+    assert not respx_mocked.calls
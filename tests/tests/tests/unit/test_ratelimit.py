@@ -0,0 +1,67 @@
+# tests/unit/test_ratelimit.py
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.ratelimit import Priority, RateLimited, RateLimitScheduler
+
+S = get_settings()
+OWNER = S.github_owner or "octocat"
+REPO = S.github_repo or "hello-world"
+
+
+def _headers(remaining, reset_in=3600, limit=5000):
+    return {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(time.time() + reset_in)), "X-RateLimit-Resource": "core"}
+
+
+def test_low_budget_sheds_reads_but_admits_writes():
+    sched = RateLimitScheduler(read_reserve=10, bulk_reserve=100, max_wait=1)
+    sched.update(httpx.Response(200, headers=_headers(50)))
+
+    async def run():
+        await sched.acquire(Priority.WRITE)
+        await sched.acquire(Priority.READ)
+        with pytest.raises(RateLimited) as exc:
+            await sched.acquire(Priority.BULK)
+        return exc.value
+
+    exc = asyncio.run(run())
+    assert exc.retry_after > 1000
+    assert sched.snapshot()["resources"]["core"]["remaining"] == 48
+    assert sched.shed == 1
+
+
+def test_low_budget_queues_until_imminent_reset():
+    sched = RateLimitScheduler(read_reserve=10, max_wait=5)
+    sched.update(httpx.Response(200, headers=_headers(3)))
+    sched._budget("core").reset_at = time.time() + 0.05
+    t0 = time.monotonic()
+    asyncio.run(sched.acquire(Priority.READ))
+    assert sched.queued == 1 and time.monotonic() - t0 < 5
+
+
+def test_secondary_limit_backoff_uses_retry_after_with_jitter():
+    sched = RateLimitScheduler(backoff_base=0.5)
+    delay = sched.retry_delay(httpx.Response(403, headers={"Retry-After": "2"}, text="secondary rate limit"), 0)
+    assert 2 <= delay <= 2.5 and sched.blocked_until > time.time()
+    assert sched.retry_delay(httpx.Response(403, text="Resource not accessible"), 0) is None
+    assert sched.retry_delay(httpx.Response(200), 0) is None
+
+
+def test_exhausted_budget_maps_to_429_and_healthz_reports_budget(client, respx_mocked):
+    respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues").respond(
+        status_code=403, json={"message": "API rate limit exceeded"}, headers=_headers(0, reset_in=600)
+    )
+    r = client.post("/issues", json={"title": "x"})
+    assert r.status_code == 429 and int(r.headers["Retry-After"]) > 500
+
+    health = client.get("/healthz").json()
+    assert health["status"] == "ok"
+    assert health["rate_limit"]["resources"]["core"]["remaining"] == 0
+
+    # restore a healthy budget for the rest of the session
+    client.app.state.github.rate.update(httpx.Response(200, headers=_headers(5000)))
@@ -0,0 +1,96 @@
+# tests/unit/test_registry.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.config import Settings
+from app.github import GitHubClient
+from app.ratelimit import RateLimitScheduler
+from app.registry import ClientRegistry, parse_repo_tokens
+
+ISSUE = {"number": 7, "title": "Other repo", "body": None, "state": "open", "labels": [],
+         "html_url": "https://github.com/acme/widgets/issues/7",
+         "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z"}
+
+
+def _registry(**overrides) -> ClientRegistry:
+    settings = Settings(github_token="default", github_owner="octocat", github_repo="hello-world", **overrides)
+    return ClientRegistry(settings, GitHubClient(settings), lambda namespace: RateLimitScheduler())
+
+
+def test_parse_repo_tokens():
+    assert parse_repo_tokens(" Acme/API=t1, acme/*=t2 ,") == [("acme/api", "t1"), ("acme/*", "t2")]
+    with pytest.raises(ValueError):
+        parse_repo_tokens("acme=t1")
+
+
+def test_clients_are_pooled_per_token():
+    registry = _registry(github_repo_tokens="acme/api=t1,acme/*=t2", github_repos="acme/*,other/one")
+    assert registry.get("octocat", "Hello-World") is registry.default
+    api, web = registry.get("acme", "api"), registry.get("acme", "web")
+    assert (api.owner, api.repo, web.repo) == ("acme", "api", "web")
+    assert api.client is not web.client and api.rate is not web.rate
+    assert registry.get("acme", "docs").client is web.client  # same token, same pool and budget
+    assert registry.get("other", "one").client is registry.default.client  # no entry: GITHUB_TOKEN
+    assert api.client.headers["Authorization"] == "Bearer t1"
+    with pytest.raises(HTTPException) as e:
+        registry.get("other", "two")
+    assert e.value.status_code == 404
+    assert registry.stats()["pools"] == 2
+
+
+def test_unlisted_repo_is_rejected_by_default():
+    registry = _registry()
+    assert registry.get("octocat", "hello-world") is registry.default
+    with pytest.raises(HTTPException) as e:
+        registry.get("someone", "else")
+    assert e.value.status_code == 404
+    assert registry.stats()["pools"] == 0
+
+
+def test_idle_and_excess_pools_are_closed():
+    async def run():
+        registry = _registry(github_repo_tokens="a/*=t1,b/*=t2,c/*=t3", github_clients_max=2,
+                             github_client_idle_ttl=60, http_timeout=0)
+        first = registry.get("a", "x").client
+        registry.get("b", "x")
+        registry.get("c", "x")  # over GITHUB_CLIENTS_MAX: the least recently used pool goes
+        assert registry.stats()["pools"] == 2 and registry.evicted == 1
+        await asyncio.sleep(0.01)
+        assert first.is_closed
+
+        registry.idle_ttl = 0
+        registry.get("a", "x")
+        assert registry.stats()["pools"] == 1 and registry.evicted == 3
+        await registry.close()
+
+    asyncio.run(run())
+
+
+def test_repo_routes_use_their_own_client_and_cache(client, respx_mocked):
+    registry = client.app.state.github_registry
+    tokens = registry.tokens
+    registry.tokens = [("acme/*", "acme-token")]
+    try:
+        route = respx_mocked.get("/repos/acme/widgets/issues/7").mock(
+            return_value=httpx.Response(200, json=ISSUE, headers={"ETag": '"w7"'}))
+        default = respx_mocked.get(f"/repos/{registry.default.owner}/{registry.default.repo}/issues/7").mock(
+            return_value=httpx.Response(200, json={**ISSUE, "title": "Default repo"}))
+
+        r = client.get("/repos/acme/widgets/issues/7")
+        assert r.status_code == 200 and r.json()["title"] == "Other repo"
+        assert route.calls.last.request.headers["Authorization"] == "Bearer acme-token"
+        assert client.get("/repos/acme/widgets/issues/7").headers["X-Cache"] == "HIT"
+        # The default repository's copy of issue 7 is a different cache entry
+        assert client.get("/issues/7").json()["title"] == "Default repo"
+        assert route.call_count == 1 and default.call_count == 1
+
+        created = respx_mocked.post("/repos/acme/widgets/issues").mock(
+            return_value=httpx.Response(201, json={**ISSUE, "number": 8}))
+        r = client.post("/repos/acme/widgets/issues", json={"title": "Other repo"})
+        assert r.status_code == 201 and r.headers["Location"] == "/repos/acme/widgets/issues/8"
+        assert created.called
+    finally:
+        registry.tokens = tokens
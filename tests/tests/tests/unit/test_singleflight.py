@@ -0,0 +1,102 @@
+# tests/unit/test_singleflight.py
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.github import GitHubClient
+from app.singleflight import SingleFlight
+
+S = get_settings()
+OWNER = S.github_owner or "octocat"
+REPO = S.github_repo or "hello-world"
+
+
+def test_concurrent_callers_share_one_call():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def run():
+        sf = SingleFlight()
+        results = await asyncio.gather(*(sf.do("k", fetch) for _ in range(20)))
+        assert len(sf) == 0
+        return results, await sf.do("k", fetch)
+
+    results, later = asyncio.run(run())
+    assert results == [1] * 20 and later == 2
+
+
+def test_errors_propagate_to_every_waiter():
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        sf = SingleFlight()
+        return await asyncio.gather(*(sf.do("k", boom) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        sf = SingleFlight()
+        first = asyncio.ensure_future(sf.do("k", slow))
+        second = asyncio.ensure_future(sf.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "ok"
+
+
+def test_last_waiter_cancelling_stops_the_call():
+    async def run():
+        sf = SingleFlight()
+        gate = asyncio.Event()
+
+        async def slow():
+            gate.set()
+            await asyncio.sleep(10)
+
+        waiter = asyncio.ensure_future(sf.do("k", slow))
+        await gate.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return len(sf)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_client_coalesces_identical_reads(respx_mocked):
+    async def slow_response(request):
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"number": 7})
+
+    route = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/7").mock(side_effect=slow_response)
+
+    async def run():
+        gh = GitHubClient()
+        try:
+            responses = await asyncio.gather(*(gh.get_issue(7) for _ in range(50)))
+            other = await gh.get_issue(7, headers={"If-None-Match": '"x"'})
+        finally:
+            await gh.close()
+        return responses, other
+
+    responses, other = asyncio.run(run())
+    assert all(r.json() == {"number": 7} for r in responses)
+    assert route.call_count == 2  # one shared call, plus one with different validators
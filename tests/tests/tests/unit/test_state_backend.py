@@ -0,0 +1,162 @@
+# tests/unit/test_state_backend.py
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.cache import CacheEntry, ResponseCache
+from app.config import Settings
+from app.eventlog import EventLog
+from app.idempotency import CLAIMED, DONE, MISMATCH, PENDING, StoredResponse
+from app.ratelimit import Priority, RateLimited
+from app.state_backend import create_backend
+from app.webhook_store import EventRecord
+
+
+@pytest.fixture
+def workers(tmp_path):
+    # Two backends on one database file behave like two uvicorn workers on a node
+    settings = Settings(state_backend="sqlite", state_db_path=str(tmp_path / "state.db"), cache_max_entries=3)
+    backends = [create_backend(settings), create_backend(settings)]
+    yield backends
+    for backend in backends:
+        backend.close()
+
+
+def test_memory_backend_is_the_default():
+    backend = create_backend(Settings(state_backend="memory"))
+    assert isinstance(backend.response_cache(), ResponseCache)
+    with pytest.raises(ValueError):
+        create_backend(Settings(state_backend="redis"))
+
+
+def test_webhook_delivery_is_claimed_by_one_worker(workers):
+    a, b = (w.dedupe_store() for w in workers)
+    assert a.seen_or_add("d1:opened") is False
+    assert b.seen_or_add("d1:opened") is True
+    assert "d1:opened" in b and len(a) == 1
+
+    a.ttl = b.ttl = -1  # expired keys can be claimed again
+    assert b.seen_or_add("d2:opened") is False and a.seen_or_add("d2:opened") is False
+
+
+def test_cache_is_shared_and_lru_bounded(workers):
+    a, b = (w.response_cache() for w in workers)
+    a.put("k1", CacheEntry(b"[1]", etag='"e1"', params={"state": "open"}))
+    hit = b.get("k1")
+    assert hit.body == b"[1]" and hit.etag == '"e1"' and hit.params == {"state": "open"} and b.is_fresh(hit)
+    b.ttl = b.stale_ttl = -1  # expired: still returned, but counted as a miss
+    assert b.get("k1") is not None and (b.hits, b.stale, b.misses) == (1, 0, 1)
+    b.ttl, b.stale_ttl = 15.0, 45.0
+
+    for key in ("k2", "k3", "k4"):
+        b.put(key, CacheEntry(key.encode()))
+    assert "k1" not in a and len(a) == 3 and b.evictions == 1
+
+    assert a.invalidate_where(lambda e: e.params is None) == 3 and len(b) == 0
+
+
+def test_cache_skips_optional_writes_while_another_worker_holds_the_lock(workers):
+    a = workers[0].response_cache()
+    a.put("k1", CacheEntry(b"[1]"))
+    a.db.execute("UPDATE cache SET used_at = 0")
+    other = workers[1].db
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.monotonic()
+        assert a.get("k1").body == b"[1]"  # served; the LRU touch is skipped
+        a.put("k2", CacheEntry(b"[2]"))  # not stored
+        assert time.monotonic() - start < 0.5
+    finally:
+        other.execute("COMMIT")
+    assert a.busy == 2 and "k2" not in a
+    assert a.db.execute("SELECT used_at FROM cache WHERE key = 'k1'").fetchone()[0] == 0
+
+
+def test_required_writes_wait_and_rate_bookkeeping_skips_while_the_lock_is_held(workers):
+    import threading
+
+    dedupe, events, idem = workers[0].dedupe_store(), workers[0].event_ring(), workers[0].idempotency_store()
+    rate = workers[0].rate_scheduler()
+    other = workers[1].db
+    other.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.2, lambda: other.execute("COMMIT"))
+    release.start()
+    try:
+        # Rate-limit updates run after GitHub answered: skipped, never raised
+        rate.update(httpx.Response(201, headers={"X-RateLimit-Remaining": "10", "X-RateLimit-Limit": "5000"}))
+        rate.blocked_until = time.time() + 30
+        assert rate.busy == 2
+        # Writes that must land wait for the lock instead of failing
+        assert dedupe.seen_or_add("d1:opened") is False
+        events.append(EventRecord("d1", "issues", "opened", 1, 10))
+        assert idem.claim("k1", "f1") == (CLAIMED, None)
+    finally:
+        release.join()
+    assert events.next_seq == 2 and "d1:opened" in dedupe
+    assert rate.snapshot()["busy"] == 2 and rate.blocked_until == 0.0
+
+
+def test_events_are_shared_and_capped(workers):
+    a, b = (w.event_ring() for w in workers)
+    a.capacity = 3
+    for i in range(1, 6):
+        (a if i % 2 else b).append(EventRecord(f"d{i}", "issues", "opened", i, 10))
+    records, cursor = b.query(limit=2)
+    assert [r["seq"] for r in records] == [5, 4] and cursor == 4
+    assert [r["id"] for r in b.query(before=cursor)[0]] == ["d3"]
+    assert a.query(issue_number=4)[0][0]["seq"] == 4
+    assert [r["seq"] for r in b.after(3)] == [4, 5] and a.next_seq == 6
+
+
+def test_rate_budget_is_shared(workers):
+    a, b = (w.rate_scheduler() for w in workers)
+    reset = str(int(time.time() + 3600))
+    headers = {"X-RateLimit-Limit": "5000", "X-RateLimit-Reset": reset}
+    a.update(httpx.Response(200, headers={**headers, "X-RateLimit-Remaining": "60"}))
+    # A late response from the same window cannot raise the budget back up
+    b.update(httpx.Response(200, headers={**headers, "X-RateLimit-Remaining": "80"}))
+    assert b.snapshot()["resources"]["core"]["remaining"] == 60
+
+    async def spend(sched, n):
+        for _ in range(n):
+            await sched.acquire(Priority.WRITE)
+
+    asyncio.run(spend(a, 5))
+    asyncio.run(spend(b, 5))
+    assert a.snapshot()["resources"]["core"]["remaining"] == 50
+    with pytest.raises(RateLimited):  # the last 50 are reserved for writes, on every worker
+        asyncio.run(b.acquire(Priority.READ))
+
+    a.blocked_until = time.time() + 30
+    assert b.blocked_until > time.time() + 20
+
+    # Another token's budget (app.registry) is kept apart from GITHUB_TOKEN's
+    other = workers[1].rate_scheduler("tok2")
+    assert other.snapshot()["resources"] == {} and other.blocked_until == 0.0
+    other.update(httpx.Response(200, headers={**headers, "X-RateLimit-Remaining": "4999"}))
+    assert a.snapshot()["resources"]["core"]["remaining"] == 50
+    assert workers[0].rate_scheduler("tok2").snapshot()["resources"]["core"]["remaining"] == 4999
+
+
+def test_idempotency_keys_are_shared(workers):
+    a, b = (w.idempotency_store() for w in workers)
+    assert a.claim("k", "f") == (CLAIMED, None)
+    assert b.claim("k", "f") == (PENDING, None) and b.claim("k", "g") == (MISMATCH, None)
+    a.complete("k", StoredResponse(201, b'{"id": 1}', {"Location": "/issues/1"}))
+    asyncio.run(b.wait("k", 1))
+    state, stored = b.claim("k", "f")
+    assert state == DONE and stored.body == b'{"id": 1}' and stored.headers == {"Location": "/issues/1"}
+
+    b.claim("r", "f")
+    b.release("r")
+    assert a.claim("r", "f") == (CLAIMED, None)
+
+
+def test_event_log_directory_has_a_single_writer(tmp_path):
+    log = EventLog(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        EventLog(str(tmp_path))
+    log.close()
+    EventLog(str(tmp_path)).close()
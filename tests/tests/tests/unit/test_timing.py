@@ -0,0 +1,68 @@
+# tests/unit/test_timing.py
+import threading
+import time
+
+from app.config import get_settings
+from app.profiling import ProfileSession, active, request_finished
+
+S = get_settings()
+OWNER = S.github_owner or "octocat"
+REPO = S.github_repo or "hello-world"
+
+
+def _phases(header):
+    return {item.split(";dur=")[0]: float(item.split(";dur=")[1]) for item in header.split(", ")}
+
+
+def test_server_timing_breaks_down_a_read(client, respx_mocked):
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/61").respond(200, json={
+        "number": 61, "html_url": "https://github.com/o/r/issues/61", "state": "open", "title": "t", "body": None,
+        "labels": [], "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z"})
+
+    miss = _phases(client.get("/issues/61").headers["Server-Timing"])
+    assert {"upstream", "decode", "handler", "validate", "total"} <= set(miss)
+    assert miss["handler"] >= miss["upstream"] and miss["total"] >= miss["handler"]
+
+    hit = _phases(client.get("/issues/61").headers["Server-Timing"])
+    assert "upstream" not in hit and "cache" in hit
+    assert "Server-Timing" in client.get("/healthz").headers
+
+
+def test_profile_endpoint_requires_admin_token(client, monkeypatch):
+    settings = client.app.state.settings
+    monkeypatch.setattr(settings, "admin_token", "")
+    assert client.post("/admin/profile").status_code == 404
+
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    assert client.post("/admin/profile", headers={"Authorization": "Bearer nope"}).status_code == 401
+    r = client.post("/admin/profile", params={"seconds": 0.2, "interval_ms": 2},
+                    headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200 and int(r.headers["X-Profile-Samples"]) > 0
+    stack, count = r.text.splitlines()[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) >= 1
+    assert active() is None
+
+
+def test_profile_session_stops_after_n_requests():
+    busy = threading.Event()
+
+    def spin():
+        while not busy.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=spin)
+    worker.start()
+    session = ProfileSession(worker.ident, seconds=30, max_requests=2, interval=0.001)
+    session.start()
+    try:
+        time.sleep(0.05)
+        request_finished()
+        assert not session.done
+        request_finished()
+        assert session.done
+    finally:
+        session.stop()
+        busy.set()
+        worker.join()
+    assert session.requests == 2 and session.elapsed < 5
+    assert any("spin (test_timing.py" in stack for stack in session.stacks)
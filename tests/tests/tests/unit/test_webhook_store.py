@@ -0,0 +1,33 @@
+# tests/unit/test_webhook_store.py
+from app.webhook_store import DedupeStore, EventRecord, EventRing
+
+
+def test_dedupe_is_bounded_by_size():
+    store = DedupeStore(max_entries=3, ttl=60)
+    for key in "abcd":
+        assert not store.seen_or_add(key)
+    assert len(store) == 3 and "a" not in store
+    assert store.seen_or_add("d")
+    before = store.memory_bytes()
+    store.seen_or_add("e" * 1000)
+    assert store.memory_bytes() > before
+
+
+def test_dedupe_forgets_expired_keys():
+    store = DedupeStore(max_entries=10, ttl=60)
+    store.seen_or_add("old")
+    store._expiry["old"] -= 61
+    assert "old" not in store
+    assert not store.seen_or_add("old")
+
+
+def test_ring_overwrites_oldest_and_returns_newest_first():
+    ring = EventRing(capacity=3)
+    for i in range(5):
+        ring.append(EventRecord(f"d{i}", "issues", "opened", i, 10))
+    assert len(ring) == 3
+    assert [r.id for r in ring.latest(0)] == ["d4", "d3", "d2"]
+    assert [r.id for r in ring.latest(2)] == ["d4", "d3"]
+    assert set(ring.latest(1)[0].to_dict()) == {"seq", "id", "event", "action", "issue_number", "timestamp",
+                                             "payload_size"}
+    assert ring.stats()["memory_bytes"] > 0
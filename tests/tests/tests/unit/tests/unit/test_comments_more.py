@@ -1,4 +1,8 @@
 # tests/unit/test_comments_more.py
+import json
+
+import httpx
+
 from app.config import get_settings
 S = get_settings()
 OWNER = S.github_owner or "octocat"
@@ -17,3 +21,76 @@ def test_create_comment_502_on_upstream_error(client, respx_mocked):
     )
     r = client.post("/issues/6/comments", json={"body": "hey"})
     assert r.status_code == 502
+
+def test_create_comments_batch_maps_errors_per_item(client, respx_mocked):
+    comment = {"id": 1, "body": "hi", "user": {"login": "me"}, "created_at": "c", "html_url": "u"}
+    respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues/5/comments").respond(status_code=201, json=comment)
+    respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues/404/comments").respond(status_code=404, json={})
+    r = client.post("/issues/comments:batch", json=[{"number": 5, "body": "hi"}, {"number": 404, "body": "hi"}])
+    assert r.status_code == 200
+    assert r.json() == [
+        {"index": 0, "status": 201, "data": comment, "error": None},
+        {"index": 1, "status": 404, "data": None, "error": "Issue not found"},
+    ]
+
+def _comment(i, updated="2024-01-01T00:00:00Z"):
+    return {"id": i, "body": f"c{i}", "user": {"login": "me", "id": 1, "url": "x"}, "created_at": "c",
+            "updated_at": updated, "html_url": f"u{i}"}
+
+def _expire(client, number):
+    from app.routes.comments import _thread_key
+    client.app.state.issue_cache.peek(_thread_key(number)).fetched_at -= 3600
+
+def test_list_comments_syncs_incrementally_and_paginates(client, respx_mocked):
+    url = f"https://api.github.com/repos/{OWNER}/{REPO}/issues/9/comments"
+    route = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/9/comments")
+    route.side_effect = [
+        httpx.Response(200, json=[_comment(1), _comment(2)], headers={"Link": f'<{url}?page=2>; rel="next"'}),
+        httpx.Response(200, json=[_comment(3, "2024-01-02T00:00:00Z")], headers={"ETag": '"p2"'}),
+        httpx.Response(200, json=[_comment(3, "2024-01-02T00:00:00Z")], headers={"ETag": '"s1"'}),
+        httpx.Response(304),
+        httpx.Response(200, json=[_comment(2, "2024-01-03T00:00:00Z") | {"body": "edited"}], headers={"ETag": '"s2"'}),
+    ]
+
+    r = client.get("/issues/9/comments", params={"limit": 2})
+    assert r.status_code == 200 and r.headers["X-Cache"] == "MISS"
+    assert [c["id"] for c in r.json()] == [1, 2] and r.json()[0]["user"] == {"login": "me", "id": 1}
+    assert "cursor=2" in r.headers["Link"] and route.call_count == 2
+    r = client.get("/issues/9/comments", params={"cursor": 2, "limit": 2})
+    assert r.headers["X-Cache"] == "HIT" and [c["id"] for c in r.json()] == [3] and "Link" not in r.headers
+    assert client.get("/issues/9/comments", headers={"If-None-Match": r.headers["ETag"]},
+                      params={"cursor": 2, "limit": 2}).status_code == 304
+
+    # The cursor moved to comment 3's updated_at, so the first refresh has no validator yet
+    _expire(client, 9)
+    assert client.get("/issues/9/comments").headers["X-Cache"] == "DELTA"
+    assert route.calls.last.request.url.params["since"] == "2024-01-02T00:00:00Z"
+    _expire(client, 9)
+    assert client.get("/issues/9/comments").headers["X-Cache"] == "REVALIDATED"
+    assert route.calls.last.request.headers["If-None-Match"] == '"s1"'
+    _expire(client, 9)
+    r = client.get("/issues/9/comments")
+    assert r.headers["X-Cache"] == "DELTA" and [c["body"] for c in r.json()] == ["c1", "edited", "c3"]
+    assert route.call_count == 5
+
+def test_created_comment_is_written_into_cached_thread(client, respx_mocked):
+    respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/10/comments").respond(200, json=[_comment(1)])
+    respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues/10/comments").respond(201, json=_comment(2))
+    assert len(client.get("/issues/10/comments").json()) == 1
+    assert client.post("/issues/10/comments", json={"body": "c2"}).status_code == 201
+    r = client.get("/issues/10/comments/stream")
+    assert r.headers["X-Cache"] == "HIT"
+    assert [json.loads(line)["id"] for line in r.text.splitlines()] == [1, 2]
+
+
+def test_created_comment_keeps_cached_issue_lists(client, respx_mocked):
+    listing = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues").respond(200, json=[])
+    issue = respx_mocked.get(f"/repos/{OWNER}/{REPO}/issues/10").respond(200, json={
+        "number": 10, "html_url": "u", "state": "open", "title": "t", "body": None, "labels": [],
+        "created_at": "c", "updated_at": "u"})
+    respx_mocked.post(f"/repos/{OWNER}/{REPO}/issues/10/comments").respond(201, json=_comment(2))
+    client.get("/issues")
+    client.get("/issues/10")
+    assert client.post("/issues/10/comments", json={"body": "c2"}).status_code == 201
+    assert client.get("/issues").headers["X-Cache"] == "HIT" and listing.call_count == 1
+    assert client.get("/issues/10").headers["X-Cache"] == "MISS" and issue.call_count == 2
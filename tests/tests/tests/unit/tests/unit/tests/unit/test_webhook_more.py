@@ -70,3 +70,151 @@ def test_events_endpoint_if_present(client):
         assert isinstance(r.json(), list)
     else:
         assert r.status_code == 404
+
+def test_webhook_issue_event_updates_cache(client, drain_webhooks):
+    from app.routes.issues import _generate_cache_key, _issue_cache_key
+    from app.cache import CacheEntry
+    import orjson
+
+    drain_webhooks()  # deliveries left queued by earlier tests would invalidate the entries seeded below
+    cache = client.app.state.issue_cache
+    issue = {"number": 321, "html_url": "u", "state": "open", "title": "old", "body": None,
+             "labels": [{"name": "bug"}], "created_at": "c", "updated_at": "u"}
+    cache.put(_issue_cache_key(321), CacheEntry(orjson.dumps(issue)))
+    closed_params = {"state": "closed", "page": 1, "per_page": 30}
+    docs_params = {"state": "open", "page": 1, "per_page": 30, "labels": "docs"}
+    closed_key, docs_key = _generate_cache_key(closed_params), _generate_cache_key(docs_params)
+    cache.put(closed_key, CacheEntry(b"[]", params=closed_params))
+    cache.put(docs_key, CacheEntry(b"[]", params=docs_params))
+
+    secret = get_settings().webhook_secret or "testsecret"
+    body = json.dumps({"action": "closed", "issue": {**issue, "state": "closed", "title": "new"}}).encode()
+    r = client.post("/webhook", data=body, headers={
+        "X-GitHub-Event": "issues",
+        "X-GitHub-Delivery": "delivery-cache-1",
+        "X-Hub-Signature-256": _sig(body, secret),
+        "Content-Type": "application/json",
+    })
+    assert r.status_code == 204
+    drain_webhooks()
+    assert orjson.loads(cache.peek(_issue_cache_key(321)).body)["title"] == "new"
+    assert closed_key not in cache      # issue now belongs to closed lists
+    assert docs_key in cache            # label filter cannot match
+
+
+def test_webhook_older_delivery_does_not_overwrite_cache(client, drain_webhooks):
+    from app.routes.issues import _issue_cache_key
+    import orjson
+
+    drain_webhooks()  # deliveries left queued by earlier tests would invalidate the entries seeded below
+    cache = client.app.state.issue_cache
+    issue = {"number": 322, "html_url": "u", "state": "open", "title": "t", "body": None, "labels": [],
+             "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z"}
+    secret = get_settings().webhook_secret or "testsecret"
+    deliveries = [
+        ("delivery-order-closed", "closed", {**issue, "state": "closed", "updated_at": "2024-01-02T00:00:00Z"}),
+        ("delivery-order-open", "opened", issue),  # arrives late
+    ]
+    for delivery_id, action, payload in deliveries:
+        body = json.dumps({"action": action, "issue": payload}).encode()
+        r = client.post("/webhook", data=body, headers={
+            "X-GitHub-Event": "issues",
+            "X-GitHub-Delivery": delivery_id,
+            "X-Hub-Signature-256": _sig(body, secret),
+            "Content-Type": "application/json",
+        })
+        assert r.status_code == 204
+        drain_webhooks()
+    assert orjson.loads(cache.peek(_issue_cache_key(322)).body)["state"] == "closed"
+
+
+def _issue_delivery(delivery_id, number=55):
+    secret = get_settings().webhook_secret or "testsecret"
+    body = json.dumps({"action": "edited", "issue": {"number": number}}).encode()
+    return body, {
+        "X-GitHub-Event": "issues",
+        "X-GitHub-Delivery": delivery_id,
+        "X-Hub-Signature-256": _sig(body, secret),
+        "Content-Type": "application/json",
+    }
+
+
+def test_webhook_is_processed_by_workers_and_reported(client, drain_webhooks):
+    body, headers = _issue_delivery("delivery-pipeline-1")
+    assert client.post("/webhook", data=body, headers=headers).status_code == 204
+    drain_webhooks()
+    assert client.get("/events").json()[0]["id"] == "delivery-pipeline-1"
+    stats = client.get("/healthz").json()["webhooks"]
+    assert stats["queue_depth"] == 0 and stats["processed"] >= 1
+
+
+def test_webhook_full_queue_returns_503(client, drain_webhooks):
+    pipeline = client.app.state.webhook_pipeline
+    body, headers = _issue_delivery("delivery-pipeline-2")
+    original = pipeline.submit
+    pipeline.submit = lambda job: False
+    try:
+        r = client.post("/webhook", data=body, headers=headers)
+    finally:
+        pipeline.submit = original
+    assert r.status_code == 503 and r.headers["Retry-After"]
+
+
+def test_pipeline_drains_queue_on_shutdown():
+    import asyncio
+    from app.webhook_pipeline import WebhookJob, WebhookPipeline
+
+    handled = []
+
+    async def handle(job):
+        handled.append(job.delivery_id)
+
+    async def run():
+        pipeline = WebhookPipeline(handle, max_queue=3)
+        for i in range(3):
+            assert pipeline.submit(WebhookJob(str(i), "issues", b"{}"))
+        assert not pipeline.submit(WebhookJob("overflow", "issues", b"{}"))
+        pipeline.start()
+        await pipeline.drain(timeout=1)
+        return pipeline.stats()
+
+    stats = asyncio.run(run())
+    assert handled == ["0", "1", "2"]  # one consumer, arrival order
+    assert stats["rejected"] == 1 and stats["processed"] == 3
+
+
+def test_events_filters_and_cursor_pagination(client, drain_webhooks):
+    for i in range(3):
+        body, headers = _issue_delivery(f"delivery-page-{i}", number=900)
+        client.post("/webhook", data=body, headers=headers)
+    drain_webhooks()
+
+    first = client.get("/events?issue_number=900&limit=2")
+    assert [e["id"] for e in first.json()] == ["delivery-page-2", "delivery-page-1"]
+    next_url = first.headers["Link"].split(">")[0].lstrip("<")
+    rest = client.get(next_url)
+    assert [e["id"] for e in rest.json()] == ["delivery-page-0"]
+    assert "Link" not in rest.headers
+    assert client.get("/events?event=ping&issue_number=900").json() == []
+
+
+def test_webhook_rejects_oversized_payload_413(client):
+    settings = client.app.state.settings
+    body, headers = _issue_delivery("delivery-big")
+    settings.webhook_max_bytes, original = len(body) - 1, settings.webhook_max_bytes
+    try:
+        assert client.post("/webhook", data=body, headers=headers).status_code == 413
+    finally:
+        settings.webhook_max_bytes = original
+
+
+def test_webhook_offloaded_hmac_still_verifies(client):
+    settings = client.app.state.settings
+    body, headers = _issue_delivery("delivery-offload")
+    settings.webhook_hmac_offload_bytes, original = 1, settings.webhook_hmac_offload_bytes
+    try:
+        assert client.post("/webhook", data=body, headers=headers).status_code == 204
+        headers["X-Hub-Signature-256"] = "sha256=" + "0" * 64
+        assert client.post("/webhook", data=body, headers=headers).status_code == 401
+    finally:
+        settings.webhook_hmac_offload_bytes = original